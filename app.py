@@ -1,28 +1,148 @@
-# app.py (Sadece /api/devices fonksiyonu güncellendi)
+# app.py (Flask uygulaması: cihaz/sensör API'leri, değişiklik akışı, grafikler, metrikler ve profiler)
 
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, render_template, jsonify, request, Response, stream_with_context, g
 from flask_bootstrap import Bootstrap
 from src.reader import RSSIDataReader
 from src.rssi_to_distance import RSSIConverter
 from src.trilateration import TrilaterationEngine
+from src.log_store import RSSILogStore
+from src.device_registry import DeviceRegistry
+from src.position_cache import PositionCache
+from src.change_feed import ChangeFeed
+from src.tracking import PositionTracker
+from src.fingerprint import RadioMap, load_log_samples
+from src.visualize import PositionVisualizer
+from src.update_queue import PositionUpdateQueue, QueueFull
+from src.spatial_index import GridIndex
+from src import metrics
 import os
+import atexit
 import json
-import csv
+import threading
+import time
 from datetime import datetime
-import pandas as pd # Eğer zaten import edilmediyse
-import glob # Eğer zaten import edilmediyse
+import numpy as np
 
 app = Flask(__name__)
 bootstrap = Bootstrap(app)
 
 # Initialize components
-reader = RSSIDataReader("data")
+# Veri dizini WIFI_DATA_DIR ile değiştirilebilir (ör. benchmark'lar uygulamayı gerçek data/ dizinine dokunmadan içe aktarır)
+DATA_DIR = os.environ.get("WIFI_DATA_DIR", "data")
+reader = RSSIDataReader(DATA_DIR)
 sensor_positions = reader.get_sensor_positions()
 # RSSIConverter'ı başlatırken parametreleri buradan ayarlayabilirsiniz
 # Örneğin: rssi_converter = RSSIConverter(path_loss_exponent=2.5, shadowing_std_dev_dB=4.0)
-rssi_converter = RSSIConverter()
+# seed: cihaz/epoch başına tekrarlanabilir gölgeleme (shadowing) üretir
+rssi_converter = RSSIConverter(seed=0)
 rssi_converter.set_sensor_positions(sensor_positions)
-trilateration_engine = TrilaterationEngine(list(sensor_positions.values()))
+trilateration_engine = TrilaterationEngine(list(sensor_positions.values()), sensor_ids=list(sensor_positions.keys()))
+
+# RSSI logları: cihaz+zaman indeksli SQLite deposu. İlk açılışta eski CSV loglarını bir kez içe aktar.
+log_store = RSSILogStore(os.path.join(DATA_DIR, "rssi_logs.sqlite3"))
+if log_store.row_count() == 0 and os.path.isdir(os.path.join(DATA_DIR, "logs")):
+    log_store.import_csv_logs(os.path.join(DATA_DIR, "logs"))
+
+# Cihaz konumları: overrides.json bir kez okunur, güncellemeler bellekten sunulur ve arka planda atomik olarak yazılır
+device_registry = DeviceRegistry(os.path.join(DATA_DIR, "overrides.json"))
+atexit.register(device_registry.close)
+
+# Cihaz başına sonuç önbelleği: konum, epoch, sensör yerleşimi ve model parametreleri değişmedikçe yeniden hesaplanmaz
+position_cache = PositionCache(max_entries=10000)
+device_epochs = {} # /api/update_position her çağrıldığında cihazın epoch'u artar
+solve_lock = threading.RLock() # compute_device_results'ı (takipçi, önbellek, indeks güncellemeleri) sıralar
+
+# Yöntem başına tahmini konumların ızgara indeksi: bbox/yarıçap/bölge sorguları sadece ilgili hücrelere bakar.
+# Sadece yeniden hesaplanan cihazlar taşınır (önbellekten gelenlerin konumu değişmemiştir).
+device_indexes = {'trilateration': GridIndex(cell_size=5.0), 'fingerprint': GridIndex(cell_size=5.0)}
+
+# SSE istemcileri için sıra numaralı değişiklik akışı
+change_feed = ChangeFeed()
+
+# Yöntem başına Kalman takipçisi: her yeni konum tahmini cihazın izini O(1) günceller.
+# Trilaterasyon ve parmak izi tahminleri ayrı izlerde tutulur, biri diğerinin yumuşatılmış konumunu bozmaz.
+# Simülasyondaki cihazlar kayıt defterinde kalıcı olduğu için izler zaman aşımıyla silinmez.
+position_trackers = {'trilateration': PositionTracker(stale_after=None), 'fingerprint': PositionTracker(stale_after=None)}
+# İze en son verilen tahminin girdi anahtarı: önbellekten düşüp yeniden çözülen aynı tahmin izi tekrar güncellemez
+tracked_inputs = {'trilateration': {}, 'fingerprint': {}}
+
+# Parmak izi (fingerprinting) modu için radyo haritası: ilk kullanımda diskten yüklenir veya modelden üretilir.
+# POST /api/radio_map ile log deposundaki gerçek konumlu ölçümlerden öğrenilen harita da kullanılabilir.
+RADIO_MAP_PATH = os.path.join(DATA_DIR, "radio_map.npz")
+radio_map = None
+
+def learned_map_signature():
+    # Öğrenilen harita, loglandığı sensör yerleşimi değişene kadar geçerlidir
+    return f"samples:{tuple(rssi_converter.sensor_positions.items())!r}"
+
+def get_radio_map():
+    global radio_map
+    # Harita sadece yol kaybı parametreleri veya sensör yerleşimi değişince yeniden üretilir (seed/gölgeleme etkilemez)
+    signature = repr(rssi_converter.radio_map_key())
+    if radio_map is None and os.path.exists(RADIO_MAP_PATH):
+        try:
+            radio_map = RadioMap.load(RADIO_MAP_PATH)
+        except Exception as e:
+            print(f"Could not load radio map: {e}")
+    if radio_map is None or radio_map.model_signature not in (signature, learned_map_signature()):
+        radio_map = RadioMap.build_from_model(rssi_converter)
+        radio_map.save(RADIO_MAP_PATH)
+    return radio_map
+
+# Metrikler: aşama süreleri, optimizer sayaçları, önbellek isabetleri ve dosya G/Ç baytları /api/metrics'te (Prometheus formatı)
+metrics.REGISTRY.gauge_callback(
+    "wifi_position_cache_entries", "Devices held in the position cache.",
+    lambda: {(): len(position_cache)})
+metrics.REGISTRY.gauge_callback(
+    "wifi_position_cache_lookups_total", "Position cache lookups by result.",
+    lambda: {(("result", "hit"),): position_cache.hits, (("result", "miss"),): position_cache.misses},
+    metric_type="counter")
+metrics.REGISTRY.gauge_callback(
+    "wifi_position_cache_hit_ratio", "Hit ratio of the position cache since startup.",
+    lambda: {(): position_cache.hits / max(position_cache.hits + position_cache.misses, 1)})
+metrics.REGISTRY.gauge_callback(
+    "wifi_tracked_devices", "Devices with a Kalman track, per localization method.",
+    lambda: {(("method", method),): len(tracker) for method, tracker in position_trackers.items()})
+metrics.REGISTRY.gauge_callback(
+    "wifi_change_feed_sequence", "Latest sequence number of the change feed.",
+    lambda: {(): change_feed.sequence})
+metrics.REGISTRY.gauge_callback(
+    "wifi_update_queue_depth", "Devices waiting in the position update queue.",
+    lambda: {(): len(update_queue)})
+metrics.REGISTRY.gauge_callback(
+    "wifi_update_queue_updates_total", "Position updates by outcome (coalesced updates are also submitted).",
+    lambda: {(("outcome", name),): value for name, value in update_queue.stats().items()
+             if name in ('submitted', 'coalesced', 'committed', 'failed', 'rejected')},
+    metric_type="counter")
+
+# İsteğe bağlı örnekleyici profilleyici: WIFI_PROFILER=1 ile açılışta başlar veya /api/profiler ile açılıp kapatılır
+profiler = metrics.SamplingProfiler()
+if os.environ.get("WIFI_PROFILER") == "1":
+    profiler.start()
+
+# /api/plots için başsız (headless) görselleştirici; çizilen görüntüler girdi özetine göre önbelleğe alınır
+plot_visualizer = None
+plot_visualizer_lock = threading.Lock()
+
+def get_plot_visualizer():
+    """Sensör yerleşimi değişmişse görselleştiriciyi yeniler; aynı veri için görüntü önbellekten gelir."""
+    global plot_visualizer
+    layout = np.array(list(sensor_positions.values()), dtype=float)
+    with plot_visualizer_lock:
+        if plot_visualizer is None or not np.array_equal(plot_visualizer.sensor_positions, layout):
+            plot_visualizer = PositionVisualizer(list(sensor_positions.values()))
+        return plot_visualizer
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_time(response):
+    start = g.get('request_start')
+    if start is not None:
+        metrics.HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint=request.endpoint or "unknown")
+    return response
 
 @app.route('/')
 def index():
@@ -33,16 +153,214 @@ def get_sensors():
     sensors = [{'id': sid, 'position': {'x': pos[0], 'y': pos[1]}} for sid, pos in sensor_positions.items()]
     return jsonify(sensors)
 
-@app.route('/api/devices')
-def get_devices():
-    override_path = os.path.join("data", "overrides.json")
-    if os.path.exists(override_path):
-        with open(override_path, "r") as f:
-            overrides = json.load(f)
-    else:
-        overrides = {}
+def compute_device_results(known_devices, method="trilateration", epochs=None):
+    """
+    Run the RSSI -> distance -> position pipeline for the given devices.
 
-    devices_list = [] # 'devices' adını değiştirdim, Flask'ın 'devices' ile çakışmaması için
+    Args:
+        known_devices: List of (device_id, x, y, type) tuples
+        method: "trilateration" or "fingerprint" (k-NN on the radio map)
+        epochs: Optional epochs overriding device_epochs for some devices
+                (used to solve an update before it is applied)
+
+    Returns:
+        Dictionary mapping device IDs to {'position', 'measurements'} results
+    """
+    # Çözümler tek kilitle sıralanır: takipçi, önbellek ve indeks yazıcı iş parçacığı ile istekler arasında tutarlı kalır
+    with solve_lock:
+        # Önbellekte olmayan (veya girdisi değişen) cihazları ayır
+        sensor_ids = list(rssi_converter.sensor_positions.keys())
+        model_key = rssi_converter.model_key()
+        results = {}
+        stale = []
+        epochs = epochs or {}
+        with metrics.timed("cache_lookup"):
+            for device_id, x, y, _ in known_devices:
+                cache_key = (x, y, epochs.get(device_id, device_epochs.get(device_id, 0)), model_key, method)
+                cached = position_cache.get(device_id, cache_key)
+                if cached is not None:
+                    results[device_id] = cached
+                else:
+                    stale.append((device_id, x, y, cache_key))
+
+        if stale:
+            # Sadece değişen cihazlar için RSSI ve mesafeleri tek seferde hesapla: (cihaz sayısı, sensör sayısı) matrisleri
+            with metrics.timed("simulate_rssi"):
+                rssi_matrix = rssi_converter.simulate_rssi_matrix(
+                    [(x, y) for _, x, y, _ in stale],
+                    device_keys=[(device_id, cache_key[2]) for device_id, _, _, cache_key in stale]
+                )
+            with metrics.timed("rssi_to_distance"):
+                distance_matrix = rssi_converter.rssi_to_distance_matrix(rssi_matrix)
+
+            batch_rows = [] # Toplu konum tahmini için (stale indeksi, mesafeler veya RSSI vektörü)
+            if method == "fingerprint":
+                # Parmak izi modu: mesafe modeline gerek yok, RSSI vektörleri doğrudan KD-ağacında aranır
+                batch_rows = [(row, rssi_matrix[row]) for row in range(len(stale))]
+            else:
+                for row, (device_id, _, _, _) in enumerate(stale):
+                    distances = dict(zip(sensor_ids, distance_matrix[row].tolist()))
+                    # Trilaterasyon için en az 3 geçerli mesafe olmalı; sensör kimlikleriyle birlikte (seyrek) gönderilir
+                    valid_distances = {k: v for k, v in distances.items() if v is not None and not np.isnan(v)}
+                    if len(valid_distances) >= 3 : # Genellikle trilaterasyon için en az 3 nokta gerekir
+                        batch_rows.append((row, valid_distances))
+                    else:
+                        print(f"Not enough valid distances for trilateration for device {device_id}. Found {len(valid_distances)} valid distances.")
+
+            # Konumları tek seferde tahmin et (yakınsamayan satırlar Nelder-Mead ile çözülür)
+            estimated = {}
+            if batch_rows:
+                try:
+                    with metrics.timed(f"localize_{method}"):
+                        if method == "fingerprint":
+                            estimated_positions, _ = get_radio_map().query(np.array([r for _, r in batch_rows]))
+                        else:
+                            # Her cihaz kendisini duyan en yakın k sensör üzerinde çözülür
+                            estimated_positions, _, _ = trilateration_engine.estimate_positions_sparse([r for _, r in batch_rows])
+                    solved = np.isfinite(estimated_positions).all(axis=1) # Çözülemeyen satırlar NaN döner
+                    for (row, _), (est_x, est_y), ok in zip(batch_rows, estimated_positions, solved):
+                        if ok:
+                            estimated[row] = {'x': float(est_x), 'y': float(est_y)}
+                    with metrics.timed("track"):
+                        seen = tracked_inputs[method]
+                        fresh = [i for i, ((row, _), ok) in enumerate(zip(batch_rows, solved))
+                                 if ok and seen.get(stale[row][0]) != stale[row][3]]
+                        position_trackers[method].update(
+                            [stale[batch_rows[i][0]][0] for i in fresh], estimated_positions[fresh], time.time()
+                        )
+                        for i in fresh:
+                            device_id, _, _, cache_key = stale[batch_rows[i][0]]
+                            seen[device_id] = cache_key
+                except ValueError as e:
+                    print(f"Localization error ({method}): {e}")
+                except Exception as e:
+                    print(f"Unexpected error during localization ({method}): {e}")
+
+            device_indexes[method].update(
+                [device_id for device_id, _, _, _ in stale],
+                np.array([[estimated[row]['x'], estimated[row]['y']] if row in estimated else [np.nan, np.nan]
+                          for row in range(len(stale))])
+            )
+            for row, (device_id, _, _, cache_key) in enumerate(stale):
+                result = {
+                    'position': estimated.get(row, {'x': None, 'y': None}),
+                    'measurements': [
+                        {'sensor_id': sid, 'rssi': rssi, 'distance': distance}
+                        for sid, rssi, distance in zip(sensor_ids, rssi_matrix[row].tolist(), distance_matrix[row].tolist())
+                    ]
+                }
+                if row in estimated:
+                    position_cache.put(device_id, cache_key, result)
+                results[device_id] = result
+
+        return results
+
+
+DEVICE_FIELDS = ('id', 'real_position', 'position', 'smoothed_position', 'type', 'measurements')
+COLUMNAR_MIMETYPE = 'application/vnd.wifi.columns+json'
+
+
+def device_payload(device_id, x, y, device_type, result, fields=DEVICE_FIELDS, method="trilateration"):
+    """Build the JSON object served for a single device, limited to the given fields."""
+    tracker = position_trackers[method]
+    if fields is DEVICE_FIELDS:
+        return {
+            'id': device_id,
+            'real_position': {'x': x, 'y': y},
+            'position': dict(result['position']), # Tahmini konum
+            'smoothed_position': tracker.estimate(device_id), # Kalman ile yumuşatılmış konum ve hız
+            'type': device_type,  # YENİ: Cihaz türünü ekle
+            'measurements': [dict(m) for m in result['measurements']]
+        }
+    payload = {}
+    for field in fields:
+        if field == 'id':
+            payload['id'] = device_id
+        elif field == 'real_position':
+            payload['real_position'] = {'x': x, 'y': y}
+        elif field == 'position':
+            payload['position'] = dict(result['position'])
+        elif field == 'smoothed_position':
+            payload['smoothed_position'] = tracker.estimate(device_id)
+        elif field == 'type':
+            payload['type'] = device_type
+        elif field == 'measurements':
+            payload['measurements'] = [dict(m) for m in result['measurements']]
+    return payload
+
+
+def columnar_payload(devices, results, fields, method="trilateration"):
+    """Aynı cihazlar için paralel diziler: her alan bir kez yazılır, cihaz başına anahtar tekrarlanmaz."""
+    columns = {}
+    for field in fields:
+        if field == 'id':
+            columns['id'] = [device_id for device_id, _, _, _ in devices]
+        elif field == 'real_position':
+            columns['real_position'] = {'x': [x for _, x, _, _ in devices], 'y': [y for _, _, y, _ in devices]}
+        elif field == 'position':
+            positions = [results[device_id]['position'] for device_id, _, _, _ in devices]
+            columns['position'] = {'x': [p['x'] for p in positions], 'y': [p['y'] for p in positions]}
+        elif field == 'smoothed_position':
+            smoothed = [position_trackers[method].estimate(device_id) for device_id, _, _, _ in devices]
+            columns['smoothed_position'] = {
+                key: [s[key] if s is not None else None for s in smoothed] for key in ('x', 'y', 'vx', 'vy', 'std')
+            }
+        elif field == 'type':
+            columns['type'] = [device_type for _, _, _, device_type in devices]
+        elif field == 'measurements':
+            # Cihaz x sensör matrisleri; sütun sırası sensor_ids
+            measurements = [results[device_id]['measurements'] for device_id, _, _, _ in devices]
+            columns['measurements'] = {
+                'sensor_ids': [m['sensor_id'] for m in measurements[0]] if measurements else list(sensor_positions),
+                'rssi': [[m['rssi'] for m in row] for row in measurements],
+                'distance': [[m['distance'] for m in row] for row in measurements]
+            }
+    return columns
+
+
+def parse_floats(value, name):
+    try:
+        numbers = [float(v) for v in value.split(',')]
+    except ValueError:
+        raise ValueError(f"{name} must be comma-separated numbers")
+    # inf/nan float() ile okunur ama ızgara hücresine çevrilemez
+    if not all(np.isfinite(numbers)):
+        raise ValueError(f"{name} must be finite numbers")
+    return numbers
+
+
+def spatial_filter(args, index):
+    """
+    ?bbox=xmin,ymin,xmax,ymax, ?near=x,y&radius=r veya ?zone=x1,y1,x2,y2,x3,y3,... (çokgen)
+    sorgusuna giren cihaz kimlikleri; filtre yoksa None.
+    """
+    if 'bbox' in args:
+        bbox = parse_floats(args['bbox'], 'bbox')
+        if len(bbox) != 4 or bbox[0] > bbox[2] or bbox[1] > bbox[3]:
+            raise ValueError("bbox must be xmin,ymin,xmax,ymax")
+        return index.query_bbox(*bbox)
+    if 'near' in args:
+        center = parse_floats(args['near'], 'near')
+        if len(center) != 2 or 'radius' not in args:
+            raise ValueError("near must be x,y and needs radius")
+        radius = parse_floats(args['radius'], 'radius')[0]
+        if radius < 0:
+            raise ValueError("radius must not be negative")
+        return index.query_radius(center[0], center[1], radius)
+    if 'zone' in args:
+        vertices = parse_floats(args['zone'], 'zone')
+        if len(vertices) % 2 or len(vertices) < 6:
+            raise ValueError("zone must list at least 3 x,y vertices")
+        return index.query_polygon(list(zip(vertices[0::2], vertices[1::2])))
+    return None
+
+
+def load_known_devices():
+    """Cihaz kayıt defterinden koordinatı olan cihazlar: (device_id, x, y, type) listesi."""
+    with metrics.timed("read_overrides"):
+        overrides = device_registry.snapshot()
+
+    known_devices = [] # Koordinatı olan cihazlar: (device_id, x, y, type)
     for device_id, device_data in overrides.items(): # Artık 'pos' yerine 'device_data' alıyoruz
         x = device_data.get("x") # .get() kullanarak anahtar yoksa hata almayız
         y = device_data.get("y")
@@ -51,108 +369,283 @@ def get_devices():
         if x is None or y is None:
             print(f"Warning: Device {device_id} in overrides.json is missing x or y coordinates.")
             continue # Bu cihazı atla
+        known_devices.append((device_id, x, y, device_type))
+    return known_devices
 
-        rssi_dict = rssi_converter.simulate_rssi_from_position((x, y))
-        distances = {sid: rssi_converter.rssi_to_distance(rssi) for sid, rssi in rssi_dict.items()}
-        
-        # Trilaterasyon için en az 3 geçerli mesafe olmalı
-        valid_distances = {k: v for k, v in distances.items() if v is not None and not (isinstance(v, float) and pd.isna(v))}
-        
-        estimated_pos_tuple = (None, None) # Varsayılan
-        if len(valid_distances) >= 3 : # Genellikle trilaterasyon için en az 3 nokta gerekir
-            try:
-                # TrilaterationEngine'a sadece değerleri (mesafeleri) gönder
-                estimated_pos_tuple = trilateration_engine.estimate_position(list(valid_distances.values()))
-            except ValueError as e:
-                print(f"Trilateration error for device {device_id}: {e}")
-            except Exception as e:
-                print(f"Unexpected error during trilateration for device {device_id}: {e}")
+
+@app.route('/api/devices')
+def get_devices():
+    # Anlık görüntüden önce alınır: arada gelen bir güncelleme en kötü ihtimalle iki kez uygulanır, kaybolmaz
+    sequence = change_feed.sequence
+    known_devices = load_known_devices()
+
+    devices_list = [] # 'devices' adını değiştirdim, Flask'ın 'devices' ile çakışmaması için
+    method = request.args.get('method', 'trilateration')
+    if method not in ('trilateration', 'fingerprint'):
+        return jsonify({"error": f"Unknown localization method: {method}"}), 400
+
+    # Alan seçimi (?fields=id,position), sayfalama (?offset=&limit=) ve sütunlu yanıt (Accept veya ?format=columns)
+    fields = DEVICE_FIELDS
+    if 'fields' in request.args:
+        requested = request.args['fields'].split(',')
+        fields = tuple(f for f in DEVICE_FIELDS if f in requested)
+        unknown = set(requested) - set(DEVICE_FIELDS)
+        if unknown or not fields:
+            return jsonify({"error": f"Unknown fields: {', '.join(sorted(unknown)) or '(none given)'}"}), 400
+    try:
+        offset = int(request.args.get('offset', 0))
+        limit = int(request.args['limit']) if 'limit' in request.args else None
+        if offset < 0 or (limit is not None and limit < 0):
+            raise ValueError("offset and limit must not be negative")
+    except ValueError as e:
+        return jsonify({"error": f"Invalid pagination: {e}"}), 400
+    columnar = (request.args.get('format') == 'columns' or
+                request.accept_mimetypes.best_match(['application/json', COLUMNAR_MIMETYPE]) == COLUMNAR_MIMETYPE)
+
+    results = compute_device_results(known_devices, method)
+
+    # Konum sorgusu tahmini konumların ızgara indeksinden cevaplanır; sıra kayıt defterindeki gibi kalır
+    try:
+        matched = spatial_filter(request.args, device_indexes[method])
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    selected = known_devices if matched is None else [d for d in known_devices if d[0] in matched]
+    total = len(selected)
+    selected = selected[offset:] if limit is None else selected[offset:offset + limit]
+
+    with metrics.timed("build_payload"):
+        if columnar:
+            body = {'total': total, 'offset': offset, 'count': len(selected), 'fields': list(fields),
+                    'columns': columnar_payload(selected, results, fields, method)}
         else:
-            print(f"Not enough valid distances for trilateration for device {device_id}. Found {len(valid_distances)} valid distances.")
+            for device_id, x, y, device_type in selected:
+                devices_list.append(device_payload(device_id, x, y, device_type, results[device_id], fields, method))
 
+    with metrics.timed("serialize"):
+        if columnar:
+            response = Response(json.dumps(body, separators=(',', ':')), mimetype=COLUMNAR_MIMETYPE)
+        else:
+            response = jsonify(devices_list)
+    # İstemci bu numaradan itibaren /api/devices/stream ile sadece değişiklikleri alır
+    response.headers['X-Sequence'] = str(sequence)
+    response.headers['X-Total-Count'] = str(total)
+    response.headers['Vary'] = 'Accept'
+    return response
 
-        # estimated_pos_tuple'ın None olup olmadığını kontrol et
-        est_x = estimated_pos_tuple[0] if estimated_pos_tuple and estimated_pos_tuple[0] is not None else None
-        est_y = estimated_pos_tuple[1] if estimated_pos_tuple and estimated_pos_tuple[1] is not None else None
 
+def parse_position_update(data):
+    """
+    Validate the body of a position update.
 
-        device_info = {
-            'id': device_id,
-            'real_position': {'x': x, 'y': y},
-            'position': {'x': est_x, 'y': est_y}, # Tahmini konum
-            'type': device_type,  # YENİ: Cihaz türünü ekle
-            'measurements': [
-                {
-                    'sensor_id': sid,
-                    'rssi': rssi_dict.get(sid), # .get() ile anahtar yoksa None döner
-                    'distance': distances.get(sid)
-                }
-                # Sadece rssi_dict'te olan sensörler için ölçüm ekle
-                for sid in rssi_dict 
-            ]
-        }
-        devices_list.append(device_info)
+    Returns:
+        Tuple of (device_id, x, y) with finite float coordinates
+
+    Raises:
+        ValueError: If device_id is missing or empty, or x/y are not finite numbers
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Body must be a JSON object with device_id, x and y")
+    device_id = data.get('device_id')
+    if not isinstance(device_id, str) or not device_id.strip():
+        raise ValueError("device_id must be a non-empty string")
+    coordinates = []
+    for name in ('x', 'y'):
+        value = data.get(name)
+        # bool, int'in alt sınıfıdır; true/false koordinat olarak kabul edilmez
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not np.isfinite(value):
+            raise ValueError(f"{name} must be a finite number")
+        coordinates.append(float(value))
+    return device_id, coordinates[0], coordinates[1]
+
+
+def commit_position_updates(batch):
+    """Kuyruktan gelen bir grup konum güncellemesini tek seferde uygular (yazıcı iş parçacığında çalışır)."""
+    with metrics.timed("commit_updates"):
+        known_devices = []
+        epochs = {}
+        for device_id, x, y, _ in batch:
+            try:
+                device_id, x, y = parse_position_update({'device_id': device_id, 'x': x, 'y': y})
+            except ValueError as e:
+                # Hatalı tek bir güncelleme grubun geri kalanını düşürmez
+                print(f"Warning: skipping invalid position update for {device_id!r}: {e}")
+                continue
+            # Cihazın mevcut 'type' bilgisi kayıt defterinde korunur
+            device_type = (device_registry.get(device_id) or {}).get("type", "unknown")
+            epochs[device_id] = device_epochs.get(device_id, 0) + 1
+            known_devices.append((device_id, x, y, device_type))
+        if not known_devices:
+            return
+
+        # Gruptaki tüm cihazlar yeni epoch'larıyla tek toplu çözümle hesaplanır. Kayıt defteri ancak çözüm
+        # başarılı olursa güncellenir: hata olursa konumlar, akış ve loglar birlikte eski hallerinde kalır.
+        with solve_lock:
+            results = compute_device_results(known_devices, epochs=epochs)
+            for device_id, x, y, _ in known_devices:
+                device_registry.update_position(device_id, x, y)
+                device_epochs[device_id] = epochs[device_id]
+        change_feed.publish([
+            device_payload(device_id, x, y, device_type, results[device_id])
+            for device_id, x, y, device_type in known_devices
+        ])
+
+        # Grubun bütün log satırları tek SQLite işleminde yazılır
+        timestamps = {device_id: timestamp for device_id, _, _, timestamp in batch}
+        log_store.append(
+            (m['sensor_id'], device_id, timestamps[device_id], x, y, m['rssi'])
+            for device_id, x, y, _ in known_devices
+            for m in results[device_id]['measurements']
+        )
 
-    return jsonify(devices_list)
+
+# Konum güncellemeleri sınırlı bir kuyruğa alınır; aynı cihazın bekleyen güncellemeleri birleştirilir ve
+# arka planda zamanlayıcı ya da grup boyutu dolunca toplu yazılır. Kapanışta kuyruk boşaltılır
+# (atexit ters sırada çalışır: önce kuyruk, sonra kayıt defteri diske yazılır).
+update_queue = PositionUpdateQueue(commit_position_updates, max_pending=10000, batch_size=256, flush_interval=0.05)
+atexit.register(update_queue.close)
 
 
 @app.route('/api/update_position', methods=['POST'])
 def update_position():
-    data = request.get_json()
-    device_id = data['device_id']
-    x = data['x']
-    y = data['y']
-
-    override_path = os.path.join("data", "overrides.json")
-    overrides = {}
-    if os.path.exists(override_path):
-        with open(override_path, "r") as f:
-            overrides = json.load(f)
-
-    # Cihazın mevcut 'type' bilgisini koru, eğer varsa
-    current_type = "unknown" # Varsayılan
-    if device_id in overrides and "type" in overrides[device_id]:
-        current_type = overrides[device_id]["type"]
-    
-    overrides[device_id] = {"x": x, "y": y, "type": current_type} # 'type' bilgisini de kaydet
-
-    with open(override_path, "w") as f:
-        json.dump(overrides, f, indent=2)
-
-    # ... (loglama kısmı aynı kalır) ...
-    rssi_dict = rssi_converter.simulate_rssi_from_position((x, y))
-    timestamp = datetime.utcnow().isoformat()
-    log_dir = os.path.join("data", "logs")
-    os.makedirs(log_dir, exist_ok=True)
-    for sensor_id, rssi in rssi_dict.items():
-        log_file = os.path.join(log_dir, f"{sensor_id}.csv")
-        file_exists = os.path.isfile(log_file)
-        with open(log_file, "a", newline="") as f:
-            writer = csv.writer(f)
-            if not file_exists:
-                writer.writerow(["timestamp", "device_id", "x", "y", "rssi"])
-            writer.writerow([timestamp, device_id, x, y, rssi])
-
-    return '', 200
+    try:
+        device_id, x, y = parse_position_update(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # Sadece kuyruğa alınır; yeni konum hesaplanınca /api/devices/stream üzerinden gönderilir
+    try:
+        pending = update_queue.submit(device_id, x, y, datetime.utcnow().isoformat())
+    except QueueFull as e:
+        response = jsonify({'error': f"Update queue is full: {e}"})
+        response.headers['Retry-After'] = '1'
+        return response, 503
+
+    return jsonify({'queued': True, 'device_id': device_id, 'pending': pending}), 202
+
+
+@app.route('/api/devices/stream')
+def stream_devices():
+    """Server-Sent Events: sadece değişen cihazları sıra numarasıyla gönderir."""
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('since')
+    try:
+        since = int(last_event_id) if last_event_id is not None else change_feed.sequence
+    except ValueError:
+        since = None
+
+    def events(sequence):
+        if sequence is None:
+            # Okunamayan sıra numarası: istemci tam listeyi yeniden çekmeli
+            yield f"event: resync\ndata: {json.dumps({'seq': change_feed.sequence})}\n\n"
+            return
+        while True:
+            changes = change_feed.wait(sequence, timeout=15.0)
+            if changes is None:
+                # İstemci çok geride (veya sunucu yeniden başladı): tam listeyi yeniden çekmeli
+                yield f"event: resync\ndata: {json.dumps({'seq': change_feed.sequence})}\n\n"
+                return
+            sequence, changed = changes
+            if not changed:
+                yield ": keepalive\n\n"
+                continue
+            data = json.dumps({'seq': sequence, 'devices': changed})
+            yield f"id: {sequence}\nevent: delta\ndata: {data}\n\n"
+
+    return Response(stream_with_context(events(since)), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 @app.route('/api/device_rssi_logs/<device_id>')
 def get_device_rssi_logs(device_id):
-    # ... (bu fonksiyon bir önceki yanıttaki gibi kalır) ...
-    log_dir = os.path.join("data", "logs")
-    all_sensor_logs = {}
-    if not os.path.exists(log_dir): return jsonify({"error": "Logs directory not found"}), 404
-    log_files = glob.glob(os.path.join(log_dir, "*.csv"))
-    for log_file in log_files:
-        sensor_id_from_filename = os.path.basename(log_file).replace(".csv", "")
-        try:
-            df = pd.read_csv(log_file)
-            if not {'timestamp', 'device_id', 'rssi'}.issubset(df.columns): continue
-            device_specific_logs = df[df['device_id'] == device_id]
-            if not device_specific_logs.empty:
-                sensor_data = device_specific_logs.sort_values(by='timestamp')[['timestamp', 'rssi']].to_dict(orient='records')
-                all_sensor_logs[sensor_id_from_filename] = sensor_data
-        except Exception as e: print(f"Error processing {log_file}: {e}")
-    return jsonify(all_sensor_logs if all_sensor_logs else {})
+    # Tek bir indeksli aralık taraması; kayıtlar zaten zamana göre sıralı gelir
+    return jsonify(log_store.device_history(device_id))
+
+
+@app.route('/api/plots/<kind>.<fmt>')
+def get_plot(kind, fmt):
+    """Tahmini ve gerçek konumların grafiği (positions) veya hata histogramı (errors), PNG/SVG olarak."""
+    method = request.args.get('method', 'trilateration')
+    if kind not in ('positions', 'errors') or fmt not in ('png', 'svg') \
+            or method not in ('trilateration', 'fingerprint'):
+        return jsonify({"error": "Unknown plot, format or method"}), 404
+
+    known_devices = load_known_devices()
+    results = compute_device_results(known_devices, method)
+    solved = [(results[device_id]['position'], x, y) for device_id, x, y, _ in known_devices
+              if results[device_id]['position']['x'] is not None]
+    estimated = np.array([[p['x'], p['y']] for p, _, _ in solved], dtype=float).reshape(-1, 2)
+    truth = np.array([[x, y] for _, x, y in solved], dtype=float).reshape(-1, 2)
+
+    visualizer = get_plot_visualizer()
+    title = f"Positioning Results ({method})" if kind == 'positions' else f"Positioning Error Distribution ({method})"
+    if kind == 'positions':
+        etag = visualizer.image_key("positions", fmt, estimated, truth, title=title, show_error=True, density=None)
+    else:
+        etag = visualizer.image_key("errors", fmt, estimated, truth, title=title)
+    if request.if_none_match.contains(etag):
+        return Response(status=304, headers={'ETag': f'"{etag}"'})
+
+    with metrics.timed(f"render_{kind}"):
+        if kind == 'positions':
+            image = visualizer.render_positions(estimated, truth, title=title, fmt=fmt)
+        else:
+            image = visualizer.render_error_histogram(estimated, truth, title=title, fmt=fmt)
+    response = Response(image, mimetype='image/png' if fmt == 'png' else 'image/svg+xml')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+@app.route('/api/metrics')
+def get_metrics():
+    return Response(metrics.REGISTRY.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+
+@app.route('/api/radio_map', methods=['GET', 'POST'])
+def radio_map_source():
+    """GET: kullanılan radyo haritası; POST {"source": "logs" | "model"}: haritayı loglardan öğren veya modelden üret."""
+    global radio_map
+    if request.method == 'POST':
+        source = (request.get_json(silent=True) or {}).get('source')
+        if source not in ('logs', 'model'):
+            return jsonify({"error": "source must be 'logs' or 'model'"}), 400
+        with solve_lock:
+            if source == 'logs':
+                sensor_ids = list(rssi_converter.sensor_positions.keys())
+                positions, rssi = load_log_samples(log_store, sensor_ids)
+                try:
+                    new_map = RadioMap.build_from_samples(sensor_ids, positions, rssi,
+                                                          model_signature=learned_map_signature())
+                except ValueError as e:
+                    return jsonify({"error": str(e)}), 409
+            else:
+                new_map = RadioMap.build_from_model(rssi_converter)
+            new_map.save(RADIO_MAP_PATH)
+            radio_map = new_map
+            # Eski haritayla bulunan parmak izi konumları artık geçersiz: önbellek ve iz girdileri sıfırlanır
+            position_cache.invalidate()
+            tracked_inputs['fingerprint'].clear()
+
+    with solve_lock:
+        current = get_radio_map()
+    return jsonify({
+        "source": "logs" if current.model_signature == learned_map_signature() else "model",
+        "points": len(current.locations)
+    })
+
+
+@app.route('/api/profiler', methods=['GET', 'POST'])
+def sampling_profiler():
+    """GET: örneklenen yığınlar (flame graph için collapsed format); POST {"enabled": bool, "reset": bool}: aç/kapat."""
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        if data.get('reset'):
+            profiler.reset()
+        if 'enabled' in data:
+            if data['enabled']:
+                profiler.start()
+            else:
+                profiler.stop()
+        return jsonify(profiler.stats())
+    return Response(profiler.collapsed(), mimetype='text/plain')
 
 
 if __name__ == '__main__':
@@ -0,0 +1,599 @@
+"""
+Accelerated replay of recorded RSSI traffic for load testing.
+
+Replays the app's RSSI log store (data/rssi_logs.sqlite3), legacy per-sensor
+CSV logs (timestamp, device_id, x, y, rssi) or airodump-ng captures on their
+original timeline, compressed by
+a speed-up factor, and optionally multiplies the devices synthetically. A
+producer thread releases events into a bounded ingestion queue as they fall
+due; a consumer pushes each batch through a target:
+
+- library: window aggregation -> RSSI to distance -> sparse trilateration
+- flask:   POST /api/update_position per moved device plus a columnar
+           GET /api/devices per batch, in process or against --url
+
+For every speed the run reports offered and sustained throughput, queue
+depth, end-to-end latency percentiles (event due -> batch processed) and
+whether the target kept up, so saturation points show up as the speed where
+throughput stops following the offered rate.
+
+Usage:
+    python -m benchmarks.replay --speed 1,10,100,1000 --multiply 200
+    python -m benchmarks.replay --captures data --target library --speed 1000 --loop
+    python -m benchmarks.replay --logs data/logs --target flask --url http://localhost:5000
+"""
+
+import argparse
+import glob
+import json
+import os
+import queue
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import zlib
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+
+from src.aggregation import RSSIAggregator
+from src.capture_cache import encode_devices
+from src.log_store import RSSILogStore
+from src.reader import RSSIDataReader
+from src.rssi_to_distance import RSSIConverter
+from src.trilateration import TrilaterationEngine
+
+
+class ReplayTrace:
+    """Time-ordered RSSI samples, with the device's true position where the source has one."""
+
+    def __init__(self,
+                 times: np.ndarray,
+                 device_ids: Sequence[str],
+                 sensor_ids: Sequence[str],
+                 rssi: np.ndarray,
+                 x: Optional[np.ndarray] = None,
+                 y: Optional[np.ndarray] = None):
+        """
+        Args:
+            times: (N,) sample times in seconds (any origin)
+            device_ids, sensor_ids: Device and sensor of each sample
+            rssi: (N,) RSSI values in dBm
+            x, y: (N,) true device positions, or None if unknown
+        """
+        order = np.argsort(np.asarray(times, dtype=float), kind='stable')
+        times = np.asarray(times, dtype=float)[order]
+        self.times = times - times[0] if len(times) else times
+        self.devices, codes = encode_devices(list(device_ids))
+        self.device_codes = codes[order]
+        self.sensors, codes = encode_devices(list(sensor_ids))
+        self.sensor_codes = codes[order]
+        self.rssi = np.asarray(rssi, dtype=float)[order]
+        n = len(self.times)
+        self.x = np.full(n, np.nan) if x is None else np.asarray(x, dtype=float)[order]
+        self.y = np.full(n, np.nan) if y is None else np.asarray(y, dtype=float)[order]
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    @property
+    def duration(self) -> float:
+        return float(self.times[-1]) if len(self.times) else 0.0
+
+    @property
+    def has_positions(self) -> bool:
+        return bool(np.isfinite(self.x).any())
+
+    @property
+    def lap_length(self) -> float:
+        """Trace seconds from one start of a looped trace to the next (duration plus one mean gap)."""
+        if len(self) > 1 and self.duration > 0:
+            return self.duration * len(self) / (len(self) - 1)
+        # A single snapshot (e.g. airodump captures) repeats once per second
+        return 1.0
+
+    def rate(self) -> float:
+        """Average events per trace second when looped."""
+        return len(self) / self.lap_length
+
+    def device_ids(self, start: int, stop: int) -> List[str]:
+        return [self.devices[code] for code in self.device_codes[start:stop]]
+
+    def sensor_ids(self, start: int, stop: int) -> List[str]:
+        return [self.sensors[code] for code in self.sensor_codes[start:stop]]
+
+    @classmethod
+    def from_log_store(cls, db_path: str) -> "ReplayTrace":
+        """Load every row of an RSSILogStore database (the app's data/rssi_logs.sqlite3)."""
+        import pandas as pd
+
+        # Opening a missing path would create an empty store
+        if not os.path.exists(db_path):
+            raise FileNotFoundError(f"No RSSI log store at {db_path}")
+        store = RSSILogStore(db_path)
+        try:
+            rows = store.scan()
+        finally:
+            store.close()
+        if not rows:
+            raise FileNotFoundError(f"No RSSI logs in {db_path}")
+        sensor_ids, device_ids, timestamps, x, y, rssi = zip(*rows)
+        times = pd.to_datetime(list(timestamps)).to_numpy('datetime64[ns]').astype(np.int64) / 1e9
+        return cls(times, device_ids, sensor_ids, np.array(rssi, dtype=float),
+                   np.array(x, dtype=float), np.array(y, dtype=float))
+
+    @classmethod
+    def from_logs(cls, log_dir: str) -> "ReplayTrace":
+        """Load data/logs-style <sensor_id>.csv files (timestamp, device_id, x, y, rssi)."""
+        import pandas as pd
+
+        frames = []
+        for log_file in sorted(glob.glob(os.path.join(log_dir, "*.csv"))):
+            frame = pd.read_csv(log_file)
+            frame['sensor_id'] = os.path.basename(log_file).replace(".csv", "")
+            frames.append(frame)
+        if not frames:
+            raise FileNotFoundError(f"No RSSI logs in {log_dir}")
+        data = pd.concat(frames, ignore_index=True)
+        times = pd.to_datetime(data['timestamp']).to_numpy('datetime64[ns]').astype(np.int64) / 1e9
+        return cls(times, data['device_id'].astype(str).tolist(), data['sensor_id'].tolist(),
+                   data['rssi'].to_numpy(dtype=float), data['x'].to_numpy(dtype=float), data['y'].to_numpy(dtype=float))
+
+    @classmethod
+    def from_captures(cls, data_dir: str) -> "ReplayTrace":
+        """Load the Station rows of the airodump-ng captures in a directory (no true positions)."""
+        import pandas as pd
+
+        frames = list(RSSIDataReader(data_dir).load_all_data().values())
+        if not frames:
+            raise FileNotFoundError(f"No captures in {data_dir}")
+        data = pd.concat(frames, ignore_index=True)
+        times = data['timestamp'].to_numpy('datetime64[ns]').astype(np.int64) / 1e9
+        return cls(times, data['device_id'].astype(str).tolist(), data['sensor_id'].astype(str).tolist(),
+                   data['rssi'].to_numpy(dtype=float))
+
+    def _subset(self, keep: np.ndarray, times: Optional[np.ndarray] = None) -> "ReplayTrace":
+        return ReplayTrace(
+            self.times[keep] if times is None else times,
+            [self.devices[c] for c in self.device_codes[keep]],
+            [self.sensors[c] for c in self.sensor_codes[keep]],
+            self.rssi[keep], self.x[keep], self.y[keep]
+        )
+
+    def restrict_sensors(self, sensor_ids: Sequence[str]) -> "ReplayTrace":
+        """Drop samples of sensors that are not in the layout."""
+        known = np.isin(np.asarray(self.sensors, dtype=object), list(sensor_ids))
+        return self._subset(known[self.sensor_codes])
+
+    def compress_gaps(self, max_gap: float) -> "ReplayTrace":
+        """Shorten idle stretches between consecutive samples to at most max_gap seconds."""
+        gaps = np.minimum(np.diff(self.times), max_gap)
+        return self._subset(np.ones(len(self), dtype=bool), np.r_[0.0, np.cumsum(gaps)])
+
+    def multiply(self, factor: int, seed: int = 0, rssi_std: float = 2.0,
+                 position_std: float = 1.0, spread: float = 1.0) -> "ReplayTrace":
+        """
+        Add factor - 1 synthetic copies of every device.
+
+        Each copy gets a locally administered MAC derived from the original,
+        its own time offset (uniform in [0, spread) seconds, so copies do not
+        arrive in lockstep), Gaussian RSSI noise and a shifted true position.
+        """
+        if factor <= 1:
+            return self
+        rng = np.random.default_rng(seed)
+        n = len(self)
+        copies = np.repeat(np.arange(factor), n)
+        codes = np.tile(self.device_codes, factor)
+        clone_ids = [
+            [device_id if k == 0 else _clone_mac(device_id, k) for device_id in self.devices]
+            for k in range(factor)
+        ]
+        offsets = np.r_[0.0, rng.uniform(0.0, spread, size=factor - 1)]
+        noisy = copies > 0
+        rssi = np.tile(self.rssi, factor)
+        rssi[noisy] += rng.normal(0.0, rssi_std, size=int(noisy.sum()))
+        # One position shift per synthetic device, so each copy moves along a parallel path
+        shifts = rng.normal(0.0, position_std, size=(factor, len(self.devices), 2))
+        shifts[0] = 0.0
+        return ReplayTrace(
+            np.tile(self.times, factor) + offsets[copies],
+            [clone_ids[k][c] for k, c in zip(copies, codes)],
+            [self.sensors[c] for c in np.tile(self.sensor_codes, factor)],
+            rssi,
+            np.tile(self.x, factor) + shifts[copies, codes, 0],
+            np.tile(self.y, factor) + shifts[copies, codes, 1]
+        )
+
+
+def _clone_mac(device_id: str, copy: int) -> str:
+    """Stable, locally administered MAC for synthetic copy `copy` of a device."""
+    digest = zlib.crc32(f"{device_id}/{copy}".encode()) | (copy << 32)
+    octets = [0x02] + [(digest >> (8 * i)) & 0xFF for i in range(5)]
+    return ':'.join(f"{octet:02X}" for octet in octets)
+
+
+class LibraryTarget:
+    """In-process ingestion: window aggregation, RSSI -> distance and sparse trilateration."""
+
+    name = "library"
+
+    def __init__(self, sensor_positions: Dict[str, Tuple[float, float]], converter: Optional[RSSIConverter] = None,
+                 window: int = 16, k: int = 4):
+        self.converter = converter or RSSIConverter()
+        self.converter.set_sensor_positions(sensor_positions)
+        self.engine = TrilaterationEngine(list(sensor_positions.values()), sensor_ids=list(sensor_positions))
+        self.aggregator = RSSIAggregator(list(sensor_positions), window=window, stale_after=None)
+        self.k = k
+        self.solved = 0
+        self.unsolved = 0
+
+    def process(self, trace: ReplayTrace, start: int, stop: int) -> None:
+        device_ids = trace.device_ids(start, stop)
+        self.aggregator.add(device_ids, trace.sensor_ids(start, stop), trace.rssi[start:stop], trace.times[start:stop])
+
+        # Re-solve the devices heard in this batch from their windowed median RSSI
+        ids, sensor_ids, matrix = self.aggregator.snapshot("median", device_ids=device_ids)
+        distances = self.converter.rssi_to_distance_matrix(matrix)
+        measurements = [
+            {sensor_id: d for sensor_id, d in zip(sensor_ids, row) if np.isfinite(d)}
+            for row in distances.tolist()
+        ]
+        measurements = [m for m in measurements if len(m) >= 3]
+        self.unsolved += len(ids) - len(measurements)
+        if measurements:
+            positions, _, _ = self.engine.estimate_positions_sparse(measurements, k=self.k)
+            solved = int(np.isfinite(positions).all(axis=1).sum())
+            self.solved += solved
+            self.unsolved += len(measurements) - solved
+
+    def stats(self) -> Dict:
+        return {'devices': len(self.aggregator), 'solves': self.solved, 'unsolved': self.unsolved}
+
+
+def _encode_json(payload: Dict) -> bytes:
+    return json.dumps(payload).encode()
+
+
+class HttpClient:
+    """Minimal stand-in for the Flask test client that talks to a running server."""
+
+    class Response:
+        def __init__(self, status_code: int, data: bytes):
+            self.status_code = status_code
+            self.data = data
+
+    def __init__(self, base_url: str, timeout: float = 10.0):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def _request(self, request: urllib.request.Request) -> "HttpClient.Response":
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return self.Response(response.status, response.read())
+        except urllib.error.HTTPError as e:
+            return self.Response(e.code, e.read())
+
+    def get(self, path: str) -> "HttpClient.Response":
+        return self._request(urllib.request.Request(self.base_url + path))
+
+    def post(self, path: str, json: Dict) -> "HttpClient.Response":
+        # `json` mirrors the test client's keyword, so the module is reached through _encode_json
+        return self._request(urllib.request.Request(
+            self.base_url + path, data=_encode_json(json), headers={'Content-Type': 'application/json'}, method='POST'
+        ))
+
+
+class FlaskTarget:
+    """
+    Drives the HTTP API: the latest position of every device moved in a batch
+    is POSTed to /api/update_position, then the visible map is read back with
+    a columnar GET /api/devices. In process, the update queue is flushed
+    after each batch so latency includes the group commit; against a remote
+    server it ends when the 202 responses arrive.
+    """
+
+    name = "flask"
+
+    def __init__(self, client, flush=None, read_every: int = 1):
+        """
+        Args:
+            client: Flask test client or HttpClient
+            flush: Called after each batch's updates (e.g. the app's update_queue.flush)
+            read_every: Issue the GET every this many batches (0 disables reads)
+        """
+        self.client = client
+        self.flush = flush
+        self.read_every = read_every
+        self.batches = 0
+        self.updates = 0
+        self.rejected = 0
+        self.reads = 0
+
+    def process(self, trace: ReplayTrace, start: int, stop: int) -> None:
+        latest = {}
+        for device_id, x, y in zip(trace.device_ids(start, stop), trace.x[start:stop].tolist(),
+                                   trace.y[start:stop].tolist()):
+            if x == x and y == y:
+                latest[device_id] = (x, y)
+        for device_id, (x, y) in latest.items():
+            response = self.client.post('/api/update_position', json={'device_id': device_id, 'x': x, 'y': y})
+            if response.status_code == 503:
+                self.rejected += 1
+            elif response.status_code not in (200, 202):
+                raise RuntimeError(f"/api/update_position answered {response.status_code}")
+            else:
+                self.updates += 1
+        if self.flush is not None:
+            self.flush()
+
+        self.batches += 1
+        if self.read_every and self.batches % self.read_every == 0:
+            response = self.client.get('/api/devices?format=columns&fields=id,position')
+            if response.status_code != 200:
+                raise RuntimeError(f"/api/devices answered {response.status_code}")
+            self.reads += 1
+
+    def stats(self) -> Dict:
+        return {'updates': self.updates, 'rejected': self.rejected, 'reads': self.reads}
+
+
+def install_app(workdir: str, sensor_positions: Dict[str, Tuple[float, float]], trace: ReplayTrace):
+    """Point the Flask app at fresh state in workdir, with the trace's devices at their first positions."""
+    from benchmarks.run_benchmarks import import_app
+    from src.change_feed import ChangeFeed
+    from src.device_registry import DeviceRegistry
+    from src.log_store import RSSILogStore
+    from src.position_cache import PositionCache
+    from src.spatial_index import GridIndex
+    from src.tracking import PositionTracker
+
+    first = {}
+    for code, x, y in zip(trace.device_codes.tolist(), trace.x.tolist(), trace.y.tolist()):
+        if code not in first and x == x and y == y:
+            first[code] = {'x': x, 'y': y, 'type': 'unknown'}
+    overrides_path = os.path.join(workdir, "overrides.json")
+    with open(overrides_path, "w") as f:
+        json.dump({trace.devices[code]: entry for code, entry in first.items()}, f)
+
+    app_module = import_app(sensor_positions)
+    converter = RSSIConverter(seed=0)
+    converter.set_sensor_positions(sensor_positions)
+    app_module.sensor_positions = sensor_positions
+    app_module.rssi_converter = converter
+    app_module.trilateration_engine = TrilaterationEngine(list(sensor_positions.values()),
+                                                          sensor_ids=list(sensor_positions))
+    app_module.device_registry = DeviceRegistry(overrides_path, flush_delay=60.0)
+    app_module.log_store = RSSILogStore(os.path.join(workdir, "rssi_logs.sqlite3"))
+    app_module.position_cache = PositionCache(max_entries=max(10000, len(first)))
+    app_module.position_trackers = {method: PositionTracker(stale_after=None) for method in ('trilateration', 'fingerprint')}
+    app_module.tracked_inputs = {method: {} for method in ('trilateration', 'fingerprint')}
+    app_module.change_feed = ChangeFeed()
+    app_module.device_epochs.clear()
+    app_module.device_indexes = {method: GridIndex(cell_size=5.0) for method in ('trilateration', 'fingerprint')}
+    app_module.radio_map = None
+    app_module.RADIO_MAP_PATH = os.path.join(workdir, "radio_map.npz")
+    return app_module
+
+
+def replay(trace: ReplayTrace,
+           target,
+           speed: float,
+           duration: Optional[float] = None,
+           loop: bool = False,
+           tick: float = 0.01,
+           max_queue: int = 100000) -> Dict:
+    """
+    Replay a trace through a target at a speed-up factor.
+
+    Every `tick` seconds the producer releases the events that have fallen
+    due into a queue holding at most max_queue events. When the target falls
+    behind, the producer waits for room and falls behind schedule, as an
+    ingestion poller would.
+
+    Args:
+        trace: Events to replay
+        target: Object with process(trace, start, stop)
+        speed: Trace seconds per wall-clock second
+        duration: Wall-clock seconds after which no new events are released
+        loop: Start the trace over when it runs out (needs duration)
+        tick: Producer wake-up interval in seconds
+        max_queue: Bound of the ingestion queue, in events
+
+    Returns:
+        Report with throughput, latency percentiles (ms), queue depth (events)
+        and schedule lag
+    """
+    if loop and duration is None:
+        raise ValueError("A looping replay needs a duration")
+    batches: "queue.Queue" = queue.Queue()
+    room = threading.Condition()
+    queued = [0]                # events waiting in the queue
+    released = [0]
+    last_release = [0.0]        # wall time of the latest release
+    depth_samples: List[int] = []
+    lag_samples: List[float] = []
+
+    start_wall = time.perf_counter() + tick
+    deadline = None if duration is None else start_wall + duration
+
+    def produce() -> None:
+        i, offset = 0, 0.0
+        wake = start_wall
+        while True:
+            time.sleep(max(wake - time.perf_counter(), 0.0))
+            now = time.perf_counter()
+            if deadline is not None and now >= deadline:
+                break
+            j = int(np.searchsorted(trace.times, (now - start_wall) * speed - offset, side='right'))
+            if j > i:
+                with room:
+                    while queued[0] >= max_queue and (deadline is None or time.perf_counter() < deadline):
+                        room.wait(tick)
+                    j = min(j, i + max(max_queue - queued[0], 0))
+                    queued[0] += j - i
+                    released[0] += j - i
+                if j > i:
+                    scheduled = start_wall + (trace.times[i:j] + offset) / speed
+                    batches.put((i, j, scheduled))
+                    last_release[0] = time.perf_counter()
+                    lag_samples.append(time.perf_counter() - float(scheduled[0]))
+                    i = j
+            depth_samples.append(queued[0])
+            if i >= len(trace):
+                if not loop:
+                    break
+                i, offset = 0, offset + trace.lap_length
+            next_due = start_wall + (trace.times[i] + offset) / speed
+            wake = max(next_due, now + tick)
+        batches.put(None)
+
+    producer = threading.Thread(target=produce, name="replay-producer", daemon=True)
+    producer.start()
+
+    latencies: List[np.ndarray] = []
+    processed = errors = batch_count = 0
+    first_error = None
+    while True:
+        item = batches.get()
+        if item is None:
+            break
+        i, j, scheduled = item
+        try:
+            target.process(trace, i, j)
+        except Exception as e:
+            errors += j - i
+            first_error = first_error or f"{type(e).__name__}: {e}"
+        done = time.perf_counter()
+        with room:
+            queued[0] -= j - i
+            room.notify()
+        latencies.append(done - scheduled)
+        processed += j - i
+        batch_count += 1
+    end_wall = time.perf_counter()
+    producer.join()
+
+    latency = np.concatenate(latencies) * 1e3 if latencies else np.zeros(1)
+    depth = np.array(depth_samples or [0])
+    elapsed = max(end_wall - start_wall, 1e-9)
+    # Releases stop at the last event; the drain after it only counts against throughput
+    release_window = max(last_release[0] - start_wall, tick)
+    throughput = processed / elapsed
+    report = {
+        'target': target.name,
+        'speed': speed,
+        'events': processed,
+        'errors': errors,
+        'batches': batch_count,
+        'wall_seconds': elapsed,
+        'offered_rate': trace.rate() * speed,
+        'released_rate': released[0] / max(release_window, 1e-9),
+        'throughput': throughput,
+        'latency_ms': {f"p{p}": float(np.percentile(latency, p)) for p in (50, 90, 99)},
+        'queue_depth': {'mean': float(depth.mean()), 'p95': float(np.percentile(depth, 95)), 'max': int(depth.max())},
+        'max_lag_seconds': float(max(lag_samples, default=0.0)),
+    }
+    report['latency_ms']['max'] = float(latency.max())
+    # Saturated: draining the backlog pulled throughput below the release rate (capped at the offered rate,
+    # which a short release window can overshoot), or back-pressure pushed the producer a second behind schedule
+    report['saturated'] = bool(throughput < 0.9 * min(report['released_rate'], report['offered_rate'])
+                               or report['max_lag_seconds'] > 1.0)
+    if first_error:
+        report['first_error'] = first_error
+    if hasattr(target, 'stats'):
+        report['target_stats'] = target.stats()
+    return report
+
+
+def print_reports(reports: List[Dict]) -> None:
+    print(f"\n{'target':<8} {'speed':>7} {'events':>9} {'offered/s':>11} {'sustained/s':>12} "
+          f"{'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'queue avg':>10} {'queue max':>10} {'lag s':>7}  status")
+    for r in reports:
+        latency, depth = r['latency_ms'], r['queue_depth']
+        status = "SATURATED" if r['saturated'] else "ok"
+        if r['errors']:
+            status += f" ({r['errors']} errors: {r.get('first_error')})"
+        print(f"{r['target']:<8} {r['speed']:>6g}x {r['events']:>9} {r['offered_rate']:>11.0f} {r['throughput']:>12.0f} "
+              f"{latency['p50']:>9.2f} {latency['p90']:>9.2f} {latency['p99']:>9.2f} "
+              f"{depth['mean']:>10.1f} {depth['max']:>10} {r['max_lag_seconds']:>7.2f}  {status}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Replay recorded RSSI traffic through the pipeline at high speed.")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--log-store", help="RSSI log store database (default: data/rssi_logs.sqlite3)")
+    source.add_argument("--logs", help="Directory of legacy <sensor_id>.csv logs")
+    source.add_argument("--captures", help="Directory of airodump-ng captures")
+    parser.add_argument("--sensors-from", default="data",
+                        help="Directory whose capture filenames give the sensor layout (default: data)")
+    parser.add_argument("--target", choices=['library', 'flask'], action="append",
+                        help="Path to drive (repeatable, default: library)")
+    parser.add_argument("--url", help="Drive a running server instead of the in-process Flask app")
+    parser.add_argument("--speed", default="1,10,100,1000", help="Comma-separated speed-up factors")
+    parser.add_argument("--multiply", type=int, default=1, help="Copies of every device (1 = original only)")
+    parser.add_argument("--max-gap", type=float, default=1.0,
+                        help="Idle stretches in the trace are shortened to this many seconds")
+    parser.add_argument("--duration", type=float, default=10.0, help="Wall-clock seconds per run")
+    parser.add_argument("--loop", action="store_true", help="Restart the trace until the duration is over")
+    parser.add_argument("--tick", type=float, default=0.01, help="Ingestion poll interval in seconds")
+    parser.add_argument("--max-queue", type=int, default=100000, help="Ingestion queue bound in events")
+    parser.add_argument("--read-every", type=int, default=1, help="Flask target: GET /api/devices every N batches")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", help="Write the reports as JSON to this file")
+    args = parser.parse_args(argv)
+
+    sensor_positions = RSSIDataReader(args.sensors_from, use_cache=False).discover_sensors()
+    if len(sensor_positions) < 3:
+        parser.error(f"{args.sensors_from} describes fewer than 3 sensors")
+    if args.captures:
+        trace = ReplayTrace.from_captures(args.captures)
+    elif args.logs:
+        trace = ReplayTrace.from_logs(args.logs)
+    elif args.log_store or os.path.exists(os.path.join("data", "rssi_logs.sqlite3")):
+        trace = ReplayTrace.from_log_store(args.log_store or os.path.join("data", "rssi_logs.sqlite3"))
+    else:
+        # The app imports data/logs into the store on its first start; before that the CSVs are the only logs
+        print("No data/rssi_logs.sqlite3 yet, replaying data/logs", file=sys.stderr)
+        trace = ReplayTrace.from_logs(os.path.join("data", "logs"))
+    trace = trace.restrict_sensors(sensor_positions).compress_gaps(args.max_gap)
+    trace = trace.multiply(args.multiply, seed=args.seed)
+    print(f"Trace: {len(trace)} events, {len(trace.devices)} devices, {len(trace.sensors)} sensors, "
+          f"{trace.duration:.1f} s at 1x ({trace.rate():.1f} events/s)", file=sys.stderr)
+
+    reports = []
+    for target_name in args.target or ['library']:
+        if target_name == 'flask' and not trace.has_positions:
+            parser.error("The flask target needs true positions; replay the log store instead of --captures")
+        for speed in (float(s) for s in args.speed.split(',')):
+            print(f"Replaying through {target_name} at {speed:g}x...", file=sys.stderr, flush=True)
+            with tempfile.TemporaryDirectory() as workdir:
+                if target_name == 'library':
+                    target = LibraryTarget(sensor_positions)
+                elif args.url:
+                    target = FlaskTarget(HttpClient(args.url), read_every=args.read_every)
+                else:
+                    app_module = install_app(workdir, sensor_positions, trace)
+                    target = FlaskTarget(app_module.app.test_client(), flush=app_module.update_queue.flush,
+                                         read_every=args.read_every)
+                report = replay(trace, target, speed, duration=args.duration, loop=args.loop,
+                                tick=args.tick, max_queue=args.max_queue)
+                if target_name == 'flask' and not args.url:
+                    app_module.update_queue.flush()
+                    app_module.device_registry.close()
+                    app_module.log_store.close()
+            report['multiply'] = args.multiply
+            reports.append(report)
+    print_reports(reports)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(reports, f, indent=2)
+        print(f"\nWrote {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,434 @@
+"""
+Benchmark suite for the positioning pipeline.
+
+Generates synthetic scenarios (sensor count, device count, area size and
+shadowing sigma) through RSSIConverter, times every pipeline stage and the
+Flask endpoints, and tracks localization accuracy next to the timings so a
+speedup cannot silently trade away precision.
+
+Usage:
+    python -m benchmarks.run_benchmarks                      # small + medium, print results
+    python -m benchmarks.run_benchmarks -o results.json      # also write them to a file
+    python -m benchmarks.run_benchmarks --compare benchmarks/baseline.json
+    python -m benchmarks.run_benchmarks --save-baseline      # overwrite benchmarks/baseline.json
+    python -m benchmarks.run_benchmarks --scenario large --scenario custom --sensors 9 --devices 2000
+
+--compare exits with status 1 if a stage got slower than the time threshold
+or a mean error grew beyond the accuracy threshold.
+"""
+
+import argparse
+import atexit
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
+
+from src.reader import RSSIDataReader
+from src.rssi_to_distance import RSSIConverter
+from src.trilateration import TrilaterationEngine
+from src.utils import calculate_mean_error
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+SCENARIOS = {
+    'small': {'sensors': 3, 'devices': 50, 'area': 30.0, 'sigma': 2.0},
+    'medium': {'sensors': 16, 'devices': 1000, 'area': 100.0, 'sigma': 4.0},
+    'large': {'sensors': 64, 'devices': 10000, 'area': 300.0, 'sigma': 4.0},
+}
+DEFAULT_SCENARIOS = ['small', 'medium']
+
+
+class Scenario:
+    """A synthetic sensor layout with ground-truth device positions and simulated RSSI."""
+
+    def __init__(self, name: str, sensors: int, devices: int, area: float, sigma: float, seed: int = 0):
+        """
+        Generate the scenario.
+
+        Args:
+            name: Scenario name used in the results
+            sensors: Number of sensors, spread over a jittered grid
+            devices: Number of devices, uniformly placed
+            area: Side of the square area in meters
+            sigma: Shadowing standard deviation in dB
+            seed: Seed for layout, positions and shadowing
+        """
+        self.name = name
+        self.params = {'sensors': sensors, 'devices': devices, 'area': area, 'sigma': sigma, 'seed': seed}
+        rng = np.random.default_rng(seed)
+
+        side = int(np.ceil(np.sqrt(sensors)))
+        spacing = area / side
+        cells = [(i % side, i // side) for i in range(sensors)]
+        jitter = rng.uniform(-0.25, 0.25, size=(sensors, 2)) * spacing
+        self.sensor_positions = {
+            f"Sensor{i + 1}": (float((cx + 0.5) * spacing + jx), float((cy + 0.5) * spacing + jy))
+            for i, ((cx, cy), (jx, jy)) in enumerate(zip(cells, jitter))
+        }
+        self.sensor_ids = list(self.sensor_positions)
+
+        self.device_ids = [':'.join(f"{b:02X}" for b in rng.integers(0, 256, 6)) for _ in range(devices)]
+        self.device_positions = rng.uniform(0, area, size=(devices, 2))
+
+        self.converter = RSSIConverter(shadowing_std_dev_dB=sigma, seed=seed)
+        self.converter.set_sensor_positions(self.sensor_positions)
+        self.rssi = self.converter.simulate_rssi_matrix(self.device_positions)
+
+    def engine(self) -> TrilaterationEngine:
+        return TrilaterationEngine(list(self.sensor_positions.values()), sensor_ids=self.sensor_ids)
+
+    def write_captures(self, directory: str, samples: int = 3) -> None:
+        """Write one airodump-ng style capture per sensor with samples rows per device."""
+        start = datetime(2025, 1, 1, 12, 0, 0)
+        for column, (sensor_id, (sx, sy)) in enumerate(self.sensor_positions.items()):
+            lines = [
+                "BSSID, First time seen, Last time seen, channel, Speed, Privacy, Cipher, Authentication, "
+                "Power, # beacons, # IV, LAN IP, ID-length, ESSID, Key",
+                "",
+                "Station MAC, First time seen, Last time seen, Power, # packets, BSSID, Probed ESSIDs",
+            ]
+            for sample in range(samples):
+                seen = (start + timedelta(seconds=10 * sample)).strftime("%Y-%m-%d %H:%M:%S")
+                for device_id, rssi in zip(self.device_ids, self.rssi[:, column]):
+                    lines.append(f"{device_id}, {seen}, {seen}, {int(round(rssi))}, 1, (not associated), ")
+            filename = f"capture({sensor_id} - Konum_ {sx:.2f},{sy:.2f}).csv"
+            with open(os.path.join(directory, filename), "w") as f:
+                f.write("\r\n".join(lines) + "\r\n")
+
+
+def time_call(fn: Callable, repeat: int, setup: Optional[Callable] = None, items: int = 1) -> Dict:
+    """
+    Time fn() repeat times (after one untimed warm-up call).
+
+    Returns:
+        Dictionary with median/min seconds, repeat count, items per call and
+        median seconds per item
+    """
+    if setup is not None:
+        setup()
+    fn()
+    samples = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    median = statistics.median(samples)
+    return {'median': median, 'min': min(samples), 'repeat': repeat, 'items': items, 'per_item': median / items}
+
+
+def _mean_error(estimated: np.ndarray, truth: np.ndarray) -> Tuple[float, float]:
+    """Mean error over the solved rows and the fraction of rows solved."""
+    estimated = np.asarray(estimated, dtype=float)
+    solved = np.isfinite(estimated).all(axis=1)
+    if not solved.any():
+        return float('nan'), 0.0
+    error = calculate_mean_error([tuple(p) for p in estimated[solved]], [tuple(p) for p in truth[solved]])
+    return float(error), float(solved.mean())
+
+
+def bench_library(scenario: Scenario, repeat: int, scalar_limit: int) -> Tuple[Dict, Dict]:
+    """Time capture parsing, RSSI -> distance and the trilateration solvers."""
+    stages, accuracy = {}, {}
+    n_devices, n_sensors = scenario.rssi.shape
+
+    with tempfile.TemporaryDirectory() as capture_dir:
+        scenario.write_captures(capture_dir)
+        stages['parse_captures'] = time_call(
+            lambda: RSSIDataReader(capture_dir, use_cache=False).load_all_data(), repeat, items=n_sensors
+        )
+        stages['parse_captures_cached'] = time_call(
+            lambda: RSSIDataReader(capture_dir).load_all_data(), repeat, items=n_sensors
+        )
+
+    converter = scenario.converter
+    scalar_rows = scenario.rssi[:scalar_limit]
+    stages['rssi_to_distance'] = time_call(
+        lambda: [[converter.rssi_to_distance(v) for v in row] for row in scalar_rows.tolist()],
+        repeat, items=scalar_rows.size
+    )
+    stages['rssi_to_distance_matrix'] = time_call(
+        lambda: converter.rssi_to_distance_matrix(scenario.rssi), repeat, items=scenario.rssi.size
+    )
+    distances = converter.rssi_to_distance_matrix(scenario.rssi)
+
+    engine = scenario.engine()
+    scalar_distances = distances[:scalar_limit].tolist()
+    stages['estimate_position'] = time_call(
+        lambda: [engine.estimate_position(d) for d in scalar_distances], repeat, items=len(scalar_distances)
+    )
+    estimated = np.array([engine.estimate_position(d) for d in scalar_distances])
+    accuracy['estimate_position'] = _mean_error(estimated, scenario.device_positions[:scalar_limit])
+
+    stages['estimate_multiple_positions'] = time_call(
+        lambda: engine.estimate_multiple_positions(distances.tolist()), repeat, items=n_devices
+    )
+    accuracy['estimate_multiple_positions'] = _mean_error(
+        engine.estimate_multiple_positions(distances.tolist()), scenario.device_positions
+    )
+
+    measurements = [dict(zip(scenario.sensor_ids, row)) for row in distances.tolist()]
+    stages['estimate_positions_sparse'] = time_call(
+        lambda: engine.estimate_positions_sparse(measurements), repeat, items=n_devices
+    )
+    accuracy['estimate_positions_sparse'] = _mean_error(
+        engine.estimate_positions_sparse(measurements)[0], scenario.device_positions
+    )
+
+    return stages, {name: {'mean_error': e, 'solved': s} for name, (e, s) in accuracy.items()}
+
+
+def import_app(sensor_positions: Dict[str, Tuple[float, float]]):
+    """
+    Import the Flask app with its start-up side effects (SQLite log import,
+    device registry, update queue) pointed at a scratch directory instead of
+    data/. The directory only holds empty captures named after the sensors,
+    which is all sensor discovery reads.
+    """
+    if 'app' not in sys.modules:
+        workdir = tempfile.mkdtemp(prefix="wifi-app-")
+        # Registered before the app's own atexit handlers, so it runs after they flush
+        atexit.register(shutil.rmtree, workdir, ignore_errors=True)
+        for sensor_id, (x, y) in sensor_positions.items():
+            open(os.path.join(workdir, f"capture({sensor_id} - Konum_ {x:g},{y:g}).csv"), "w").close()
+        os.environ["WIFI_DATA_DIR"] = workdir
+    import app
+    return app
+
+
+def _install_scenario(app_module, scenario: Scenario, workdir: str) -> None:
+    """Point the Flask app's module-level components at the scenario."""
+    from src.change_feed import ChangeFeed
+    from src.device_registry import DeviceRegistry
+    from src.log_store import RSSILogStore
+    from src.position_cache import PositionCache
+    from src.spatial_index import GridIndex
+    from src.tracking import PositionTracker
+
+    overrides_path = os.path.join(workdir, "overrides.json")
+    with open(overrides_path, "w") as f:
+        json.dump({
+            device_id: {'x': float(x), 'y': float(y), 'type': 'phone'}
+            for device_id, (x, y) in zip(scenario.device_ids, scenario.device_positions)
+        }, f)
+
+    converter = RSSIConverter(shadowing_std_dev_dB=scenario.params['sigma'], seed=scenario.params['seed'])
+    converter.set_sensor_positions(scenario.sensor_positions)
+
+    app_module.sensor_positions = scenario.sensor_positions
+    app_module.rssi_converter = converter
+    app_module.trilateration_engine = scenario.engine()
+    app_module.device_registry = DeviceRegistry(overrides_path, flush_delay=60.0)
+    app_module.log_store = RSSILogStore(os.path.join(workdir, "rssi_logs.sqlite3"))
+    app_module.position_cache = PositionCache(max_entries=max(10000, len(scenario.device_ids)))
+    app_module.position_trackers = {method: PositionTracker(stale_after=None) for method in ('trilateration', 'fingerprint')}
+    app_module.tracked_inputs = {method: {} for method in ('trilateration', 'fingerprint')}
+    app_module.change_feed = ChangeFeed()
+    app_module.device_epochs.clear()
+    app_module.device_indexes = {method: GridIndex(cell_size=max(scenario.params['area'] / 20, 1.0))
+                                 for method in ('trilateration', 'fingerprint')}
+    app_module.radio_map = None
+    app_module.RADIO_MAP_PATH = os.path.join(workdir, "radio_map.npz")
+
+
+def bench_endpoints(scenario: Scenario, repeat: int, update_calls: int) -> Tuple[Dict, Dict]:
+    """Time the Flask endpoints through the test client."""
+    app_module = import_app(scenario.sensor_positions)
+
+    stages, accuracy = {}, {}
+    n_devices = len(scenario.device_ids)
+    with tempfile.TemporaryDirectory() as workdir:
+        _install_scenario(app_module, scenario, workdir)
+        client = app_module.app.test_client()
+
+        def get_devices(method="trilateration"):
+            response = client.get(f"/api/devices?method={method}")
+            assert response.status_code == 200, response.status_code
+            return response
+
+        stages['api_devices_cold'] = time_call(
+            get_devices, repeat, setup=lambda: app_module.position_cache.invalidate(), items=n_devices
+        )
+        stages['api_devices_warm'] = time_call(get_devices, repeat, items=n_devices)
+
+        def get_columns(query=""):
+            response = client.get(f"/api/devices?format=columns{query}")
+            assert response.status_code == 200, response.status_code
+            return response
+
+        stages['api_devices_columns'] = time_call(get_columns, repeat, items=n_devices)
+        area = scenario.params['area']
+        quarter = f"&bbox=0,0,{area / 2},{area / 2}&fields=id,position"
+        stages['api_devices_bbox'] = time_call(lambda: get_columns(quarter), repeat, items=n_devices)
+
+        devices = get_devices().get_json()
+        estimated = np.array([[np.nan if d['position'][a] is None else d['position'][a] for a in 'xy'] for d in devices])
+        truth = np.array([[d['real_position']['x'], d['real_position']['y']] for d in devices])
+        accuracy['api_devices'] = _mean_error(estimated, truth)
+
+        stages['api_devices_fingerprint'] = time_call(
+            lambda: get_devices("fingerprint"), repeat,
+            setup=lambda: app_module.position_cache.invalidate(), items=n_devices
+        )
+        devices = get_devices("fingerprint").get_json()
+        estimated = np.array([[np.nan if d['position'][a] is None else d['position'][a] for a in 'xy'] for d in devices])
+        accuracy['api_devices_fingerprint'] = _mean_error(estimated, truth)
+
+        targets = scenario.device_ids[:update_calls]
+
+        def update_positions():
+            for i, device_id in enumerate(targets):
+                response = client.post('/api/update_position', json={
+                    'device_id': device_id, 'x': (i * 7.3) % area, 'y': (i * 3.1) % area
+                })
+                assert response.status_code == 202, response.status_code
+            # Include the background group commit so the stage stays comparable
+            app_module.update_queue.flush()
+
+        stages['api_update_position'] = time_call(update_positions, repeat, items=len(targets))
+        app_module.device_registry.close()
+        app_module.log_store.close()
+
+    return stages, {name: {'mean_error': e, 'solved': s} for name, (e, s) in accuracy.items()}
+
+
+def run_scenario(scenario: Scenario, repeat: int, scalar_limit: int, update_calls: int,
+                 endpoints: bool = True) -> Dict:
+    stages, accuracy = bench_library(scenario, repeat, scalar_limit)
+    if endpoints:
+        endpoint_stages, endpoint_accuracy = bench_endpoints(scenario, repeat, update_calls)
+        stages.update(endpoint_stages)
+        accuracy.update(endpoint_accuracy)
+    return {'params': scenario.params, 'stages': stages, 'accuracy': accuracy}
+
+
+def compare(results: Dict, baseline: Dict, time_threshold: float, accuracy_threshold: float,
+            min_delta: float = 0.002, accuracy_slack: float = 0.05) -> List[str]:
+    """
+    Compare results against a baseline.
+
+    A stage regresses if its fastest run (less sensitive to machine noise
+    than the median) exceeds the baseline's by more than time_threshold
+    (relative) and min_delta seconds; an accuracy entry
+    regresses if its mean error exceeds the baseline by more than
+    accuracy_threshold (relative) plus accuracy_slack meters, or it solves
+    fewer devices.
+
+    Returns:
+        Human-readable descriptions of the regressions
+    """
+    regressions = []
+    for name, scenario in results['scenarios'].items():
+        base = baseline.get('scenarios', {}).get(name)
+        if base is None:
+            continue
+        if base['params'] != scenario['params']:
+            regressions.append(f"{name}: scenario parameters differ from the baseline, re-baseline")
+            continue
+        for stage, timing in scenario['stages'].items():
+            base_timing = base['stages'].get(stage)
+            if base_timing is None:
+                continue
+            limit = max(base_timing['min'] * (1 + time_threshold), base_timing['min'] + min_delta)
+            if timing['min'] > limit:
+                regressions.append(
+                    f"{name}/{stage}: {timing['min'] * 1e3:.2f} ms vs baseline {base_timing['min'] * 1e3:.2f} ms"
+                )
+        for stage, acc in scenario['accuracy'].items():
+            base_acc = base['accuracy'].get(stage)
+            if base_acc is None:
+                continue
+            limit = base_acc['mean_error'] * (1 + accuracy_threshold) + accuracy_slack
+            if not acc['mean_error'] <= limit:
+                regressions.append(
+                    f"{name}/{stage}: mean error {acc['mean_error']:.3f} m vs baseline {base_acc['mean_error']:.3f} m"
+                )
+            if acc['solved'] < base_acc['solved']:
+                regressions.append(
+                    f"{name}/{stage}: solved {acc['solved']:.1%} vs baseline {base_acc['solved']:.1%}"
+                )
+    return regressions
+
+
+def print_results(results: Dict) -> None:
+    for name, scenario in results['scenarios'].items():
+        print(f"\n== {name} {scenario['params']}")
+        for stage, timing in scenario['stages'].items():
+            print(f"  {stage:<34} {timing['median'] * 1e3:10.2f} ms  "
+                  f"({timing['per_item'] * 1e6:9.2f} us/item, n={timing['items']})")
+        for stage, acc in scenario['accuracy'].items():
+            print(f"  {stage + ' error':<34} {acc['mean_error']:10.3f} m   (solved {acc['solved']:.1%})")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the positioning pipeline on synthetic scenarios.")
+    parser.add_argument("--scenario", action="append", choices=list(SCENARIOS) + ['custom'],
+                        help="Scenario to run (repeatable, default: small and medium)")
+    parser.add_argument("--sensors", type=int, default=9, help="Sensors in the custom scenario")
+    parser.add_argument("--devices", type=int, default=500, help="Devices in the custom scenario")
+    parser.add_argument("--area", type=float, default=60.0, help="Area side in meters in the custom scenario")
+    parser.add_argument("--sigma", type=float, default=4.0, help="Shadowing sigma in dB in the custom scenario")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5, help="Timed repetitions per stage")
+    parser.add_argument("--scalar-limit", type=int, default=200,
+                        help="Devices used by the per-device (scalar) stages")
+    parser.add_argument("--update-calls", type=int, default=20, help="POSTs per /api/update_position sample")
+    parser.add_argument("--no-endpoints", action="store_true", help="Skip the Flask endpoint benchmarks")
+    parser.add_argument("-o", "--output", help="Write results as JSON to this file")
+    parser.add_argument("--compare", metavar="BASELINE", help="Compare against a baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help=f"Write results to {BASELINE_PATH}")
+    parser.add_argument("--time-threshold", type=float, default=0.25,
+                        help="Allowed relative slowdown per stage (default: 0.25)")
+    parser.add_argument("--accuracy-threshold", type=float, default=0.10,
+                        help="Allowed relative growth of mean error (default: 0.10)")
+    args = parser.parse_args(argv)
+
+    results = {
+        'meta': {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+        },
+        'scenarios': {},
+    }
+    for name in args.scenario or DEFAULT_SCENARIOS:
+        params = SCENARIOS.get(name) or {'sensors': args.sensors, 'devices': args.devices,
+                                         'area': args.area, 'sigma': args.sigma}
+        scenario = Scenario(name, seed=args.seed, **params)
+        print(f"Running {name}...", file=sys.stderr, flush=True)
+        results['scenarios'][name] = run_scenario(
+            scenario, args.repeat, args.scalar_limit, args.update_calls, endpoints=not args.no_endpoints
+        )
+    print_results(results)
+
+    for path in filter(None, [args.output, BASELINE_PATH if args.save_baseline else None]):
+        with open(path, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nWrote {path}")
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.time_threshold, args.accuracy_threshold)
+        if regressions:
+            print("\nRegressions against " + args.compare + ":")
+            for regression in regressions:
+                print("  " + regression)
+            return 1
+        print(f"\nNo regressions against {args.compare}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
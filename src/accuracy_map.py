@@ -0,0 +1,242 @@
+"""
+Monte Carlo accuracy and GDOP maps for planning sensor placement.
+"""
+
+from typing import Dict, Optional, Sequence, Tuple
+import numpy as np
+from .trilateration import TrilaterationEngine
+
+Bounds = Tuple[float, float, float, float]
+
+
+class AccuracyMap:
+    """Per-cell error statistics and GDOP of one sensor layout on a regular grid."""
+
+    def __init__(self,
+                 sensor_positions: Dict[str, Tuple[float, float]],
+                 xs: np.ndarray,
+                 ys: np.ndarray,
+                 mean_error: np.ndarray,
+                 percentile_errors: Dict[float, np.ndarray],
+                 gdop: np.ndarray,
+                 converged: np.ndarray,
+                 trials: int):
+        """
+        Args:
+            sensor_positions: Layout the map was computed for
+            xs, ys: Cell centre coordinates along x (nx,) and y (ny,)
+            mean_error: (ny, nx) mean positioning error in meters
+            percentile_errors: {percentile: (ny, nx) error in meters}
+            gdop: (ny, nx) geometric dilution of precision
+            converged: (ny, nx) fraction of trials the batch solver converged on
+            trials: Number of noise trials per cell
+        """
+        self.sensor_positions = dict(sensor_positions)
+        self.xs = xs
+        self.ys = ys
+        self.mean_error = mean_error
+        self.percentile_errors = percentile_errors
+        self.gdop = gdop
+        self.converged = converged
+        self.trials = trials
+
+    @property
+    def extent(self) -> Bounds:
+        return (float(self.xs[0]), float(self.xs[-1]), float(self.ys[0]), float(self.ys[-1]))
+
+    def metric(self, name: str) -> np.ndarray:
+        """
+        A per-cell metric by name: "mean", "gdop", "converged" or "p<percentile>" (e.g. "p90").
+        """
+        if name == "mean":
+            return self.mean_error
+        if name == "gdop":
+            return self.gdop
+        if name == "converged":
+            return self.converged
+        if name.startswith("p"):
+            return self.percentile_errors[float(name[1:])]
+        raise ValueError(f"Unknown accuracy metric: {name}")
+
+    def summary(self) -> Dict[str, float]:
+        """Area-wide figures: mean error, median over cells of each percentile, GDOP and convergence."""
+        summary = {'mean_error': float(np.nanmean(self.mean_error))}
+        for percentile, errors in self.percentile_errors.items():
+            summary[f"p{percentile:g}_error"] = float(np.nanmedian(errors))
+        finite_gdop = self.gdop[np.isfinite(self.gdop)]
+        summary['median_gdop'] = float(np.median(finite_gdop)) if finite_gdop.size else float('inf')
+        summary['converged'] = float(np.mean(self.converged))
+        return summary
+
+
+def layout_bounds(layouts: Sequence[Dict[str, Tuple[float, float]]], margin: float = 0.0) -> Bounds:
+    """Bounding box (xmin, xmax, ymin, ymax) of one or more sensor layouts plus a margin."""
+    positions = np.concatenate([np.array(list(layout.values()), dtype=float) for layout in layouts])
+    lower = positions.min(axis=0) - margin
+    upper = positions.max(axis=0) + margin
+    return (float(lower[0]), float(upper[0]), float(lower[1]), float(upper[1]))
+
+
+class AccuracyEvaluator:
+    """
+    Simulates every grid cell x noise trial as one batched array computation:
+    expected RSSI from the converter's path-loss model plus log-normal
+    shadowing, RSSI -> distance, and the vectorized batch trilateration.
+    Cells are processed in chunks so memory stays bounded.
+    """
+
+    def __init__(self,
+                 converter,
+                 k: Optional[int] = None,
+                 chunk_rows: int = 200000,
+                 max_iterations: int = 20,
+                 percentiles: Sequence[float] = (50, 90, 95)):
+        """
+        Initialize the evaluator.
+
+        Args:
+            converter: RSSIConverter supplying the path-loss and shadowing model
+            k: Solve each trial on the k sensors with the shortest measured
+               distance (like the sparse solver); None uses every sensor
+            chunk_rows: Maximum cell x trial rows simulated at once
+            max_iterations: Levenberg-Marquardt iterations per solve
+            percentiles: Error percentiles reported per cell
+        """
+        self.converter = converter
+        self.k = k
+        self.chunk_rows = chunk_rows
+        self.max_iterations = max_iterations
+        self.percentiles = tuple(float(p) for p in percentiles)
+
+    @staticmethod
+    def grid(bounds: Bounds, resolution: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Cell centres along x and y covering bounds at the given resolution."""
+        xmin, xmax, ymin, ymax = bounds
+        xs = np.arange(xmin, xmax + resolution / 2, resolution)
+        ys = np.arange(ymin, ymax + resolution / 2, resolution)
+        return xs, ys
+
+    def gdop(self, points: np.ndarray, sensors: np.ndarray) -> np.ndarray:
+        """
+        Geometric dilution of precision of range measurements at many points.
+
+        GDOP = sqrt(trace((H^T H)^-1)) with H the unit vectors from each point
+        to its sensors (the k nearest if k is set); inf where the geometry is
+        degenerate.
+
+        Args:
+            points: (N, 2) positions
+            sensors: (M, 2) sensor positions
+
+        Returns:
+            (N,) GDOP values
+        """
+        offsets = points[:, None, :] - sensors[None, :, :]
+        ranges = np.sqrt(np.sum(offsets ** 2, axis=2))
+        if self.k is not None and self.k < len(sensors):
+            nearest = np.argpartition(ranges, self.k - 1, axis=1)[:, :self.k]
+            offsets = np.take_along_axis(offsets, nearest[..., None], axis=1)
+            ranges = np.take_along_axis(ranges, nearest, axis=1)
+        unit = offsets / np.maximum(ranges, 1e-9)[..., None]
+        hth = np.einsum('nmi,nmj->nij', unit, unit)
+        det = hth[:, 0, 0] * hth[:, 1, 1] - hth[:, 0, 1] * hth[:, 1, 0]
+        # trace of the 2x2 inverse is trace / det
+        with np.errstate(divide='ignore', invalid='ignore'):
+            gdop = np.sqrt((hth[:, 0, 0] + hth[:, 1, 1]) / det)
+        return np.where(det > 1e-12, gdop, np.inf)
+
+    def evaluate(self,
+                 sensor_positions: Dict[str, Tuple[float, float]],
+                 bounds: Optional[Bounds] = None,
+                 resolution: float = 1.0,
+                 trials: int = 100,
+                 seed: Optional[int] = 0) -> AccuracyMap:
+        """
+        Compute the accuracy map of one sensor layout.
+
+        Args:
+            sensor_positions: {sensor_id: (x, y)} layout to evaluate
+            bounds: (xmin, xmax, ymin, ymax) of the area; defaults to the sensors' bounding box
+            resolution: Grid spacing in meters
+            trials: Noise realizations per cell
+            seed: Seed of the shadowing draws (same seed gives comparable layouts)
+
+        Returns:
+            The AccuracyMap of the layout
+        """
+        sensors = np.array(list(sensor_positions.values()), dtype=float)
+        engine = TrilaterationEngine([tuple(p) for p in sensors])
+        xs, ys = self.grid(bounds or layout_bounds([sensor_positions]), resolution)
+        grid_x, grid_y = np.meshgrid(xs, ys)
+        cells = np.column_stack([grid_x.ravel(), grid_y.ravel()])
+        n_cells, n_sensors = len(cells), len(sensors)
+        k = self.k if self.k is not None and self.k < n_sensors else None
+
+        # Unclamped: like simulate_rssi_matrix, shadowing is added first and the noise floor applied after
+        expected_rssi = self.converter.tx_power_dBm - self.converter.path_loss_matrix(cells, sensors)
+        sigma = self.converter.shadowing_std_dev_dB
+        rng = np.random.default_rng(seed)
+
+        mean_error = np.empty(n_cells)
+        percentile_errors = {p: np.empty(n_cells) for p in self.percentiles}
+        converged_fraction = np.empty(n_cells)
+
+        cells_per_chunk = max(1, self.chunk_rows // trials)
+        for start in range(0, n_cells, cells_per_chunk):
+            stop = min(start + cells_per_chunk, n_cells)
+            n = stop - start
+
+            # (cells, trials, sensors) noisy RSSI, flattened to one row per trial
+            rssi = expected_rssi[start:stop, None, :] - rng.normal(0.0, sigma, size=(n, trials, n_sensors))
+            rssi = np.maximum(rssi, self.converter.noise_floor_dBm).reshape(n * trials, n_sensors)
+            distances = self.converter.rssi_to_distance_matrix(rssi)
+
+            if k is None:
+                estimated, _, converged = engine.estimate_positions_batch(
+                    distances, max_iterations=self.max_iterations, fallback=False
+                )
+            else:
+                columns = np.argpartition(distances, k - 1, axis=1)[:, :k]
+                estimated, _, converged = engine.estimate_positions_batch(
+                    np.take_along_axis(distances, columns, axis=1),
+                    max_iterations=self.max_iterations, fallback=False, sensor_columns=columns
+                )
+
+            truth = np.repeat(cells[start:stop], trials, axis=0)
+            errors = np.sqrt(np.sum((estimated - truth) ** 2, axis=1)).reshape(n, trials)
+            mean_error[start:stop] = errors.mean(axis=1)
+            for percentile, values in zip(self.percentiles, np.percentile(errors, self.percentiles, axis=1)):
+                percentile_errors[percentile][start:stop] = values
+            converged_fraction[start:stop] = converged.reshape(n, trials).mean(axis=1)
+
+        shape = grid_x.shape
+        return AccuracyMap(
+            sensor_positions, xs, ys,
+            mean_error.reshape(shape),
+            {p: errors.reshape(shape) for p, errors in percentile_errors.items()},
+            self.gdop(cells, sensors).reshape(shape),
+            converged_fraction.reshape(shape),
+            trials
+        )
+
+    def compare_layouts(self,
+                        layouts: Dict[str, Dict[str, Tuple[float, float]]],
+                        bounds: Optional[Bounds] = None,
+                        resolution: float = 1.0,
+                        trials: int = 100,
+                        seed: Optional[int] = 0) -> Dict[str, AccuracyMap]:
+        """
+        Evaluate candidate layouts on the same grid with the same noise seed.
+
+        Args:
+            layouts: {layout name: {sensor_id: (x, y)}}
+            bounds: Common area; defaults to the bounding box of all layouts
+
+        Returns:
+            {layout name: AccuracyMap}, in the order given
+        """
+        bounds = bounds or layout_bounds(list(layouts.values()))
+        return {
+            name: self.evaluate(layout, bounds, resolution, trials, seed)
+            for name, layout in layouts.items()
+        }
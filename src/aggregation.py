@@ -0,0 +1,337 @@
+"""
+Sliding-window RSSI aggregation with per-(device, sensor) ring buffers.
+"""
+
+import time
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+STATISTICS = ("median", "ema", "latest")
+
+
+class RSSIAggregator:
+    """
+    Keeps the last `window` RSSI samples of every device at every sensor in
+    preallocated NumPy ring buffers, together with a running median, EMA and
+    sample count that are updated as samples arrive. Devices are rows and
+    sensors are columns, so a statistic for all devices is a plain slice.
+    """
+
+    def __init__(self,
+                 sensor_ids: Sequence[str] = (),
+                 window: int = 16,
+                 ema_alpha: float = 0.3,
+                 stale_after: Optional[float] = 300.0,
+                 max_devices: int = 100000,
+                 initial_capacity: int = 256):
+        """
+        Initialize the aggregator.
+
+        Args:
+            sensor_ids: Sensors known up front (others are added when first seen)
+            window: Samples kept per device-sensor pair
+            ema_alpha: Weight of a new sample in the exponential moving average
+            stale_after: Seconds without a sample after which a device is dropped
+                         (None keeps devices until max_devices forces eviction)
+            max_devices: Upper bound on tracked devices; the least recently seen
+                         devices are evicted beyond it
+            initial_capacity: Device rows allocated up front (doubled as needed)
+        """
+        self.window = window
+        self.ema_alpha = ema_alpha
+        self.stale_after = stale_after
+        self.max_devices = max_devices
+
+        self.sensor_ids: List[str] = []
+        self._columns: Dict[str, int] = {}
+        self.device_ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+
+        self._allocate(min(initial_capacity, max_devices), 0)
+        for sensor_id in sensor_ids:
+            self._column(sensor_id)
+
+    def __len__(self) -> int:
+        return len(self.device_ids)
+
+    def _allocate(self, capacity: int, n_sensors: int) -> None:
+        """(Re)allocate the buffers, copying the rows and columns in use."""
+        old = getattr(self, '_samples', None)
+        samples = np.full((capacity, n_sensors, self.window), np.nan)
+        head = np.zeros((capacity, n_sensors), dtype=np.int32)
+        count = np.zeros((capacity, n_sensors), dtype=np.int64)
+        ema = np.full((capacity, n_sensors), np.nan)
+        median = np.full((capacity, n_sensors), np.nan)
+        last_seen = np.full(capacity, -np.inf)
+        if old is not None:
+            rows, cols = len(self.device_ids), old.shape[1]
+            samples[:rows, :cols] = old[:rows]
+            head[:rows, :cols] = self._head[:rows]
+            count[:rows, :cols] = self.count[:rows]
+            ema[:rows, :cols] = self.ema[:rows]
+            median[:rows, :cols] = self.median[:rows]
+            last_seen[:rows] = self.last_seen[:rows]
+        self._samples, self._head, self.count = samples, head, count
+        self.ema, self.median, self.last_seen = ema, median, last_seen
+
+    def _column(self, sensor_id: str) -> int:
+        column = self._columns.get(sensor_id)
+        if column is None:
+            column = self._columns[sensor_id] = len(self.sensor_ids)
+            self.sensor_ids.append(sensor_id)
+            self._allocate(len(self._samples), len(self.sensor_ids))
+        return column
+
+    def _row(self, device_id: str) -> int:
+        row = self._rows.get(device_id)
+        if row is None:
+            if len(self.device_ids) == len(self._samples):
+                self._allocate(min(max(2 * len(self._samples), 1), self.max_devices), len(self.sensor_ids))
+            row = self._rows[device_id] = len(self.device_ids)
+            self.device_ids.append(device_id)
+        return row
+
+    def add(self,
+            device_ids: Sequence[str],
+            sensor_ids: Sequence[str],
+            rssi: np.ndarray,
+            timestamps: Optional[np.ndarray] = None) -> int:
+        """
+        Fold a batch of samples into the buffers and statistics.
+
+        Samples of the same pair are applied in timestamp order (arrival order
+        for ties); the median is recomputed once per touched pair.
+
+        Args:
+            device_ids: Device of each sample
+            sensor_ids: Sensor of each sample
+            rssi: (N,) RSSI values in dBm
+            timestamps: (N,) sample times in seconds (default: now)
+
+        Returns:
+            Number of samples added (non-finite RSSI values are skipped)
+        """
+        rssi = np.asarray(rssi, dtype=float).ravel()
+        n = len(rssi)
+        if n == 0:
+            return 0
+        if timestamps is None:
+            timestamps = np.full(n, time.time())
+        timestamps = np.broadcast_to(np.asarray(timestamps, dtype=float), (n,))
+        valid = np.isfinite(rssi)
+        if not valid.all():
+            device_ids = [d for d, ok in zip(device_ids, valid) if ok]
+            sensor_ids = [s for s, ok in zip(sensor_ids, valid) if ok]
+            rssi, timestamps = rssi[valid], timestamps[valid]
+            n = len(rssi)
+            if n == 0:
+                return 0
+
+        batch_devices = set(device_ids)
+        if len(batch_devices) > self.max_devices:
+            raise ValueError(f"Batch holds {len(batch_devices)} devices, more than max_devices={self.max_devices}")
+        known = [self._rows[device_id] for device_id in batch_devices if device_id in self._rows]
+        self._evict(len(batch_devices) - len(known), protected=known)
+        cols = np.array([self._column(sensor_id) for sensor_id in sensor_ids], dtype=np.int64)
+        rows = np.array([self._row(device_id) for device_id in device_ids], dtype=np.int64)
+
+        # Group samples by pair (time-ordered within a pair) and apply them in rounds:
+        # round r holds the r-th sample of every pair, so each pair appears at most once per round
+        pairs = rows * len(self.sensor_ids) + cols
+        order = np.lexsort((np.arange(n), timestamps, pairs))
+        sorted_pairs = pairs[order]
+        starts = np.r_[0, np.flatnonzero(np.diff(sorted_pairs)) + 1]
+        rank = np.arange(n) - np.repeat(starts, np.diff(np.r_[starts, n]))
+        by_rank = order[np.argsort(rank, kind='stable')]
+        bounds = np.r_[0, np.cumsum(np.bincount(rank))]
+
+        alpha = self.ema_alpha
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            sel = by_rank[start:stop]
+            r, c, value = rows[sel], cols[sel], rssi[sel]
+            h = self._head[r, c]
+            self._samples[r, c, h] = value
+            self._head[r, c] = (h + 1) % self.window
+            previous = self.ema[r, c]
+            self.ema[r, c] = np.where(self.count[r, c] == 0, value, alpha * value + (1 - alpha) * previous)
+            self.count[r, c] += 1
+
+        touched = order[starts]
+        r, c = rows[touched], cols[touched]
+        ordered = np.sort(self._samples[r, c], axis=1)  # NaN (empty slots) sort last
+        filled = np.minimum(self.count[r, c], self.window)
+        index = np.arange(len(r))
+        self.median[r, c] = (ordered[index, (filled - 1) // 2] + ordered[index, filled // 2]) / 2
+        np.maximum.at(self.last_seen, rows, np.where(np.isfinite(timestamps), timestamps, -np.inf))
+
+        if self.stale_after is not None:
+            self.drop_stale(float(np.nanmax(timestamps)))
+        return n
+
+    def add_frame(self, frame: "pd.DataFrame") -> int:
+        """
+        Fold the rows of a measurement DataFrame (timestamp, device_id,
+        sensor_id, rssi columns, as produced by RSSIDataReader) into the buffers.
+        """
+        if frame.empty:
+            return 0
+        timestamps = frame['timestamp'].to_numpy(dtype='datetime64[ns]')
+        seconds = timestamps.astype(np.int64) / 1e9
+        seconds[np.isnat(timestamps)] = time.time()
+        return self.add(
+            frame['device_id'].astype(str).tolist(),
+            frame['sensor_id'].astype(str).tolist(),
+            frame['rssi'].to_numpy(dtype=float),
+            seconds
+        )
+
+    def _keep_rows(self, keep: np.ndarray) -> int:
+        """Compact the buffers to the rows where keep is True; returns the number removed."""
+        removed = int(np.count_nonzero(~keep))
+        if removed:
+            kept = np.flatnonzero(keep)
+            size = len(kept)
+            self.device_ids = [self.device_ids[row] for row in kept]
+            self._rows = {device_id: row for row, device_id in enumerate(self.device_ids)}
+            for array in (self._samples, self._head, self.count, self.ema, self.median, self.last_seen):
+                array[:size] = array[kept]
+            self._samples[size:] = np.nan
+            self._head[size:] = 0
+            self.count[size:] = 0
+            self.ema[size:] = np.nan
+            self.median[size:] = np.nan
+            self.last_seen[size:] = -np.inf
+        return removed
+
+    def _evict(self, needed: int, protected: Sequence[int] = ()) -> int:
+        """
+        Drop the least recently seen devices to make room for `needed` new ones,
+        never evicting the `protected` rows (devices of the batch being added).
+        """
+        size = len(self.device_ids)
+        excess = size + needed - self.max_devices
+        if excess <= 0:
+            return 0
+        last_seen = self.last_seen[:size].copy()
+        last_seen[np.asarray(protected, dtype=np.int64)] = np.inf
+        keep = np.ones(size, dtype=bool)
+        keep[np.argsort(last_seen, kind='stable')[:excess]] = False
+        return self._keep_rows(keep)
+
+    def drop_stale(self, now: float) -> int:
+        """
+        Remove devices without a sample for more than stale_after seconds.
+
+        Args:
+            now: Current time in seconds
+
+        Returns:
+            Number of devices removed
+        """
+        if self.stale_after is None:
+            return 0
+        return self._keep_rows((now - self.last_seen[:len(self.device_ids)]) <= self.stale_after)
+
+    def reset_sensor(self, sensor_id: str) -> None:
+        """Forget every sample of one sensor (e.g. after its capture file was rewritten)."""
+        column = self._columns.get(sensor_id)
+        if column is None:
+            return
+        self._samples[:, column] = np.nan
+        self._head[:, column] = 0
+        self.count[:, column] = 0
+        self.ema[:, column] = np.nan
+        self.median[:, column] = np.nan
+
+    def _latest(self, rows) -> np.ndarray:
+        """Most recent sample of each pair in the given rows (NaN where none)."""
+        head = self._head[rows]
+        return np.take_along_axis(self._samples[rows], ((head - 1) % self.window)[..., None], axis=-1)[..., 0]
+
+    def _statistic(self, statistic: str, rows) -> np.ndarray:
+        if statistic == "median":
+            return self.median[rows]
+        if statistic == "ema":
+            return self.ema[rows]
+        if statistic == "latest":
+            return self._latest(rows)
+        raise ValueError(f"Unknown RSSI statistic: {statistic} (expected one of {STATISTICS})")
+
+    def snapshot(self,
+                 statistic: str = "median",
+                 active_within: Optional[float] = None,
+                 now: Optional[float] = None,
+                 device_ids: Optional[Sequence[str]] = None) -> Tuple[List[str], List[str], np.ndarray]:
+        """
+        Aggregated RSSI of every active device at every sensor as one matrix.
+
+        Args:
+            statistic: "median", "ema" or "latest"
+            active_within: Only devices seen within this many seconds of `now`
+                           (None returns every tracked device)
+            now: Reference time in seconds (default: the newest sample seen)
+            device_ids: Restrict the snapshot to these devices (unknown ones are skipped)
+
+        Returns:
+            Tuple of (device_ids, sensor_ids, matrix) where matrix has shape
+            (len(device_ids), len(sensor_ids)) and NaN where a sensor has not
+            heard a device
+        """
+        size = len(self.device_ids)
+        if device_ids is not None:
+            rows = np.array([self._rows[d] for d in dict.fromkeys(device_ids) if d in self._rows], dtype=np.int64)
+        else:
+            rows = np.arange(size)
+        if active_within is not None:
+            last_seen = self.last_seen[:size]
+            if now is None:
+                now = float(last_seen.max()) if size else 0.0
+            rows = rows[now - last_seen[rows] <= active_within]
+        matrix = self._statistic(statistic, rows)
+        return [self.device_ids[row] for row in rows], list(self.sensor_ids), matrix
+
+    def device_stats(self, device_id: str) -> Dict[str, Dict[str, float]]:
+        """
+        Window statistics of one device.
+
+        Returns:
+            Dictionary mapping sensor IDs that heard the device to
+            {'median', 'ema', 'latest', 'count' (samples in the window), 'total'}
+        """
+        row = self._rows.get(device_id)
+        if row is None:
+            return {}
+        latest = self._latest(row)
+        stats = {}
+        for column, sensor_id in enumerate(self.sensor_ids):
+            total = int(self.count[row, column])
+            if total:
+                stats[sensor_id] = {
+                    'median': float(self.median[row, column]),
+                    'ema': float(self.ema[row, column]),
+                    'latest': float(latest[column]),
+                    'count': min(total, self.window),
+                    'total': total
+                }
+        return stats
+
+    def device_samples(self, device_id: str) -> Dict[str, List[float]]:
+        """
+        The samples currently in the window of one device, oldest first.
+
+        Returns:
+            Dictionary mapping sensor IDs to at most `window` RSSI values
+        """
+        row = self._rows.get(device_id)
+        if row is None:
+            return {}
+        samples = {}
+        for column, sensor_id in enumerate(self.sensor_ids):
+            total = int(self.count[row, column])
+            if total:
+                buffer = np.roll(self._samples[row, column], -int(self._head[row, column]))
+                samples[sensor_id] = buffer[-min(total, self.window):].tolist()
+        return samples
@@ -0,0 +1,429 @@
+"""
+Offline batch localization of archived capture sets.
+
+Every directory under the archive root that holds airodump-ng captures named
+with "Konum_x,y" is one capture set. Its Station rows are grouped into fixed
+time windows, averaged per (device, sensor), converted to distances and
+trilaterated. The work is split into (capture set, time range) tasks that run
+on a process pool; results are appended to one binary file per column in the
+output directory, and a checkpoint records finished tasks so an interrupted
+run resumes where it stopped.
+
+Usage:
+    python -m src.batch_localize ARCHIVE_DIR OUTPUT_DIR [--window 10] [--workers 8]
+"""
+
+import argparse
+import json
+import os
+import signal
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+import numpy as np
+
+from .capture_cache import encode_devices
+from .reader import RSSIDataReader, parse_capture_filename
+from .rssi_to_distance import RSSIConverter
+from .trilateration import TrilaterationEngine
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+CHECKPOINT_FILE = "checkpoint.json"
+
+# Output column -> dtype; each column is stored raw in <name>.bin
+OUTPUT_COLUMNS = {
+    'capture_set': np.int32,   # index into checkpoint["capture_sets"]
+    'window_start': np.int64,  # nanoseconds since the epoch
+    'device': np.int32,        # index into checkpoint["devices"]
+    'x': np.float64,
+    'y': np.float64,
+    'cost': np.float64,
+    'n_sensors': np.int16,
+    'converged': np.bool_,
+}
+
+# Per-process state of pool workers, set by _init_worker
+_worker_config: Dict = {}
+_worker_cache: Dict[str, str] = {}     # 'archive_dir' and 'cache_dir' (captures are cached outside the archive)
+_worker_readers: Dict[str, RSSIDataReader] = {}
+
+
+class CheckpointMismatch(ValueError):
+    """Raised when the output directory holds a checkpoint written with different settings."""
+
+
+def find_capture_sets(archive_dir: str) -> List[str]:
+    """
+    Find the capture set directories below archive_dir (including itself).
+
+    Returns:
+        Sorted list of directories holding at least one "Konum_x,y" capture
+    """
+    capture_sets = []
+    for dirpath, dirnames, filenames in os.walk(archive_dir):
+        # Skip .capture_cache and other hidden directories
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith('.'))
+        if any(name.endswith('.csv') and parse_capture_filename(name) for name in filenames):
+            capture_sets.append(dirpath)
+    return sorted(capture_sets)
+
+
+def _init_worker(config: Dict, archive_dir: str, cache_dir: str) -> None:
+    # Ctrl-C is handled by the parent, which checkpoints and stops the pool
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _worker_config.clear()
+    _worker_config.update(config)
+    _worker_cache.update(archive_dir=archive_dir, cache_dir=cache_dir)
+    _worker_readers.clear()
+
+
+def _get_reader(capture_set: str) -> RSSIDataReader:
+    """Loaded reader for a capture set; only the most recent set is kept per process."""
+    reader = _worker_readers.get(capture_set)
+    if reader is None:
+        _worker_readers.clear()
+        relative = os.path.relpath(capture_set, _worker_cache['archive_dir'])
+        reader = RSSIDataReader(capture_set, cache_dir=os.path.normpath(
+            os.path.join(_worker_cache['cache_dir'], relative)))
+        reader.load_all_data()
+        _worker_readers[capture_set] = reader
+    return reader
+
+
+def _scan_capture_set(capture_set: str) -> List[int]:
+    """
+    Parse a capture set (filling its capture cache) and list its time windows.
+
+    Returns:
+        Sorted start times (ns) of the windows that contain measurements
+    """
+    reader = _get_reader(capture_set)
+    window_ns = _worker_config['window_ns']
+    starts = set()
+    for frame in reader.data.values():
+        timestamps = frame['timestamp'].to_numpy('datetime64[ns]').view(np.int64)
+        starts.update(np.unique(timestamps - timestamps % window_ns).tolist())
+    return sorted(starts)
+
+
+def _localize_range(capture_set: str, start_ns: int, end_ns: int) -> Dict:
+    """
+    Localize every device in each window of [start_ns, end_ns) of a capture set.
+
+    Returns:
+        Dictionary of result columns; device IDs are returned as strings
+    """
+    import pandas as pd
+
+    reader = _get_reader(capture_set)
+    window_ns = _worker_config['window_ns']
+
+    frames = []
+    for frame in reader.data.values():
+        timestamps = frame['timestamp'].to_numpy('datetime64[ns]').view(np.int64)
+        in_range = (timestamps >= start_ns) & (timestamps < end_ns)
+        if in_range.any():
+            selected = frame[in_range]
+            frames.append(pd.DataFrame({
+                'window_start': timestamps[in_range] - timestamps[in_range] % window_ns,
+                'device_id': selected['device_id'].astype(str).to_numpy(),
+                'sensor_id': selected['sensor_id'].to_numpy(),
+                'rssi': selected['rssi'].to_numpy(dtype=float),
+            }))
+    if not frames or len(reader.sensor_positions) < 3:
+        return {'window_start': np.zeros(0, dtype=np.int64), 'device_ids': []}
+
+    # Mean RSSI per (window, device, sensor) as one row per (window, device)
+    rssi = pd.concat(frames).groupby(['window_start', 'device_id', 'sensor_id'])['rssi'].mean()
+    sensor_ids = sorted(reader.sensor_positions)
+    matrix = rssi.unstack('sensor_id').reindex(columns=sensor_ids)
+
+    converter = RSSIConverter(**_worker_config['converter'])
+    converter.set_sensor_positions(reader.sensor_positions)
+    engine = TrilaterationEngine([reader.sensor_positions[s] for s in sensor_ids], sensor_ids=sensor_ids)
+
+    distances = converter.rssi_to_distance_matrix(matrix.to_numpy(dtype=float))
+    measurements = [
+        {sensor_id: d for sensor_id, d in zip(sensor_ids, row) if np.isfinite(d)}
+        for row in distances
+    ]
+    k = _worker_config['k']
+    positions, cost, converged = engine.estimate_positions_sparse(measurements, k=k)
+    k = max(k, 3)  # The solver never uses fewer than 3 sensors
+    return {
+        'window_start': matrix.index.get_level_values('window_start').to_numpy(dtype=np.int64),
+        'device_ids': matrix.index.get_level_values('device_id').tolist(),
+        'x': positions[:, 0],
+        'y': positions[:, 1],
+        'cost': cost,
+        'n_sensors': np.minimum(np.isfinite(distances).sum(axis=1), k),
+        'converged': converged,
+    }
+
+
+def _plan_tasks(window_starts: List[int], window_ns: int, windows_per_task: int) -> List[Tuple[int, int]]:
+    """Group a capture set's windows into [start, end) time ranges of at most windows_per_task windows."""
+    return [
+        (chunk[0], chunk[-1] + window_ns)
+        for chunk in (window_starts[i:i + windows_per_task] for i in range(0, len(window_starts), windows_per_task))
+    ]
+
+
+class _ColumnWriter:
+    """Appends result batches to the per-column files of the output directory."""
+
+    def __init__(self, output_dir: str, rows: int):
+        self.files = {}
+        for name, dtype in OUTPUT_COLUMNS.items():
+            path = os.path.join(output_dir, f"{name}.bin")
+            f = open(path, 'r+b' if os.path.exists(path) else 'w+b')
+            # Drop rows written after the last checkpoint; their tasks are redone
+            f.truncate(rows * np.dtype(dtype).itemsize)
+            f.seek(0, os.SEEK_END)
+            self.files[name] = f
+
+    def append(self, columns: Dict[str, np.ndarray]) -> None:
+        for name, dtype in OUTPUT_COLUMNS.items():
+            self.files[name].write(np.ascontiguousarray(columns[name], dtype=dtype).tobytes())
+
+    def flush(self) -> None:
+        for f in self.files.values():
+            f.flush()
+            os.fsync(f.fileno())
+
+    def close(self) -> None:
+        for f in self.files.values():
+            f.close()
+
+
+def _write_checkpoint(output_dir: str, checkpoint: Dict) -> None:
+    path = os.path.join(output_dir, CHECKPOINT_FILE)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, path)
+
+
+def _load_checkpoint(output_dir: str) -> Optional[Dict]:
+    try:
+        with open(os.path.join(output_dir, CHECKPOINT_FILE), 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def run(archive_dir: str,
+        output_dir: str,
+        window: float = 10.0,
+        workers: Optional[int] = None,
+        windows_per_task: int = 30,
+        k: int = 4,
+        converter_params: Optional[Dict] = None,
+        checkpoint_interval: float = 5.0,
+        progress_interval: float = 2.0,
+        restart: bool = False,
+        cache_dir: Optional[str] = None) -> Dict:
+    """
+    Localize every device in every time window of an archive of capture sets.
+
+    Args:
+        archive_dir: Root directory of the capture sets
+        output_dir: Directory receiving the column files and checkpoint
+        window: Window length in seconds
+        workers: Number of worker processes (default: all cores)
+        windows_per_task: Number of windows localized per task
+        k: Number of sensors each device is solved on
+        converter_params: Keyword arguments for RSSIConverter
+        checkpoint_interval: Seconds between checkpoints
+        progress_interval: Seconds between progress lines on stderr
+        restart: Discard an existing checkpoint instead of resuming
+        cache_dir: Root of the parsed-capture caches, one sub-directory per
+                   capture set (default: output_dir/.capture_cache); the
+                   archive itself is only read
+
+    Ctrl-C stops queuing tasks, waits for the running ones and checkpoints;
+    calling run() again with the same settings resumes.
+
+    Returns:
+        The final checkpoint (tasks, counts and the device/capture set
+        dictionaries); len(checkpoint["done"]) < len(checkpoint["tasks"]) if
+        the run was interrupted
+
+    Raises:
+        CheckpointMismatch: If output_dir holds a run with other settings and
+                            restart is False
+    """
+    config = {
+        'window_ns': int(round(window * 1e9)),
+        'k': k,
+        'converter': dict(converter_params or {}),
+        'windows_per_task': windows_per_task,
+    }
+    workers = workers or os.cpu_count() or 1
+    os.makedirs(output_dir, exist_ok=True)
+    cache_dir = cache_dir or os.path.join(output_dir, ".capture_cache")
+
+    checkpoint = None if restart else _load_checkpoint(output_dir)
+    if checkpoint is not None and checkpoint['config'] != config:
+        raise CheckpointMismatch(f"{output_dir} holds a run with different settings; restart it to overwrite")
+
+    started = time.time()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(config, archive_dir, cache_dir)) as pool:
+        if checkpoint is None:
+            capture_sets = find_capture_sets(archive_dir)
+            tasks = []
+            for set_index, window_starts in enumerate(pool.map(_scan_capture_set, capture_sets)):
+                tasks.extend([set_index, start, end] for start, end in
+                             _plan_tasks(window_starts, config['window_ns'], windows_per_task))
+            checkpoint = {
+                'config': config,
+                'capture_sets': capture_sets,
+                'tasks': tasks,
+                'done': [],
+                'rows': 0,
+                'devices': [],
+            }
+            _write_checkpoint(output_dir, checkpoint)
+
+        capture_sets, tasks = checkpoint['capture_sets'], checkpoint['tasks']
+        done = set(checkpoint['done'])
+        pending = [i for i in range(len(tasks)) if i not in done]
+        devices = checkpoint['devices']
+        rows = checkpoint['rows']
+        writer = _ColumnWriter(output_dir, rows)
+
+        def save_checkpoint():
+            writer.flush()
+            checkpoint.update(done=sorted(done), rows=rows, devices=devices)
+            _write_checkpoint(output_dir, checkpoint)
+
+        in_flight = {}
+        next_task = 0
+        interrupted = False
+        last_checkpoint = last_progress = time.time()
+        rows_at_start = rows
+        try:
+            while in_flight or (next_task < len(pending) and not interrupted):
+                # Keep a bounded number of tasks queued so results stream out as they finish
+                while not interrupted and next_task < len(pending) and len(in_flight) < 4 * workers:
+                    task_index = pending[next_task]
+                    set_index, start_ns, end_ns = tasks[task_index]
+                    future = pool.submit(_localize_range, capture_sets[set_index], start_ns, end_ns)
+                    in_flight[future] = task_index
+                    next_task += 1
+
+                try:
+                    finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                except KeyboardInterrupt:
+                    # Drop queued tasks, let running ones finish and checkpoint them
+                    print("Interrupted, finishing running tasks...", file=sys.stderr, flush=True)
+                    interrupted = True
+                    for future in list(in_flight):
+                        if future.cancel():
+                            del in_flight[future]
+                    continue
+
+                for future in finished:
+                    task_index = in_flight.pop(future)
+                    result = future.result()
+                    n = len(result['device_ids'])
+                    if n:
+                        devices, codes = encode_devices(result['device_ids'], devices)
+                        result['device'] = codes
+                        result['capture_set'] = np.full(n, tasks[task_index][0])
+                        writer.append(result)
+                        rows += n
+                    done.add(task_index)
+
+                now = time.time()
+                if now - last_checkpoint >= checkpoint_interval:
+                    save_checkpoint()
+                    last_checkpoint = now
+                if now - last_progress >= progress_interval:
+                    _report_progress(len(done), len(tasks), rows - rows_at_start, now - started)
+                    last_progress = now
+            save_checkpoint()
+        finally:
+            writer.close()
+
+    _report_progress(len(done), len(tasks), rows - rows_at_start, time.time() - started)
+    return checkpoint
+
+
+def _report_progress(done: int, total: int, new_rows: int, elapsed: float) -> None:
+    percent = 100.0 * done / total if total else 100.0
+    rate = new_rows / elapsed if elapsed > 0 else 0.0
+    print(f"[{done}/{total} tasks, {percent:.1f}%] {new_rows} positions in {elapsed:.1f}s ({rate:.0f}/s)",
+          file=sys.stderr, flush=True)
+
+
+def load_results(output_dir: str) -> "pd.DataFrame":
+    """
+    Read the output of a (possibly still running) batch run.
+
+    Returns:
+        DataFrame with capture_set, window_start, device_id, x, y, cost,
+        n_sensors and converged columns, up to the last checkpoint
+    """
+    import pandas as pd
+
+    checkpoint = _load_checkpoint(output_dir)
+    if checkpoint is None:
+        raise FileNotFoundError(f"No batch localization output in {output_dir}")
+    rows = checkpoint['rows']
+    columns = {
+        name: np.fromfile(os.path.join(output_dir, f"{name}.bin"), dtype=dtype, count=rows)
+        for name, dtype in OUTPUT_COLUMNS.items()
+    }
+    return pd.DataFrame({
+        'capture_set': pd.Categorical.from_codes(columns['capture_set'], categories=checkpoint['capture_sets']),
+        'window_start': columns['window_start'].view('datetime64[ns]'),
+        'device_id': pd.Categorical.from_codes(columns['device'], categories=checkpoint['devices']),
+        'x': columns['x'],
+        'y': columns['y'],
+        'cost': columns['cost'],
+        'n_sensors': columns['n_sensors'],
+        'converged': columns['converged'],
+    })
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Localize devices in archived capture sets per time window.")
+    parser.add_argument("archive_dir", help="Root directory of the capture sets")
+    parser.add_argument("output_dir", help="Directory for the column files and checkpoint")
+    parser.add_argument("--window", type=float, default=10.0, help="Window length in seconds (default: 10)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--windows-per-task", type=int, default=30, help="Windows per task (default: 30)")
+    parser.add_argument("-k", type=int, default=4, help="Sensors used per device (default: 4)")
+    parser.add_argument("--path-loss-exponent", type=float, default=2.3)
+    parser.add_argument("--tx-power", type=float, default=20.0, help="Transmit power in dBm")
+    parser.add_argument("--restart", action="store_true", help="Ignore an existing checkpoint and start over")
+    parser.add_argument("--cache-dir", help="Where parsed captures are cached (default: OUTPUT_DIR/.capture_cache)")
+    args = parser.parse_args(argv)
+
+    try:
+        checkpoint = run(
+            args.archive_dir, args.output_dir,
+            window=args.window,
+            workers=args.workers,
+            windows_per_task=args.windows_per_task,
+            k=args.k,
+            converter_params={'path_loss_exponent': args.path_loss_exponent, 'tx_power_dBm': args.tx_power},
+            restart=args.restart,
+            cache_dir=args.cache_dir
+        )
+    except CheckpointMismatch as e:
+        parser.error(str(e))
+    remaining = len(checkpoint['tasks']) - len(checkpoint['done'])
+    if remaining:
+        print(f"Stopped with {remaining} tasks left; run again with the same arguments to resume")
+    print(f"Wrote {checkpoint['rows']} positions for {len(checkpoint['devices'])} devices "
+          f"from {len(checkpoint['capture_sets'])} capture sets to {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""
+Columnar on-disk cache of parsed airodump-ng captures.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import zlib
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from .metrics import FILE_IO_BYTES
+
+CACHE_VERSION = 3
+CRC_CHUNK_BYTES = 1 << 20
+
+
+class CachedCapture:
+    """Parsed Station rows of one capture as (memory-mapped) columns."""
+
+    def __init__(self, meta: Dict, timestamps: np.ndarray, device_codes: np.ndarray,
+                 rssi: np.ndarray, devices: List[str]):
+        self.meta = meta
+        self.timestamps = timestamps
+        self.device_codes = device_codes
+        self.rssi = rssi
+        self.devices = devices
+
+    @property
+    def parsed_bytes(self) -> int:
+        """Number of source bytes (complete lines) covered by the cached rows."""
+        return self.meta['parsed_bytes']
+
+    @property
+    def partial_rows(self) -> int:
+        """Trailing rows parsed from an unterminated last line beyond parsed_bytes."""
+        return self.meta.get('partial_rows', 0)
+
+
+class CaptureCache:
+    """
+    Stores each capture's Station rows as .npy columns: int64 timestamps (ns),
+    int32 dictionary codes for MAC addresses and float64 RSSI, plus the MAC
+    dictionary. Entries are keyed by source path, size and mtime and loaded
+    with mmap_mode='r', so warm starts do not parse or copy the data.
+    """
+
+    def __init__(self, cache_dir: str):
+        """
+        Initialize the cache.
+
+        Args:
+            cache_dir: Directory holding one sub-directory per capture
+        """
+        self.cache_dir = cache_dir
+
+    def _entry_dir(self, file_path: str) -> str:
+        return os.path.join(self.cache_dir, os.path.basename(file_path))
+
+    @staticmethod
+    def _prefix_crc(file_path: str, end: int) -> int:
+        """
+        CRC32 of the first end bytes, used to check a grown file kept its prefix.
+
+        The whole prefix is hashed: airodump-ng rewrites the file in place, so
+        an earlier row can change (e.g. its Power) without changing its length.
+        """
+        crc = 0
+        with open(file_path, 'rb') as f:
+            remaining = end
+            while remaining > 0:
+                chunk = f.read(min(CRC_CHUNK_BYTES, remaining))
+                if not chunk:
+                    break
+                crc = zlib.crc32(chunk, crc)
+                remaining -= len(chunk)
+        FILE_IO_BYTES.inc(end - remaining, kind="capture", direction="read")
+        return crc
+
+    def lookup(self, file_path: str, stat: os.stat_result) -> Tuple[Optional[str], Optional[CachedCapture]]:
+        """
+        Find the cache entry of a capture.
+
+        Args:
+            file_path: Path of the source capture
+            stat: os.stat of the source capture
+
+        Returns:
+            ('hit', entry) if the entry matches the file exactly, ('grown', entry)
+            if the file only had data appended since, or (None, None)
+        """
+        entry_dir = self._entry_dir(file_path)
+        try:
+            with open(os.path.join(entry_dir, 'meta.json'), 'r') as f:
+                meta = json.load(f)
+            if meta.get('version') != CACHE_VERSION or meta.get('source') != os.path.abspath(file_path):
+                return None, None
+
+            if meta['size'] == stat.st_size and meta['mtime_ns'] == stat.st_mtime_ns:
+                status = 'hit'
+            elif stat.st_size > meta['parsed_bytes'] and \
+                    self._prefix_crc(file_path, meta['parsed_bytes']) == meta['prefix_crc']:
+                status = 'grown'
+            else:
+                return None, None
+
+            with open(os.path.join(entry_dir, 'devices.json'), 'r') as f:
+                devices = json.load(f)
+            entry = CachedCapture(
+                meta,
+                np.load(os.path.join(entry_dir, 'timestamps.npy'), mmap_mode='r'),
+                np.load(os.path.join(entry_dir, 'device_codes.npy'), mmap_mode='r'),
+                np.load(os.path.join(entry_dir, 'rssi.npy'), mmap_mode='r'),
+                devices
+            )
+            return status, entry
+        except (OSError, ValueError, KeyError):
+            return None, None
+
+    def store(self, file_path: str, stat: os.stat_result, parsed_bytes: int,
+              timestamps: np.ndarray, device_ids: List[str], rssi: np.ndarray,
+              devices: Optional[List[str]] = None, device_codes: Optional[np.ndarray] = None,
+              prefix_crc: Optional[int] = None, partial_rows: int = 0) -> CachedCapture:
+        """
+        Write (or replace) the cache entry of a capture.
+
+        Args:
+            file_path: Path of the source capture
+            stat: os.stat of the source capture at parse time
+            parsed_bytes: Number of source bytes the rows were parsed from
+            timestamps: int64 nanosecond timestamps
+            device_ids: MAC address of each row (ignored if device_codes is given)
+            rssi: RSSI of each row
+            devices: Existing MAC dictionary when device_codes is given
+            device_codes: Pre-encoded MAC codes into devices
+            prefix_crc: CRC32 of the first parsed_bytes bytes if the caller
+                        already has it (otherwise the file is read again)
+            partial_rows: Number of trailing rows parsed from bytes after
+                          parsed_bytes (an unterminated last line); they are
+                          replaced when the capture grows
+
+        Returns:
+            The stored entry, memory-mapped from disk
+
+        Raises:
+            OSError: If the cache directory cannot be written
+        """
+        if device_codes is None:
+            devices, device_codes = encode_devices(device_ids)
+
+        entry_dir = self._entry_dir(file_path)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Every writer gets its own temporary directory, so concurrent readers of one capture never mix files
+        tmp_dir = tempfile.mkdtemp(prefix=os.path.basename(entry_dir) + '.', suffix='.tmp', dir=self.cache_dir)
+        try:
+            self._write_entry(tmp_dir, file_path, stat, parsed_bytes, timestamps, devices, device_codes,
+                              rssi, prefix_crc, partial_rows)
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            os.replace(tmp_dir, entry_dir)
+        except OSError:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            # Another writer may have replaced the entry first; its files describe the same capture
+            entry = self.lookup(file_path, stat)[1]
+            if entry is None or entry.parsed_bytes != parsed_bytes:
+                raise
+            return entry
+        return self.lookup(file_path, stat)[1]
+
+    def _write_entry(self, tmp_dir: str, file_path: str, stat: os.stat_result, parsed_bytes: int,
+                     timestamps: np.ndarray, devices: List[str], device_codes: np.ndarray, rssi: np.ndarray,
+                     prefix_crc: Optional[int], partial_rows: int) -> None:
+        """Write the column files and meta.json of an entry into tmp_dir."""
+        np.save(os.path.join(tmp_dir, 'timestamps.npy'), np.asarray(timestamps, dtype=np.int64))
+        np.save(os.path.join(tmp_dir, 'device_codes.npy'), np.asarray(device_codes, dtype=np.int32))
+        np.save(os.path.join(tmp_dir, 'rssi.npy'), np.asarray(rssi, dtype=np.float64))
+        with open(os.path.join(tmp_dir, 'devices.json'), 'w') as f:
+            json.dump(list(devices), f)
+        meta = {
+            'version': CACHE_VERSION,
+            'source': os.path.abspath(file_path),
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'parsed_bytes': parsed_bytes,
+            'prefix_crc': self._prefix_crc(file_path, parsed_bytes) if prefix_crc is None else prefix_crc,
+            'partial_rows': partial_rows,
+        }
+        with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+            json.dump(meta, f)
+
+        FILE_IO_BYTES.inc(sum(item.stat().st_size for item in os.scandir(tmp_dir)),
+                          kind="capture_cache", direction="write")
+
+    def extend(self, file_path: str, stat: os.stat_result, entry: CachedCapture, parsed: bytes,
+               timestamps: np.ndarray, device_ids: List[str], rssi: np.ndarray,
+               partial_rows: int = 0) -> CachedCapture:
+        """
+        Append rows parsed from the grown part of a capture to its entry,
+        replacing the entry's rows from a previously unterminated last line.
+
+        Args:
+            file_path: Path of the source capture
+            stat: os.stat of the source capture
+            entry: Entry returned by lookup(..., 'grown')
+            parsed: Source bytes after entry.parsed_bytes that the new rows were
+                    parsed from (complete lines only)
+            timestamps, device_ids, rssi: The new rows
+            partial_rows: How many of the new rows come from an unterminated
+                          last line after `parsed`
+
+        Returns:
+            The updated entry
+        """
+        devices, new_codes = encode_devices(device_ids, entry.devices)
+        kept = len(entry.rssi) - entry.partial_rows
+
+        return self.store(
+            file_path, stat, entry.parsed_bytes + len(parsed),
+            np.concatenate([entry.timestamps[:kept], np.asarray(timestamps, dtype=np.int64)]),
+            [], np.concatenate([entry.rssi[:kept], np.asarray(rssi, dtype=np.float64)]),
+            devices=devices,
+            device_codes=np.concatenate([entry.device_codes[:kept], new_codes]),
+            prefix_crc=zlib.crc32(parsed, entry.meta['prefix_crc']),
+            partial_rows=partial_rows
+        )
+
+
+def encode_devices(device_ids, devices: Optional[List[str]] = None) -> Tuple[List[str], np.ndarray]:
+    """
+    Dictionary-encode MAC addresses.
+
+    Args:
+        device_ids: MAC address of each row
+        devices: Existing dictionary to extend (not modified in place)
+
+    Returns:
+        Tuple of (dictionary of MACs in first-seen order, int32 code per row)
+    """
+    devices = list(devices) if devices is not None else []
+    codes_by_device: Dict[str, int] = {device_id: code for code, device_id in enumerate(devices)}
+    codes = np.empty(len(device_ids), dtype=np.int32)
+    for i, device_id in enumerate(device_ids):
+        code = codes_by_device.get(device_id)
+        if code is None:
+            code = codes_by_device[device_id] = len(devices)
+            devices.append(device_id)
+        codes[i] = code
+    return devices, codes
@@ -0,0 +1,77 @@
+"""
+Sequenced feed of device changes for server-push (SSE) clients.
+"""
+
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+
+class ChangeFeed:
+    """Keeps a bounded, sequence-numbered history of device changes and wakes waiting readers."""
+
+    def __init__(self, history_size: int = 1000):
+        """
+        Initialize the feed.
+
+        Args:
+            history_size: Number of recent changes kept for clients catching up;
+                          clients further behind must resync from the full list
+        """
+        self.sequence = 0
+        self._history: deque = deque(maxlen=history_size)
+        self._condition = threading.Condition()
+
+    def publish(self, devices: List[Dict]) -> int:
+        """
+        Record changed devices and notify readers.
+
+        Args:
+            devices: Device payloads (id, position, measurements, ...)
+
+        Returns:
+            The sequence number assigned to this change
+        """
+        with self._condition:
+            self.sequence += 1
+            self._history.append((self.sequence, devices))
+            self._condition.notify_all()
+            return self.sequence
+
+    def changes_since(self, sequence: int) -> Optional[Tuple[int, List[Dict]]]:
+        """
+        Collect changes after a given sequence number, latest payload per device.
+
+        Args:
+            sequence: Last sequence number the client has applied
+
+        Returns:
+            (latest sequence, changed devices), or None if the client is too far
+            behind (or ahead, e.g. after a server restart) and must resync
+        """
+        with self._condition:
+            return self._collect(sequence)
+
+    def _collect(self, sequence: int) -> Optional[Tuple[int, List[Dict]]]:
+        if sequence > self.sequence:
+            return None
+        if self._history and sequence < self._history[0][0] - 1:
+            return None
+
+        changed: Dict[str, Dict] = {}
+        for seq, devices in self._history:
+            if seq > sequence:
+                for device in devices:
+                    changed[device['id']] = device
+        return self.sequence, list(changed.values())
+
+    def wait(self, sequence: int, timeout: float) -> Optional[Tuple[int, List[Dict]]]:
+        """
+        Block until there are changes after sequence or the timeout expires.
+
+        Returns:
+            Same as changes_since; an empty device list means the wait timed out
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self.sequence != sequence, timeout=timeout)
+            return self._collect(sequence)
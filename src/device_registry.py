@@ -0,0 +1,155 @@
+"""
+Process-wide, in-memory registry of device positions backed by overrides.json.
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Dict, Optional
+from .metrics import FILE_IO_BYTES
+
+
+class DeviceRegistry:
+    """Serves device positions from memory and persists changes with write-behind snapshots."""
+
+    def __init__(self, path: str, flush_delay: float = 0.5, check_interval: float = 1.0):
+        """
+        Initialize the registry and load the backing file once.
+
+        Args:
+            path: Path of the JSON file ({device_id: {"x", "y", "type"}})
+            flush_delay: Seconds to wait after an update before writing a snapshot,
+                         so bursts of updates are coalesced into one write
+            check_interval: Minimum seconds between mtime checks for external edits
+        """
+        self.path = path
+        self.flush_delay = flush_delay
+        self.check_interval = check_interval
+
+        self._lock = threading.RLock()
+        self._devices: Dict[str, Dict] = {}
+        self._dirty = set()
+        self._mtime_ns: Optional[int] = None
+        self._last_check = 0.0
+        self._timer: Optional[threading.Timer] = None
+
+        self._load()
+
+    def _load(self) -> None:
+        """(Re)load the backing file, keeping unsaved local updates on top."""
+        try:
+            mtime_ns = os.stat(self.path).st_mtime_ns
+            with open(self.path, "r") as f:
+                text = f.read()
+            FILE_IO_BYTES.inc(len(text), kind="overrides", direction="read")
+            devices = json.loads(text)
+        except FileNotFoundError:
+            mtime_ns, devices = None, {}
+        except json.JSONDecodeError as e:
+            # File caught mid-edit; keep serving what we have and retry on the next check
+            print(f"Warning: could not parse {self.path}: {e}")
+            return
+
+        for device_id in self._dirty:
+            if device_id in self._devices:
+                devices[device_id] = self._devices[device_id]
+        self._devices = devices
+        self._mtime_ns = mtime_ns
+
+    def _check_external_edit(self) -> None:
+        """Reload the file if someone else modified it since we last read or wrote it."""
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval:
+            return
+        self._last_check = now
+        try:
+            mtime_ns = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            mtime_ns = None
+        if mtime_ns != self._mtime_ns:
+            self._load()
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """
+        Get a copy of all devices.
+
+        Returns:
+            Dictionary mapping device IDs to {"x", "y", "type"} dictionaries
+        """
+        with self._lock:
+            self._check_external_edit()
+            return {device_id: dict(data) for device_id, data in self._devices.items()}
+
+    def get(self, device_id: str) -> Optional[Dict]:
+        """
+        Get a copy of a single device entry.
+
+        Args:
+            device_id: MAC address of the device
+
+        Returns:
+            The device dictionary, or None if the device is unknown
+        """
+        with self._lock:
+            self._check_external_edit()
+            data = self._devices.get(device_id)
+            return dict(data) if data is not None else None
+
+    def update_position(self, device_id: str, x: float, y: float) -> Dict:
+        """
+        Move a device, keeping its type, and schedule a snapshot write.
+
+        Args:
+            device_id: MAC address of the device
+            x: New x coordinate
+            y: New y coordinate
+
+        Returns:
+            The updated device dictionary
+        """
+        with self._lock:
+            self._check_external_edit()
+            current_type = self._devices.get(device_id, {}).get("type", "unknown")
+            self._devices[device_id] = {"x": x, "y": y, "type": current_type}
+            self._dirty.add(device_id)
+            self._schedule_flush()
+            return dict(self._devices[device_id])
+
+    def _schedule_flush(self) -> None:
+        """Start the write-behind timer unless one is already pending."""
+        if self._timer is None:
+            self._timer = threading.Timer(self.flush_delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self) -> None:
+        """Atomically write the current state to disk (temp file + rename)."""
+        with self._lock:
+            self._timer = None
+            if not self._dirty:
+                return
+
+            directory = os.path.dirname(self.path) or "."
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".overrides-", suffix=".tmp")
+            try:
+                text = json.dumps(self._devices, indent=2)
+                with os.fdopen(fd, "w") as f:
+                    f.write(text)
+                FILE_IO_BYTES.inc(len(text), kind="overrides", direction="write")
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+
+            self._mtime_ns = os.stat(self.path).st_mtime_ns
+            self._dirty.clear()
+
+    def close(self) -> None:
+        """Cancel any pending timer and write outstanding updates."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+        self.flush()
@@ -0,0 +1,214 @@
+"""
+Radio-map fingerprinting: localization by nearest neighbours in RSSI space.
+"""
+
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+
+class RadioMap:
+    """Expected RSSI vectors at known locations, indexed by a KD-tree for batched k-NN lookups."""
+
+    def __init__(self,
+                 sensor_ids: List[str],
+                 locations: np.ndarray,
+                 fingerprints: np.ndarray,
+                 grid_shape: Optional[Tuple[int, int]] = None,
+                 model_signature: str = ""):
+        """
+        Initialize the radio map. Usually created through one of the build_* classmethods.
+
+        Args:
+            sensor_ids: Sensor of each fingerprint column
+            locations: (K, 2) array of map point positions
+            fingerprints: (K, M) array of RSSI vectors at those positions
+            grid_shape: (ny, nx) if the points form a regular grid
+            model_signature: Description of the model/layout that generated the map
+        """
+        self.sensor_ids = list(sensor_ids)
+        self.locations = np.asarray(locations, dtype=float)
+        self.fingerprints = np.asarray(fingerprints, dtype=float)
+        self.grid_shape = grid_shape
+        self.model_signature = model_signature
+        self._build_index()
+
+    def _build_index(self) -> None:
+        """(Re)build the KD-tree over the fingerprints."""
+        from scipy.spatial import cKDTree
+        self._tree = cKDTree(self.fingerprints)
+
+    @staticmethod
+    def make_grid(sensor_positions: Dict[str, Tuple[float, float]],
+                  resolution: float = 1.0,
+                  margin: float = 30.0) -> Tuple[np.ndarray, Tuple[int, int]]:
+        """
+        Regular grid covering the sensors plus a margin.
+
+        Returns:
+            Tuple of (ny * nx, 2) grid cell centres and the (ny, nx) shape
+        """
+        positions = np.array(list(sensor_positions.values()), dtype=float)
+        lower = positions.min(axis=0) - margin
+        upper = positions.max(axis=0) + margin
+        xs = np.arange(lower[0], upper[0] + resolution / 2, resolution)
+        ys = np.arange(lower[1], upper[1] + resolution / 2, resolution)
+        grid_x, grid_y = np.meshgrid(xs, ys)
+        return np.column_stack([grid_x.ravel(), grid_y.ravel()]), grid_x.shape
+
+    @classmethod
+    def build_from_model(cls, converter, resolution: float = 1.0, margin: float = 30.0) -> "RadioMap":
+        """
+        Generate the map from the converter's path-loss model on a regular grid.
+
+        Args:
+            converter: RSSIConverter with sensor positions set
+            resolution: Grid spacing in meters
+            margin: Extent of the grid beyond the sensors in meters
+
+        Returns:
+            A RadioMap with one fingerprint per grid cell
+        """
+        locations, shape = cls.make_grid(converter.sensor_positions, resolution, margin)
+        fingerprints = converter.expected_rssi_matrix(locations)
+        return cls(list(converter.sensor_positions), locations, fingerprints, shape, repr(converter.radio_map_key()))
+
+    @classmethod
+    def build_from_samples(cls,
+                           sensor_ids: List[str],
+                           positions: np.ndarray,
+                           rssi: np.ndarray,
+                           resolution: float = 1.0,
+                           model_signature: str = "samples") -> "RadioMap":
+        """
+        Learn the map from ground-truth samples, averaging samples per grid cell.
+
+        Args:
+            sensor_ids: Sensor of each RSSI column
+            positions: (K, 2) ground-truth sample positions
+            rssi: (K, M) RSSI measured at those positions (rows with NaN are skipped)
+            resolution: Cell size in meters used to average nearby samples
+            model_signature: Description of the layout the samples were logged with
+        """
+        positions = np.asarray(positions, dtype=float)
+        rssi = np.asarray(rssi, dtype=float)
+        complete = ~np.isnan(rssi).any(axis=1)
+        positions, rssi = positions[complete], rssi[complete]
+        if not len(positions):
+            raise ValueError("No samples with an RSSI for every sensor")
+
+        cells = np.round(positions / resolution).astype(np.int64)
+        unique_cells, inverse = np.unique(cells, axis=0, return_inverse=True)
+        inverse = inverse.ravel()
+        counts = np.bincount(inverse, minlength=len(unique_cells))[:, None]
+        sums = np.zeros((len(unique_cells), rssi.shape[1]))
+        np.add.at(sums, inverse, rssi)
+        return cls(sensor_ids, unique_cells * resolution, sums / counts, None, model_signature)
+
+    def query(self, rssi: np.ndarray, k: int = 4) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Locate many devices at once by weighted k-nearest neighbours.
+
+        Args:
+            rssi: (N, M) RSSI matrix with columns in sensor_ids order
+            k: Number of neighbours averaged, weighted by inverse signal distance
+
+        Returns:
+            Tuple of (N, 2) estimated positions and (N,) distance in dB to the
+            nearest fingerprint
+        """
+        rssi = np.atleast_2d(np.asarray(rssi, dtype=float))
+        k = min(k, len(self.locations))
+        distances, indices = self._tree.query(rssi, k=k)
+        if k == 1:
+            distances, indices = distances[:, None], indices[:, None]
+
+        weights = 1.0 / np.maximum(distances, 1e-6)
+        weights /= weights.sum(axis=1, keepdims=True)
+        positions = np.einsum('nk,nkd->nd', weights, self.locations[indices])
+        return positions, distances[:, 0]
+
+    def move_sensor(self, converter, sensor_id: str, new_position: Tuple[float, float]) -> int:
+        """
+        Update a model-generated map after a sensor moved.
+
+        Only the moved sensor's column is recomputed and only cells whose
+        expected RSSI actually changed are rewritten (cells at the noise floor
+        before and after stay untouched). The KD-tree is then rebuilt from the
+        updated fingerprints.
+
+        Args:
+            converter: RSSIConverter the map was built from; its sensor position is updated
+            sensor_id: Sensor that moved
+            new_position: New (x, y) of the sensor
+
+        Returns:
+            Number of grid cells whose fingerprint changed
+        """
+        if self.grid_shape is None:
+            raise ValueError("Only model-generated radio maps can be updated for a moved sensor")
+        column = self.sensor_ids.index(sensor_id)
+
+        converter.sensor_positions = {**converter.sensor_positions, sensor_id: tuple(new_position)}
+        expected = converter.expected_rssi_matrix(self.locations, [new_position])[:, 0]
+        changed = np.flatnonzero(expected != self.fingerprints[:, column])
+        self.fingerprints[changed, column] = expected[changed]
+        self.model_signature = repr(converter.radio_map_key())
+        if len(changed):
+            self._build_index()
+        return len(changed)
+
+    def save(self, path: str) -> None:
+        """Persist the map to a compressed .npz file."""
+        np.savez_compressed(
+            path,
+            sensor_ids=np.array(self.sensor_ids),
+            locations=self.locations,
+            fingerprints=self.fingerprints,
+            grid_shape=np.array(self.grid_shape if self.grid_shape is not None else (-1, -1)),
+            model_signature=np.array(self.model_signature)
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "RadioMap":
+        """Load a map written by save()."""
+        with np.load(path) as data:
+            grid_shape = tuple(int(v) for v in data['grid_shape'])
+            return cls(
+                [str(s) for s in data['sensor_ids']],
+                data['locations'],
+                data['fingerprints'],
+                None if grid_shape == (-1, -1) else grid_shape,
+                str(data['model_signature'])
+            )
+
+
+def load_log_samples(log_store, sensor_ids: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Collect ground-truth fingerprints from the RSSI log store.
+
+    Rows of different sensors logged for the same (timestamp, device_id)
+    form one sample at the logged (x, y).
+
+    Args:
+        log_store: RSSILogStore holding the logged measurements
+        sensor_ids: Sensors to use, in column order
+
+    Returns:
+        Tuple of (K, 2) positions and (K, M) RSSI with NaN for missing sensors
+    """
+    columns = {sensor_id: column for column, sensor_id in enumerate(sensor_ids)}
+    samples: Dict[Tuple[str, str, float, float], int] = {}
+    cells = []
+    for timestamp, device_id, x, y, sensor_id, rssi in log_store.ground_truth_rows():
+        column = columns.get(sensor_id)
+        if column is None:
+            continue
+        row = samples.setdefault((timestamp, device_id, x, y), len(samples))
+        cells.append((row, column, rssi))
+
+    positions = np.array([(x, y) for _, _, x, y in samples], dtype=float).reshape(-1, 2)
+    rssi = np.full((len(samples), len(sensor_ids)), np.nan)
+    if cells:
+        rows, cols, values = zip(*cells)
+        rssi[list(rows), list(cols)] = values
+    return positions, rssi
@@ -0,0 +1,232 @@
+"""
+Indexed, append-only storage for simulated RSSI logs.
+"""
+
+import csv
+import glob
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+LOG_COLUMNS = ["timestamp", "device_id", "x", "y", "rssi"]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS segments (
+    id INTEGER PRIMARY KEY,
+    row_count INTEGER NOT NULL DEFAULT 0,
+    first_timestamp TEXT,
+    last_timestamp TEXT
+);
+CREATE TABLE IF NOT EXISTS rssi_log (
+    segment_id INTEGER NOT NULL,
+    sensor_id TEXT NOT NULL,
+    device_id TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    x REAL,
+    y REAL,
+    rssi REAL
+);
+CREATE INDEX IF NOT EXISTS rssi_log_device ON rssi_log (device_id, timestamp);
+CREATE INDEX IF NOT EXISTS rssi_log_segment ON rssi_log (segment_id);
+"""
+
+
+class RSSILogStore:
+    """Append-only RSSI log split into segments, indexed by device and time."""
+
+    def __init__(self, db_path: str, segment_size: int = 100000):
+        """
+        Open (or create) the log store.
+
+        Args:
+            db_path: Path of the SQLite database file
+            segment_size: Number of rows after which a new segment is started
+        """
+        self.db_path = db_path
+        self.segment_size = segment_size
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def _current_segment(self, incoming: int) -> int:
+        """Return the segment to append to, starting a new one when it is full."""
+        row = self._conn.execute(
+            "SELECT id, row_count FROM segments ORDER BY id DESC LIMIT 1"
+        ).fetchone()
+        if row is None or (row[1] > 0 and row[1] + incoming > self.segment_size):
+            return self._conn.execute("INSERT INTO segments (row_count) VALUES (0)").lastrowid
+        return row[0]
+
+    def append(self, rows: Iterable[Tuple[str, str, str, float, float, float]]) -> int:
+        """
+        Append log rows in a single transaction.
+
+        Args:
+            rows: (sensor_id, device_id, timestamp, x, y, rssi) tuples
+
+        Returns:
+            Number of rows written
+        """
+        rows = list(rows)
+        if not rows:
+            return 0
+
+        timestamps = [row[2] for row in rows]
+        with self._lock, self._conn:
+            segment_id = self._current_segment(len(rows))
+            self._conn.executemany(
+                "INSERT INTO rssi_log (segment_id, sensor_id, device_id, timestamp, x, y, rssi) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(segment_id,) + tuple(row) for row in rows]
+            )
+            self._conn.execute(
+                "UPDATE segments SET row_count = row_count + ?, "
+                "first_timestamp = COALESCE(MIN(first_timestamp, ?), ?), "
+                "last_timestamp = COALESCE(MAX(last_timestamp, ?), ?) WHERE id = ?",
+                (len(rows), min(timestamps), min(timestamps), max(timestamps), max(timestamps), segment_id)
+            )
+        return len(rows)
+
+    def device_history(self, device_id: str) -> Dict[str, List[Dict[str, float]]]:
+        """
+        Read a device's full history with one indexed range scan.
+
+        Args:
+            device_id: MAC address of the device
+
+        Returns:
+            Dictionary mapping sensor IDs to time-ordered
+            {'timestamp': ..., 'rssi': ...} records
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT sensor_id, timestamp, rssi FROM rssi_log "
+                "WHERE device_id = ? ORDER BY timestamp",
+                (device_id,)
+            ).fetchall()
+
+        history: Dict[str, List[Dict[str, float]]] = {}
+        for sensor_id, timestamp, rssi in rows:
+            history.setdefault(sensor_id, []).append({'timestamp': timestamp, 'rssi': rssi})
+        return history
+
+    def scan(self) -> List[Tuple[str, str, str, float, float, float]]:
+        """
+        Read every stored row in insertion order.
+
+        Returns:
+            (sensor_id, device_id, timestamp, x, y, rssi) tuples, as passed to append
+        """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT sensor_id, device_id, timestamp, x, y, rssi FROM rssi_log ORDER BY rowid"
+            ).fetchall()
+
+    def ground_truth_rows(self) -> List[Tuple[str, str, float, float, str, float]]:
+        """
+        Logged RSSI averaged per (timestamp, device, position, sensor), for learning a radio map.
+
+        Returns:
+            (timestamp, device_id, x, y, sensor_id, rssi) tuples ordered by
+            timestamp and device
+        """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT timestamp, device_id, x, y, sensor_id, AVG(rssi) FROM rssi_log "
+                "WHERE x IS NOT NULL AND y IS NOT NULL "
+                "GROUP BY timestamp, device_id, x, y, sensor_id ORDER BY timestamp, device_id"
+            ).fetchall()
+
+    def row_count(self) -> int:
+        """Return the total number of stored rows."""
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(row_count), 0) FROM segments").fetchone()[0]
+
+    def apply_retention(self, older_than: Optional[str] = None, keep_segments: Optional[int] = None) -> int:
+        """
+        Drop whole segments that fall outside the retention policy.
+
+        Args:
+            older_than: ISO timestamp; segments whose newest row is older are dropped
+            keep_segments: Keep only this many most recent segments
+
+        Returns:
+            Number of segments dropped
+        """
+        with self._lock, self._conn:
+            doomed = set()
+            if older_than is not None:
+                doomed.update(row[0] for row in self._conn.execute(
+                    "SELECT id FROM segments WHERE last_timestamp < ?", (older_than,)
+                ))
+            if keep_segments is not None:
+                doomed.update(row[0] for row in self._conn.execute(
+                    "SELECT id FROM segments ORDER BY id DESC LIMIT -1 OFFSET ?", (keep_segments,)
+                ))
+            for segment_id in doomed:
+                self._conn.execute("DELETE FROM rssi_log WHERE segment_id = ?", (segment_id,))
+                self._conn.execute("DELETE FROM segments WHERE id = ?", (segment_id,))
+        return len(doomed)
+
+    def compact(self) -> None:
+        """
+        Merge under-filled segments into their predecessors and reclaim free space.
+        """
+        with self._lock:
+            with self._conn:
+                segments = self._conn.execute(
+                    "SELECT id, row_count, first_timestamp, last_timestamp FROM segments ORDER BY id"
+                ).fetchall()
+                target = None
+                for segment_id, row_count, first_ts, last_ts in segments:
+                    if target is not None and target[1] + row_count <= self.segment_size:
+                        self._conn.execute(
+                            "UPDATE rssi_log SET segment_id = ? WHERE segment_id = ?", (target[0], segment_id)
+                        )
+                        target = (target[0], target[1] + row_count, min(target[2], first_ts), max(target[3], last_ts))
+                        self._conn.execute(
+                            "UPDATE segments SET row_count = ?, first_timestamp = ?, last_timestamp = ? WHERE id = ?",
+                            (target[1], target[2], target[3], target[0])
+                        )
+                        self._conn.execute("DELETE FROM segments WHERE id = ?", (segment_id,))
+                    else:
+                        target = (segment_id, row_count, first_ts, last_ts)
+            self._conn.execute("VACUUM")
+
+    def import_csv_logs(self, log_dir: str) -> int:
+        """
+        One-shot import of the legacy per-sensor CSV logs.
+
+        Args:
+            log_dir: Directory holding <sensor_id>.csv files with
+                     timestamp, device_id, x, y, rssi columns
+
+        Returns:
+            Number of rows imported
+        """
+        imported = 0
+        for log_file in sorted(glob.glob(os.path.join(log_dir, "*.csv"))):
+            sensor_id = os.path.basename(log_file).replace(".csv", "")
+            with open(log_file, "r", newline="") as f:
+                reader = csv.DictReader(f)
+                if reader.fieldnames is None or not set(LOG_COLUMNS).issubset(reader.fieldnames):
+                    continue
+                rows = [
+                    (sensor_id, row["device_id"], row["timestamp"],
+                     float(row["x"]), float(row["y"]), float(row["rssi"]))
+                    for row in reader
+                ]
+            imported += self.append(rows)
+        return imported
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,319 @@
+"""
+Lightweight in-process metrics with Prometheus text exposition, plus an
+optional sampling profiler.
+
+Metrics are module-level objects updated from the hot path; each update is a
+lock, a dict lookup and (for histograms) a bisect. Setting WIFI_METRICS=0
+turns every update into a no-op.
+"""
+
+import bisect
+import os
+import sys
+import threading
+import time
+from collections import Counter as _StackCounter
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Seconds; spans cached lookups (~10 us) up to slow cold solves
+DEFAULT_BUCKETS = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(key: LabelKey, extra: Sequence[Tuple[str, str]] = ()) -> str:
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    value = float(value)
+    if value != value:
+        return "NaN"
+    if value in (float('inf'), float('-inf')):
+        return "+Inf" if value > 0 else "-Inf"
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+class MetricsRegistry:
+    """Holds the metrics and renders them in the Prometheus text format."""
+
+    def __init__(self, enabled: bool = True):
+        """
+        Initialize the registry.
+
+        Args:
+            enabled: Whether metric updates are recorded
+        """
+        self.enabled = enabled
+        self._metrics: Dict[str, "_Metric"] = {}
+        self._collectors: List[Tuple[str, str, Callable[[], Dict[LabelKey, float]], str]] = []
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, help_text: str, **kwargs) -> "_Metric":
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(self, name, help_text, **kwargs)
+            return metric
+
+    def counter(self, name: str, help_text: str) -> "Counter":
+        """Get or create a monotonically increasing counter."""
+        return self._get_or_create(Counter, name, help_text)
+
+    def histogram(self, name: str, help_text: str, buckets: Sequence[float] = DEFAULT_BUCKETS) -> "Histogram":
+        """Get or create a histogram with the given upper bucket bounds."""
+        return self._get_or_create(Histogram, name, help_text, buckets=buckets)
+
+    def gauge_callback(self, name: str, help_text: str, collect: Callable[[], Dict[LabelKey, float]],
+                       metric_type: str = "gauge") -> None:
+        """
+        Register a metric whose values are read when metrics are rendered.
+
+        Args:
+            collect: Returns {label key: value}; use () as key for an unlabelled value
+            metric_type: "gauge", or "counter" for totals kept elsewhere (e.g. cache hit counts)
+        """
+        with self._lock:
+            self._collectors.append((name, help_text, collect, metric_type))
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format (version 0.0.4)."""
+        lines: List[str] = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+        for metric in metrics:
+            lines.extend(metric.render())
+        for name, help_text, collect, metric_type in collectors:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for key, value in collect().items():
+                lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        """Zero every counter and histogram."""
+        with self._lock:
+            for metric in self._metrics.values():
+                metric.reset()
+
+
+class _Metric:
+    def __init__(self, registry: MetricsRegistry, name: str, help_text: str):
+        self._registry = registry
+        self.name = name
+        self.help_text = help_text
+        self._lock = threading.Lock()
+
+
+class Counter(_Metric):
+    """Monotonic counter with optional labels."""
+
+    def __init__(self, registry: MetricsRegistry, name: str, help_text: str):
+        super().__init__(registry, name, help_text)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        """Add amount to the series selected by labels."""
+        if not self._registry.enabled:
+            return
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(_label_key(labels), 0.0)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        lines.extend(f"{self.name}{_format_labels(key)} {_format_value(value)}" for key, value in values.items())
+        return lines
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram with optional labels."""
+
+    def __init__(self, registry: MetricsRegistry, name: str, help_text: str, buckets: Sequence[float]):
+        super().__init__(registry, name, help_text)
+        self.buckets = tuple(sorted(buckets))
+        # label key -> [per-bucket counts (+Inf last), sum, count]
+        self._series: Dict[LabelKey, list] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        """Record one observation in the series selected by labels."""
+        if not self._registry.enabled:
+            return
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Observe the wall-clock duration of the with-block in seconds."""
+        if not self._registry.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def snapshot(self, **labels: str) -> Optional[Tuple[List[int], float, int]]:
+        """(bucket counts, sum, count) of one series, or None if it has no observations."""
+        with self._lock:
+            series = self._series.get(_label_key(labels))
+            return (list(series[0]), series[1], series[2]) if series is not None else None
+
+    def reset(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+    def render(self) -> List[str]:
+        with self._lock:
+            series = {key: (list(counts), total, count) for key, (counts, total, count) in self._series.items()}
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total, count) in series.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float('inf') else repr(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(key, [('le', le)])} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {repr(total)}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+
+REGISTRY = MetricsRegistry(enabled=os.environ.get("WIFI_METRICS", "1") != "0")
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "wifi_stage_duration_seconds", "Time spent in each pipeline stage.")
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "wifi_http_request_duration_seconds", "Flask request latency by endpoint.")
+OPTIMIZER_RUNS = REGISTRY.counter(
+    "wifi_optimizer_runs_total", "Position solves by solver (rows for the batched solver).")
+OPTIMIZER_ITERATIONS = REGISTRY.counter(
+    "wifi_optimizer_iterations_total", "Optimizer iterations by solver (nit for scipy minimize).")
+OPTIMIZER_FUNCTION_EVALS = REGISTRY.counter(
+    "wifi_optimizer_function_evaluations_total", "Objective evaluations by solver (nfev for scipy minimize).")
+CACHE_LOOKUPS = REGISTRY.counter(
+    "wifi_cache_lookups_total", "Cache lookups by cache and result.")
+FILE_IO_BYTES = REGISTRY.counter(
+    "wifi_file_io_bytes_total", "Bytes read or written by file kind and direction.")
+
+
+def timed(stage: str):
+    """Context manager recording the duration of a pipeline stage."""
+    return STAGE_SECONDS.time(stage=stage)
+
+
+def record_minimize(result, solver: str = "nelder_mead") -> None:
+    """Record iteration and function-evaluation counts of a scipy.optimize result."""
+    if not REGISTRY.enabled:
+        return
+    OPTIMIZER_RUNS.inc(solver=solver)
+    OPTIMIZER_ITERATIONS.inc(getattr(result, 'nit', 0) or 0, solver=solver)
+    OPTIMIZER_FUNCTION_EVALS.inc(getattr(result, 'nfev', 0) or 0, solver=solver)
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler that samples the stacks of all threads from a
+    background thread. Costs nothing while stopped; output is in the
+    collapsed-stack format used by flame graph tools.
+    """
+
+    def __init__(self, interval: float = 0.005, max_depth: int = 64):
+        """
+        Initialize the profiler.
+
+        Args:
+            interval: Seconds between samples
+            max_depth: Innermost frames kept per stack
+        """
+        self.interval = interval
+        self.max_depth = max_depth
+        self._stacks: _StackCounter = _StackCounter()
+        self._samples = 0
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """Start sampling (no-op if already running)."""
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop sampling; collected stacks are kept until reset()."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stacks.clear()
+            self._samples = 0
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            stacks = []
+            for thread_id, frame in frames.items():
+                if thread_id == own_id:
+                    continue
+                names = []
+                while frame is not None and len(names) < self.max_depth:
+                    code = frame.f_code
+                    names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                stacks.append(";".join(reversed(names)))
+            with self._lock:
+                self._stacks.update(stacks)
+                self._samples += 1
+
+    def collapsed(self) -> str:
+        """Sampled stacks as 'frame;frame;... count' lines, most frequent first."""
+        with self._lock:
+            stacks = self._stacks.most_common()
+        return "".join(f"{stack} {count}\n" for stack, count in stacks)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {'running': self.running, 'samples': self._samples,
+                    'interval': self.interval, 'stacks': len(self._stacks)}
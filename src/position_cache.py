@@ -0,0 +1,77 @@
+"""
+Bounded LRU cache for per-device position pipeline results.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+class PositionCache:
+    """LRU cache keyed by (device_id, inputs) holding at most one entry per device."""
+
+    def __init__(self, max_entries: int = 10000):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of cached devices before LRU eviction
+        """
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Hashable, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, device_id: str, key: Hashable) -> Optional[Any]:
+        """
+        Look up a device's cached result.
+
+        Args:
+            device_id: MAC address of the device
+            key: Everything the result depends on (position, epoch, sensor
+                 layout, model parameters); a different key is a miss
+
+        Returns:
+            The cached value, or None on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(device_id)
+            if entry is None or entry[0] != key:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(device_id)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, device_id: str, key: Hashable, value: Any) -> None:
+        """
+        Store a device's result, replacing any entry computed from older inputs.
+
+        Args:
+            device_id: MAC address of the device
+            key: Inputs the value was computed from
+            value: Result to cache
+        """
+        with self._lock:
+            self._entries[device_id] = (key, value)
+            self._entries.move_to_end(device_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, device_id: Optional[str] = None) -> None:
+        """
+        Drop one device's entry, or everything when device_id is None.
+        """
+        with self._lock:
+            if device_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(device_id, None)
+
+    def stats(self) -> Dict[str, int]:
+        """Return entry count and hit/miss counters."""
+        return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+    def __len__(self) -> int:
+        return len(self._entries)
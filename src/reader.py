@@ -2,30 +2,124 @@
 Data loading and preprocessing module for RSSI measurements.
 """
 
-import pandas as pd
 import os
-from typing import Dict, List, Tuple
+import io
+import time
+import zlib
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Tuple
 import numpy as np
 import glob
+from .aggregation import RSSIAggregator
+from .capture_cache import CaptureCache
+from .metrics import CACHE_LOOKUPS, FILE_IO_BYTES
+
+if TYPE_CHECKING:
+    # pandas is imported lazily so that sensor discovery (and app start-up) stays cheap
+    import pandas as pd
+
+STATION_HEADER = b"Station MAC"
+MEASUREMENT_COLUMNS = ['timestamp', 'device_id', 'sensor_id', 'rssi']
+# Bytes before the tail offset that must be unchanged for a poll to read only the appended part
+TAIL_GUARD_BYTES = 4096
+
+
+def _station_row(line: bytes) -> Optional[Tuple[str, str, float]]:
+    """(last_seen, device_id, rssi) of a Station CSV line, or None for headers and malformed lines."""
+    fields = line.split(b',', 4)
+    if len(fields) < 4 or fields[0].strip() in (b'', STATION_HEADER):
+        return None
+    try:
+        rssi = float(fields[3])
+    except ValueError:
+        return None
+    return (fields[2].strip().decode('ascii', 'replace'),
+            fields[0].strip().decode('ascii', 'replace'), rssi)
+
+
+def parse_capture_filename(filename: str) -> Optional[Tuple[str, Tuple[float, float]]]:
+    """
+    Extract the sensor ID and position encoded in a capture filename.
+    
+    Args:
+        filename: Base name such as "output1(Sensor1 - Konum_ 0,0).csv"
+        
+    Returns:
+        (sensor_id, (x, y)) tuple, or None if the name carries no position
+    """
+    if "Konum_" not in filename:
+        return None
+    position_str = filename.split("Konum_")[1].split(")")[0]
+    x, y = map(float, position_str.split(","))
+    sensor_id = filename.split("(")[1].split(" - ")[0]
+    return sensor_id, (x, y)
+
+
+class _CaptureState:
+    """Per-file bookkeeping for incremental capture parsing."""
+    
+    def __init__(self, sensor_id: str):
+        self.sensor_id = sensor_id
+        self.size = -1
+        self.mtime_ns = -1
+        self.header_offset: Optional[int] = None
+        self.body_offset: Optional[int] = None  # end of the last complete Station line parsed
+        self.guard_crc = 0                      # CRC32 of the TAIL_GUARD_BYTES before body_offset
+        self.fingerprints: Dict[str, int] = {}
+
 
 class RSSIDataReader:
     """Handles loading and preprocessing of RSSI data from CSV files."""
     
-    def __init__(self, data_dir: str = "data"):
+    def __init__(self, data_dir: str = "data", cache_dir: Optional[str] = None, use_cache: bool = True,
+                 aggregation_window: int = 16):
         """
         Initialize the RSSI data reader.
         
         Args:
             data_dir: Directory containing the RSSI data files
+            cache_dir: Where parsed captures are cached (default: data_dir/.capture_cache)
+            use_cache: Whether to use the columnar capture cache; it is turned
+                       off by itself if cache_dir turns out not to be writable
+            aggregation_window: Samples kept per device-sensor pair by the
+                                sliding-window aggregator
         """
         self.data_dir = data_dir
         self.sensor_positions = {}
         self.data = {}
+        self._capture_states: Dict[str, _CaptureState] = {}
+        # sensor_id -> device_id -> row positions in self.data[sensor_id]
+        self._device_rows: Dict[str, Dict[str, List[int]]] = {}
+        # file path -> (size, mtime_ns) of the capture parsed into self.data
+        self._parsed_files: Dict[str, Tuple[int, int]] = {}
+        self.capture_cache = None
+        if use_cache:
+            self.capture_cache = CaptureCache(cache_dir or os.path.join(data_dir, ".capture_cache"))
+        # Created on first use, then kept up to date as captures are loaded and polled
+        self.aggregation_window = aggregation_window
+        self.aggregator: Optional[RSSIAggregator] = None
+    
+    def discover_sensors(self) -> Dict[str, Tuple[float, float]]:
+        """
+        Find sensors from capture filenames only, without reading any file.
+        
+        Returns:
+            Dictionary mapping sensor IDs to their (x, y) positions
+        """
+        for file_path in glob.glob(os.path.join(self.data_dir, "*.csv")):
+            parsed = parse_capture_filename(os.path.basename(file_path))
+            if parsed is not None:
+                sensor_id, position = parsed
+                self.sensor_positions[sensor_id] = position
+        return self.sensor_positions
         
-    def load_all_data(self) -> Dict[str, pd.DataFrame]:
+    def load_all_data(self) -> Dict[str, "pd.DataFrame"]:
         """
         Load RSSI data from all CSV files in the data directory.
         
+        Captures whose size and modification time are unchanged since the
+        previous call are not parsed again, and across restarts parsed
+        captures are served from the columnar capture cache.
+        
         Returns:
             Dictionary mapping sensor IDs to their respective DataFrames
         """
@@ -35,42 +129,159 @@ class RSSIDataReader:
         for file_path in csv_files:
             # Extract sensor position from filename
             filename = os.path.basename(file_path)
-            if "Konum_" in filename:
-                position_str = filename.split("Konum_")[1].split(")")[0]
-                x, y = map(float, position_str.split(","))
-                sensor_id = filename.split("(")[1].split(" - ")[0]
-                self.sensor_positions[sensor_id] = (x, y)
-            
-            # Read the CSV file
-            with open(file_path, 'r') as f:
-                lines = f.readlines()
-            
-            # Find the line that separates BSSID and Station data
-            separator_line = None
-            for i, line in enumerate(lines):
-                if line.strip() == '':
-                    separator_line = i
-                    break
-            
-            if separator_line is not None:
-                # Read only the Station data part
-                station_data = pd.read_csv(file_path, skiprows=separator_line + 1)
-                
-                # Clean column names by stripping whitespace
-                station_data.columns = station_data.columns.str.strip()
-                
-                # Create a clean DataFrame with required columns
-                clean_data = pd.DataFrame({
-                    'timestamp': pd.to_datetime(station_data['First time seen'].str.strip()),
-                    'device_id': station_data['Station MAC'].str.strip(),
-                    'sensor_id': sensor_id,
-                    'rssi': station_data['Power'].astype(float)
-                })
-                
+            parsed = parse_capture_filename(filename)
+            if parsed is None:
+                continue
+            sensor_id, position = parsed
+            self.sensor_positions[sensor_id] = position
+            
+            stat = os.stat(file_path)
+            fingerprint = (stat.st_size, stat.st_mtime_ns)
+            if self._parsed_files.get(file_path) == fingerprint and sensor_id in self.data:
+                continue
+            
+            clean_data = self._load_capture(file_path, sensor_id, stat)
+            if clean_data is not None:
+                previous = self.data.get(sensor_id)
+                shared = self._shared_rows(previous, clean_data)
+                self._fold_capture(sensor_id, previous, clean_data, shared)
                 self.data[sensor_id] = clean_data
+                # A grown capture keeps its rows: only the rows after the shared prefix are (re)indexed
+                self._truncate_index(sensor_id, previous, shared)
+                self._index_rows(sensor_id, clean_data.iloc[shared:], shared)
+                self._parsed_files[file_path] = fingerprint
         
         return self.data
     
+    def _parse_capture(self, file_path: str, sensor_id: str) -> Tuple[Optional["pd.DataFrame"], int, int]:
+        """
+        Parse the Station part of a capture CSV.
+        
+        Returns:
+            Tuple of (DataFrame or None if there is no Station part, number of
+            bytes up to and including the last newline, number of rows parsed
+            from an unterminated last line after it)
+        """
+        import pandas as pd
+        
+        # Read the CSV file once and parse the Station part from memory
+        with open(file_path, 'rb') as f:
+            raw = f.read()
+        FILE_IO_BYTES.inc(len(raw), kind="capture", direction="read")
+        # Bytes after the last newline may be a line airodump-ng is still writing: its row is
+        # served, but parsed_bytes stops before it so the next incremental parse reads it again
+        complete_bytes = raw.rfind(b'\n') + 1
+        partial = _station_row(raw[complete_bytes:])
+        lines = raw[:complete_bytes].decode('utf-8', 'replace').splitlines(keepends=True)
+        
+        # Find the line that separates BSSID and Station data
+        separator_line = None
+        for i, line in enumerate(lines):
+            if line.strip() == '':
+                separator_line = i
+                break
+        
+        if separator_line is None:
+            return None, complete_bytes, 0
+        
+        # Read only the Station data part
+        station_data = pd.read_csv(io.StringIO(''.join(lines[separator_line + 1:])))
+        
+        # Clean column names by stripping whitespace
+        station_data.columns = station_data.columns.str.strip()
+        
+        # Create a clean DataFrame with required columns
+        clean_data = pd.DataFrame({
+            # 'Last time seen': the moment the reported Power was observed (same column as the polling path)
+            'timestamp': pd.to_datetime(station_data['Last time seen'].str.strip()),
+            'device_id': station_data['Station MAC'].str.strip(),
+            'sensor_id': sensor_id,
+            'rssi': station_data['Power'].astype(float)
+        })
+        if partial is None:
+            return clean_data, complete_bytes, 0
+        last_seen, device_id, rssi = partial
+        clean_data = pd.concat([clean_data, pd.DataFrame({
+            'timestamp': pd.to_datetime([last_seen]),
+            'device_id': [device_id],
+            'sensor_id': sensor_id,
+            'rssi': [rssi]
+        })], ignore_index=True)
+        return clean_data, complete_bytes, 1
+    
+    def _disable_cache(self, error: OSError) -> None:
+        """Fall back to parsing without the capture cache, e.g. for a read-only archive."""
+        print(f"Warning: capture cache {self.capture_cache.cache_dir} is not writable ({error}); "
+              f"parsing captures without it")
+        self.capture_cache = None
+    
+    def _load_capture(self, file_path: str, sensor_id: str, stat: os.stat_result) -> Optional["pd.DataFrame"]:
+        """
+        Load a capture through the columnar cache, parsing only what is new.
+        
+        An exact cache hit is loaded zero-copy from memory-mapped .npy files.
+        If the capture only grew, the appended Station rows are parsed and the
+        cache entry is extended; otherwise the capture is parsed in full and
+        the entry rewritten.
+        
+        Returns:
+            DataFrame with timestamp, device_id, sensor_id and rssi columns,
+            or None if the capture has no Station part
+        """
+        import pandas as pd
+        
+        if self.capture_cache is None:
+            return self._parse_capture(file_path, sensor_id)[0]
+        
+        status, entry = self.capture_cache.lookup(file_path, stat)
+        CACHE_LOOKUPS.inc(cache="capture", result=status or "miss")
+        if status == 'grown':
+            with open(file_path, 'rb') as f:
+                f.seek(entry.parsed_bytes)
+                tail = f.read()
+            FILE_IO_BYTES.inc(len(tail), kind="capture", direction="read")
+            complete = tail[:tail.rfind(b'\n') + 1]
+            rows = [row for row in map(_station_row, complete.splitlines()) if row is not None]
+            # A row on an unterminated last line is served now and replaced once the line is complete
+            partial = _station_row(tail[len(complete):])
+            partial_rows = int(partial is not None)
+            if partial is not None:
+                rows.append(partial)
+            if rows:
+                last_seen, device_ids, rssi = zip(*rows)
+                timestamps = pd.to_datetime(pd.Series(last_seen)).to_numpy('datetime64[ns]').view(np.int64)
+            else:
+                timestamps, device_ids, rssi = np.zeros(0, dtype=np.int64), [], []
+            try:
+                entry = self.capture_cache.extend(
+                    file_path, stat, entry, complete, timestamps, list(device_ids), rssi, partial_rows=partial_rows
+                )
+            except OSError as e:
+                self._disable_cache(e)
+                return self._parse_capture(file_path, sensor_id)[0]
+        elif status is None:
+            clean_data, parsed_bytes, partial_rows = self._parse_capture(file_path, sensor_id)
+            if clean_data is None:
+                return None
+            try:
+                entry = self.capture_cache.store(
+                    file_path, stat, parsed_bytes,
+                    clean_data['timestamp'].to_numpy('datetime64[ns]').view(np.int64),
+                    clean_data['device_id'].tolist(),
+                    clean_data['rssi'].to_numpy(dtype=float),
+                    partial_rows=partial_rows
+                )
+            except OSError as e:
+                self._disable_cache(e)
+                return clean_data
+        
+        return pd.DataFrame({
+            'timestamp': entry.timestamps.view('datetime64[ns]'),
+            'device_id': pd.Categorical.from_codes(entry.device_codes, categories=entry.devices),
+            'sensor_id': sensor_id,
+            'rssi': entry.rssi
+        }, copy=False)
+    
     def get_sensor_positions(self) -> Dict[str, Tuple[float, float]]:
         """
         Get the positions of all sensors.
@@ -79,9 +290,74 @@ class RSSIDataReader:
             Dictionary mapping sensor IDs to their (x, y) positions
         """
         if not self.sensor_positions:
-            self.load_all_data()
+            self.discover_sensors()
         return self.sensor_positions
     
+    def _index_rows(self, sensor_id: str, frame: "pd.DataFrame", start: int) -> None:
+        """
+        Add the rows of a frame to the per-device index of a sensor.
+        
+        Args:
+            sensor_id: Sensor the rows belong to
+            frame: Rows to index
+            start: Position of the frame's first row in self.data[sensor_id]
+        """
+        device_rows = self._device_rows.setdefault(sensor_id, {})
+        for device_id, positions in frame.groupby('device_id', sort=False, observed=True).indices.items():
+            device_rows.setdefault(device_id, []).extend((positions + start).tolist())
+    
+    def _rebuild_index(self, sensor_id: str) -> None:
+        """Rebuild the per-device index of a sensor from its DataFrame."""
+        self._device_rows[sensor_id] = {}
+        self._index_rows(sensor_id, self.data[sensor_id], 0)
+    
+    def _truncate_index(self, sensor_id: str, previous: Optional["pd.DataFrame"], keep: int) -> None:
+        """
+        Drop the index entries of a sensor's rows from position keep on.
+        
+        Args:
+            sensor_id: Sensor whose index is truncated
+            previous: The DataFrame the index was built from
+            keep: Number of leading rows whose entries are kept
+        """
+        if keep == 0 or previous is None:
+            self._device_rows[sensor_id] = {}
+            return
+        device_rows = self._device_rows.setdefault(sensor_id, {})
+        # Row positions are ascending, so only the devices of the dropped rows lose trailing entries
+        for device_id in previous['device_id'].iloc[keep:].unique():
+            positions = device_rows.get(device_id)
+            while positions and positions[-1] >= keep:
+                positions.pop()
+            if not positions:
+                device_rows.pop(device_id, None)
+    
+    @staticmethod
+    def _shared_rows(previous: Optional["pd.DataFrame"], current: "pd.DataFrame") -> int:
+        """
+        Number of leading rows current shares with previous.
+        
+        A capture that only grew shares all of its previous rows; one whose
+        unterminated last line was completed shares all but that row.
+        """
+        import pandas as pd
+        
+        if previous is None:
+            return 0
+        n = min(len(previous), len(current))
+        same = ((previous['rssi'].to_numpy()[:n] == current['rssi'].to_numpy()[:n])
+                & (previous['timestamp'].to_numpy()[:n] == current['timestamp'].to_numpy()[:n]))
+        old_devices, new_devices = previous['device_id'], current['device_id']
+        if (isinstance(old_devices.dtype, pd.CategoricalDtype) and isinstance(new_devices.dtype, pd.CategoricalDtype)
+                and list(new_devices.cat.categories[:len(old_devices.cat.categories)])
+                == list(old_devices.cat.categories)):
+            # Cached captures extend their MAC dictionary in place, so the codes can be compared
+            same &= old_devices.cat.codes.to_numpy()[:n] == new_devices.cat.codes.to_numpy()[:n]
+        else:
+            same &= old_devices.to_numpy()[:n] == new_devices.to_numpy()[:n]
+        mismatch = np.flatnonzero(~same)
+        return int(mismatch[0]) if len(mismatch) else n
+    
     def get_device_measurements(self, device_id: str) -> Dict[str, List[float]]:
         """
         Get RSSI measurements for a specific device from all sensors.
@@ -97,9 +373,9 @@ class RSSIDataReader:
             
         measurements = {}
         for sensor_id, df in self.data.items():
-            device_data = df[df['device_id'] == device_id]
-            if not device_data.empty:
-                measurements[sensor_id] = device_data['rssi'].tolist()
+            rows = self._device_rows.get(sensor_id, {}).get(device_id)
+            if rows:
+                measurements[sensor_id] = df['rssi'].to_numpy()[rows].tolist()
             
         return measurements
     
@@ -118,8 +394,293 @@ class RSSIDataReader:
             
         latest_measurements = {}
         for sensor_id, df in self.data.items():
-            device_data = df[df['device_id'] == device_id]
-            if not device_data.empty:
-                latest_measurements[sensor_id] = device_data['rssi'].iloc[-1]
+            rows = self._device_rows.get(sensor_id, {}).get(device_id)
+            if rows:
+                latest_measurements[sensor_id] = df['rssi'].to_numpy()[rows[-1]]
             
-        return latest_measurements 
\ No newline at end of file
+        return latest_measurements
+    
+    def get_latest_rssi_matrix(self) -> Tuple[List[str], List[str], np.ndarray]:
+        """
+        Get the latest RSSI of every device at every sensor as one matrix.
+        
+        Returns:
+            Tuple of (device_ids, sensor_ids, matrix) where matrix has shape
+            (len(device_ids), len(sensor_ids)) and NaN where a sensor has not
+            heard a device
+        """
+        if not self.data:
+            self.load_all_data()
+        
+        sensor_ids = list(self.data.keys())
+        device_ids = list(dict.fromkeys(
+            device_id for sensor_id in sensor_ids for device_id in self._device_rows.get(sensor_id, {})
+        ))
+        device_columns = {device_id: i for i, device_id in enumerate(device_ids)}
+        
+        matrix = np.full((len(device_ids), len(sensor_ids)), np.nan)
+        for col, sensor_id in enumerate(sensor_ids):
+            device_rows = self._device_rows.get(sensor_id, {})
+            if not device_rows:
+                continue
+            rows = [device_columns[device_id] for device_id in device_rows]
+            last_positions = [positions[-1] for positions in device_rows.values()]
+            matrix[rows, col] = self.data[sensor_id]['rssi'].to_numpy()[last_positions]
+        
+        return device_ids, sensor_ids, matrix
+
+    def _fold_capture(self, sensor_id: str, previous: Optional["pd.DataFrame"], current: "pd.DataFrame",
+                      shared: int) -> None:
+        """
+        Feed a (re)loaded capture into the aggregator, if there is one.
+        
+        If the new frame starts with all rows of the previous one (the capture
+        only grew), just the appended rows are added; otherwise the sensor's
+        windows are reset and refilled.
+        
+        Args:
+            shared: Leading rows current shares with previous (see _shared_rows)
+        """
+        if self.aggregator is None:
+            return
+        start = shared if previous is not None and shared == len(previous) else 0
+        if start == 0:
+            self.aggregator.reset_sensor(sensor_id)
+        self.aggregator.add_frame(current.iloc[start:])
+    
+    def get_aggregator(self) -> RSSIAggregator:
+        """
+        Get the sliding-window aggregator, building it from the loaded data on first use.
+        
+        Returns:
+            RSSIAggregator holding the last aggregation_window samples of every
+            device at every sensor
+        """
+        if self.aggregator is None:
+            if not self.data:
+                self.load_all_data()
+            # Captures can span hours, so devices are not dropped by age; max_devices bounds memory
+            self.aggregator = RSSIAggregator(
+                sensor_ids=list(self.data.keys()), window=self.aggregation_window, stale_after=None
+            )
+            for frame in self.data.values():
+                self.aggregator.add_frame(frame)
+        return self.aggregator
+    
+    def get_aggregated_measurements(self, device_id: str, statistic: str = "median") -> Dict[str, float]:
+        """
+        Get a windowed RSSI statistic for a specific device from all sensors.
+        
+        Args:
+            device_id: MAC address of the device
+            statistic: "median", "ema" or "latest"
+            
+        Returns:
+            Dictionary containing sensor IDs and the device's aggregated RSSI
+        """
+        return {sensor_id: stats[statistic] for sensor_id, stats in self.get_aggregator().device_stats(device_id).items()}
+    
+    def get_aggregated_rssi_matrix(self, statistic: str = "median",
+                                   active_within: Optional[float] = None) -> Tuple[List[str], List[str], np.ndarray]:
+        """
+        Get a windowed RSSI statistic of every active device at every sensor as one matrix.
+        
+        Unlike get_latest_rssi_matrix this reads the aggregator's running
+        statistics directly, without touching the DataFrames.
+        
+        Args:
+            statistic: "median", "ema" or "latest"
+            active_within: Only devices seen within this many seconds of the
+                           newest sample (None returns every device)
+            
+        Returns:
+            Tuple of (device_ids, sensor_ids, matrix) where matrix has shape
+            (len(device_ids), len(sensor_ids)) and NaN where a sensor has not
+            heard a device
+        """
+        return self.get_aggregator().snapshot(statistic, active_within)
+
+    def _read_new_station_rows(self, file_path: str, state: _CaptureState) -> List[Tuple[str, str, float]]:
+        """
+        Parse the Station rows of a capture that are new or changed since the last poll.
+        
+        The offset of the last complete Station line is remembered together
+        with a CRC32 of the TAIL_GUARD_BYTES before it. While those bytes are
+        unchanged the capture is treated as having only grown and just the
+        appended bytes are read. Otherwise (the file shrank or was rewritten
+        in place) the Station part is scanned again from its header, whose
+        offset is remembered so the BSSID section is skipped while the header
+        has not moved. A rewrite that leaves the guarded bytes untouched is
+        only noticed once later output changes them.
+        
+        Each row's measurement (last seen and power) is fingerprinted by CRC32
+        and only rows whose fingerprint differs from the previous poll are
+        returned. A row on an unterminated last line is returned now and read
+        again once the line is complete.
+        
+        Args:
+            file_path: Path to the airodump-ng capture
+            state: Bookkeeping for this file, updated in place
+            
+        Returns:
+            List of (last_seen, device_id, rssi) tuples
+        """
+        with open(file_path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if state.body_offset is not None and size >= state.body_offset:
+                guard_start = max(state.header_offset, state.body_offset - TAIL_GUARD_BYTES)
+                f.seek(guard_start)
+                window = f.read()
+                FILE_IO_BYTES.inc(len(window), kind="capture", direction="read")
+                if zlib.crc32(window[:state.body_offset - guard_start]) == state.guard_crc:
+                    return self._parse_station_lines(state, window, guard_start, state.body_offset, rescan=False)
+            
+            header = None
+            if state.header_offset is not None:
+                f.seek(state.header_offset)
+                header = f.readline()
+                if not header.startswith(STATION_HEADER):
+                    header = None
+            
+            if header is None:
+                # Layout changed (or first poll): locate the blank separator line again
+                f.seek(0)
+                state.header_offset = None
+                for line in iter(f.readline, b''):
+                    if line.strip() == b'':
+                        state.header_offset = f.tell()
+                        header = f.readline()
+                        break
+                if header is None or not header.startswith(STATION_HEADER):
+                    state.header_offset = state.body_offset = None
+                    return []
+            
+            body = f.read()
+            FILE_IO_BYTES.inc(f.tell() - state.header_offset, kind="capture", direction="read")
+        
+        return self._parse_station_lines(state, header + body, state.header_offset,
+                                         state.header_offset + len(header), rescan=True)
+    
+    def _parse_station_lines(self, state: _CaptureState, window: bytes, window_start: int,
+                             parse_from: int, rescan: bool) -> List[Tuple[str, str, float]]:
+        """
+        Parse the Station lines of window from file offset parse_from on and advance the tail offset.
+        
+        Args:
+            state: Bookkeeping for the file, updated in place
+            window: File bytes starting at offset window_start (at or before
+                    parse_from, and covering the new guard bytes)
+            window_start: File offset of window[0]
+            parse_from: File offset of the first line to parse
+            rescan: Whether this is the whole Station body (devices missing
+                    from it lose their fingerprints) or only appended lines
+            
+        Returns:
+            List of (last_seen, device_id, rssi) tuples of new or changed rows
+        """
+        data = window[parse_from - window_start:]
+        previous = state.fingerprints
+        fingerprints = {} if rescan else dict(previous)
+        rows = []
+        for line in data.splitlines():
+            fields = line.split(b',')
+            if len(fields) < 4:
+                continue
+            device_id = fields[0].strip().decode('ascii', 'replace')
+            fingerprint = zlib.crc32(fields[2].strip() + b',' + fields[3].strip())
+            fingerprints[device_id] = fingerprint
+            if previous.get(device_id) == fingerprint:
+                continue
+            try:
+                rssi = float(fields[3])
+            except ValueError:
+                continue
+            rows.append((fields[2].strip().decode('ascii', 'replace'), device_id, rssi))
+        
+        state.fingerprints = fingerprints
+        state.body_offset = parse_from + data.rfind(b'\n') + 1
+        guard_start = max(state.header_offset, state.body_offset - TAIL_GUARD_BYTES)
+        state.guard_crc = zlib.crc32(window[guard_start - window_start:state.body_offset - window_start])
+        return rows
+    
+    def poll_new_measurements(self) -> "pd.DataFrame":
+        """
+        Parse only the Station rows that appeared or changed since the last poll.
+        
+        Files whose size and modification time are unchanged are skipped without
+        being opened. The first poll of a file returns all of its Station rows
+        and replaces that sensor's data; later polls append. Rows are
+        timestamped with 'Last time seen' (the moment the reported power was
+        observed), like load_all_data.
+        
+        Returns:
+            DataFrame with timestamp, device_id, sensor_id and rssi columns
+        """
+        import pandas as pd
+        
+        batches = []
+        for file_path in glob.glob(os.path.join(self.data_dir, "*.csv")):
+            state = self._capture_states.get(file_path)
+            if state is None:
+                parsed = parse_capture_filename(os.path.basename(file_path))
+                if parsed is None:
+                    continue
+                sensor_id, position = parsed
+                self.sensor_positions[sensor_id] = position
+                state = self._capture_states[file_path] = _CaptureState(sensor_id)
+            
+            try:
+                stat = os.stat(file_path)
+            except FileNotFoundError:
+                continue
+            if stat.st_size == state.size and stat.st_mtime_ns == state.mtime_ns:
+                continue
+            state.size, state.mtime_ns = stat.st_size, stat.st_mtime_ns
+            
+            first_poll = state.header_offset is None
+            rows = self._read_new_station_rows(file_path, state)
+            if not rows:
+                continue
+            timestamps, device_ids, rssi = zip(*rows)
+            batch = pd.DataFrame({
+                'timestamp': pd.to_datetime(pd.Series(timestamps), errors='coerce'),
+                'device_id': list(device_ids),
+                'sensor_id': state.sensor_id,
+                'rssi': np.array(rssi, dtype=float)
+            })
+            batches.append(batch)
+            
+            if state.sensor_id in self.data and not first_poll:
+                start = len(self.data[state.sensor_id])
+                self.data[state.sensor_id] = pd.concat([self.data[state.sensor_id], batch], ignore_index=True)
+                self._index_rows(state.sensor_id, batch, start)
+                if self.aggregator is not None:
+                    self.aggregator.add_frame(batch)
+            else:
+                self._fold_capture(state.sensor_id, None, batch, 0)
+                self.data[state.sensor_id] = batch
+                self._rebuild_index(state.sensor_id)
+        
+        if not batches:
+            return pd.DataFrame(columns=MEASUREMENT_COLUMNS)
+        return pd.concat(batches, ignore_index=True)
+    
+    def follow(self, poll_interval: float = 1.0, max_polls: Optional[int] = None) -> Iterator["pd.DataFrame"]:
+        """
+        Follow the capture files and yield batches of new measurements.
+        
+        Args:
+            poll_interval: Seconds to wait between polls
+            max_polls: Stop after this many polls (None follows forever)
+            
+        Yields:
+            Non-empty DataFrames of new or changed measurements
+        """
+        polls = 0
+        while max_polls is None or polls < max_polls:
+            batch = self.poll_new_measurements()
+            polls += 1
+            if not batch.empty:
+                yield batch
+            if max_polls is None or polls < max_polls:
+                time.sleep(poll_interval)
@@ -2,8 +2,25 @@
 RSSI-Distance conversion and RSSI simulation using log-distance path loss model.
 """
 
+import zlib
 import numpy as np
-from typing import Dict, Tuple
+from typing import Dict, List, Optional, Tuple
+
+_UINT64_MASK = (1 << 64) - 1
+
+
+def _mix64(x: np.ndarray) -> np.ndarray:
+    """SplitMix64 finalizer: maps uint64 counters to well-mixed uint64 hashes (wraps on overflow)."""
+    x = x + np.uint64(0x9E3779B97F4A7C15)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def _unit_interval(bits: np.ndarray) -> np.ndarray:
+    """Top 53 bits of uint64 hashes as floats in (0, 1]."""
+    return ((bits >> np.uint64(11)).astype(np.float64) + 1.0) * 2.0 ** -53
+
 
 class RSSIConverter:
     def __init__(self,
@@ -12,9 +29,14 @@ class RSSIConverter:
                  d0: float = 1.0,
                  path_loss_exponent: float = 2.3,
                  shadowing_std_dev_dB: float = 0.1,
-                 noise_floor_dBm: float = -90.0):
+                 noise_floor_dBm: float = -90.0,
+                 seed: Optional[int] = None):
         """
         Initialize the converter with model parameters.
+
+        If seed is given, shadowing is drawn from a private generator (and
+        keyed draws are hashed with it) instead of the global np.random
+        state, so simulations are reproducible.
         """
         self.tx_power_dBm = tx_power_dBm
         self.PL_d0_dB = PL_d0_dB
@@ -22,6 +44,8 @@ class RSSIConverter:
         self.path_loss_exponent = path_loss_exponent
         self.shadowing_std_dev_dB = shadowing_std_dev_dB
         self.noise_floor_dBm = noise_floor_dBm
+        self.seed = seed
+        self.rng = np.random.default_rng(seed) if seed is not None else np.random
 
         self.sensor_positions: Dict[str, Tuple[float, float]] = {}
 
@@ -31,6 +55,54 @@ class RSSIConverter:
         """
         self.sensor_positions = sensor_positions
 
+    def model_key(self) -> Tuple:
+        """
+        Hashable summary of everything that affects simulated RSSI and distances.
+        """
+        return (self.tx_power_dBm, self.PL_d0_dB, self.d0, self.path_loss_exponent,
+                self.shadowing_std_dev_dB, self.noise_floor_dBm, self.seed,
+                tuple(self.sensor_positions.items()))
+
+    def radio_map_key(self) -> Tuple:
+        """
+        Hashable summary of everything that affects the noise-free expected RSSI.
+
+        Unlike model_key, the seed and shadowing spread are left out: they only
+        change simulated measurements, not the radio map.
+        """
+        return (self.tx_power_dBm, self.PL_d0_dB, self.d0, self.path_loss_exponent,
+                self.noise_floor_dBm, tuple(self.sensor_positions.items()))
+
+    def keyed_shadowing(self, device_keys: List[Tuple[str, int]], sensor_ids: Optional[List[str]] = None) -> np.ndarray:
+        """
+        Shadowing of every (device, epoch) key at every sensor, drawn without a per-device generator.
+
+        Each value is a standard normal computed (Box-Muller) from a hash of
+        (seed, device_id, epoch, sensor_id), scaled by shadowing_std_dev_dB. The
+        whole matrix is built with vectorized integer arithmetic, and a draw
+        depends only on its own key: not on the other rows of the batch, their
+        order, or the other sensors.
+
+        Args:
+            device_keys: (device_id, epoch) per row
+            sensor_ids: Sensors per column (default: sensor_positions order)
+
+        Returns:
+            An (N, M) array of shadowing values in dB
+        """
+        if sensor_ids is None:
+            sensor_ids = list(self.sensor_positions)
+        base_seed = (self.seed if self.seed is not None else 0) & _UINT64_MASK
+        devices = np.array([zlib.crc32(device_id.encode()) for device_id, _ in device_keys], dtype=np.uint64)
+        epochs = np.array([epoch & _UINT64_MASK for _, epoch in device_keys], dtype=np.uint64)
+        sensors = np.array([zlib.crc32(sensor_id.encode()) for sensor_id in sensor_ids], dtype=np.uint64)
+
+        rows = _mix64(_mix64(_mix64(np.full(len(devices), base_seed, dtype=np.uint64)) ^ devices) ^ epochs)
+        bits = _mix64(rows[:, None] ^ sensors[None, :])
+        radius = np.sqrt(-2.0 * np.log(_unit_interval(bits)))
+        angle = 2.0 * np.pi * _unit_interval(_mix64(bits))
+        return self.shadowing_std_dev_dB * radius * np.cos(angle)
+
     def rssi_to_distance(self, rssi_dBm: float) -> float:
         """
         Estimate distance from RSSI.
@@ -41,6 +113,19 @@ class RSSIConverter:
         else:
             return self.d0 * 10 ** ((path_loss_dB - self.PL_d0_dB) / (10 * self.path_loss_exponent))
 
+    def rssi_to_distance_matrix(self, rssi_dBm: np.ndarray) -> np.ndarray:
+        """
+        Estimate distances for an array of RSSI values (e.g. an (N, M) matrix).
+
+        Applies the same d0 floor as rssi_to_distance; NaN entries stay NaN.
+
+        Returns:
+            An array of distances with the same shape as rssi_dBm
+        """
+        rssi_dBm = np.asarray(rssi_dBm, dtype=float)
+        excess_loss_dB = np.maximum(self.tx_power_dBm - rssi_dBm - self.PL_d0_dB, 0.0)
+        return self.d0 * 10 ** (excess_loss_dB / (10 * self.path_loss_exponent))
+
     def simulate_rssi_from_position(self, device_pos: Tuple[float, float]) -> Dict[str, float]:
         """
         Simulate RSSI from a given device position to each sensor.
@@ -48,21 +133,64 @@ class RSSIConverter:
         Returns:
             A dict: {sensor_id: rssi}
         """
-        simulated_rssi = {}
-        for sensor_id, ap_pos in self.sensor_positions.items():
-            distance = np.linalg.norm(np.array(device_pos) - np.array(ap_pos))
-            if distance < 0.1:
-                distance = 0.1
+        # One row of the batched simulation: every sensor is computed in a single vectorized pass
+        rssi = self.simulate_rssi_matrix([device_pos])[0]
+        return dict(zip(self.sensor_positions, rssi.tolist()))
+
+    def path_loss_matrix(self, device_positions: np.ndarray, ap_positions: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Deterministic path loss (no shadowing) from many positions to every sensor.
+
+        Args:
+            device_positions: (N, 2) array of device (x, y) positions
+            ap_positions: Optional (M, 2) sensor positions; defaults to sensor_positions
+
+        Returns:
+            An (N, M) array of path loss values in dB
+        """
+        device_positions = np.asarray(device_positions, dtype=float).reshape(-1, 2)
+        if ap_positions is None:
+            ap_positions = list(self.sensor_positions.values())
+        ap_positions = np.asarray(ap_positions, dtype=float).reshape(-1, 2)
 
-            if distance <= self.d0:
-                path_loss_dB = self.PL_d0_dB
-            else:
-                path_loss_dB = self.PL_d0_dB + 10 * self.path_loss_exponent * np.log10(distance / self.d0)
+        offsets = device_positions[:, None, :] - ap_positions[None, :, :]
+        distances = np.maximum(np.sqrt(np.sum(offsets ** 2, axis=2)), 0.1)
+        return self.PL_d0_dB + 10 * self.path_loss_exponent * np.log10(np.maximum(distances, self.d0) / self.d0)
 
-            # Add log-normal shadowing
-            shadowing_dB = np.random.normal(0, self.shadowing_std_dev_dB)
-            total_loss_dB = path_loss_dB + shadowing_dB
-            rssi = self.tx_power_dBm - total_loss_dB
-            simulated_rssi[sensor_id] = max(rssi, self.noise_floor_dBm)
+    def expected_rssi_matrix(self, device_positions: np.ndarray, ap_positions: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Noise-free RSSI from many positions to every sensor, clamped at the noise floor.
 
-        return simulated_rssi
+        Returns:
+            An (N, M) array of RSSI values
+        """
+        return np.maximum(self.tx_power_dBm - self.path_loss_matrix(device_positions, ap_positions), self.noise_floor_dBm)
+
+    def simulate_rssi_matrix(self,
+                             device_positions: np.ndarray,
+                             device_keys: Optional[List[Tuple[str, int]]] = None) -> np.ndarray:
+        """
+        Simulate RSSI from many device positions to every sensor at once.
+
+        Uses the same clamping as simulate_rssi_from_position (0.1 m minimum
+        distance, free-space loss up to d0, noise floor) with a single
+        shadowing draw for the whole batch.
+
+        Args:
+            device_positions: (N, 2) array of device (x, y) positions
+            device_keys: Optional (device_id, epoch) per row; when given, the
+                         shadowing comes from keyed_shadowing instead, so a
+                         device at an epoch always gets the same draw
+
+        Returns:
+            An (N, M) array of RSSI values, columns in sensor_positions order
+        """
+        path_loss_dB = self.path_loss_matrix(device_positions)
+
+        # Add log-normal shadowing
+        if device_keys is None:
+            shadowing_dB = self.rng.normal(0, self.shadowing_std_dev_dB, size=path_loss_dB.shape)
+        else:
+            shadowing_dB = self.keyed_shadowing(device_keys).reshape(path_loss_dB.shape)
+        rssi = self.tx_power_dBm - (path_loss_dB + shadowing_dB)
+        return np.maximum(rssi, self.noise_floor_dBm)
@@ -0,0 +1,140 @@
+"""
+Uniform-grid spatial index over estimated device positions.
+"""
+
+import math
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+import numpy as np
+
+Cell = Tuple[int, int]
+
+
+class GridIndex:
+    """
+    Buckets points into square cells so bounding-box, radius and polygon
+    queries only look at the cells they overlap. Points are moved one at a
+    time, so keeping the index current costs O(1) per changed device.
+    """
+
+    def __init__(self, cell_size: float = 5.0):
+        """
+        Initialize an empty index.
+
+        Args:
+            cell_size: Edge length of a grid cell in meters (roughly the
+                       expected query size divided by a few)
+        """
+        self.cell_size = cell_size
+        self._cells: Dict[Cell, Set[str]] = {}
+        self._points: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._points
+
+    def _cell(self, x: float, y: float) -> Cell:
+        return (math.floor(x / self.cell_size), math.floor(y / self.cell_size))
+
+    def _remove(self, key: str) -> None:
+        point = self._points.pop(key, None)
+        if point is not None:
+            cell = self._cell(*point)
+            members = self._cells[cell]
+            members.discard(key)
+            if not members:
+                del self._cells[cell]
+
+    def update(self, keys: Sequence[str], positions: np.ndarray) -> None:
+        """
+        Insert or move points; rows with a non-finite coordinate are removed.
+
+        Args:
+            keys: Point identifiers (device IDs)
+            positions: (N, 2) array of positions
+        """
+        positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+        finite = np.isfinite(positions).all(axis=1)
+        with self._lock:
+            for key, (x, y), ok in zip(keys, positions.tolist(), finite):
+                old = self._points.get(key)
+                if ok and old == (x, y):
+                    continue
+                self._remove(key)
+                if ok:
+                    self._points[key] = (x, y)
+                    self._cells.setdefault(self._cell(x, y), set()).add(key)
+
+    def remove(self, keys: Iterable[str]) -> None:
+        with self._lock:
+            for key in keys:
+                self._remove(key)
+
+    def _candidates(self, xmin: float, ymin: float, xmax: float, ymax: float) -> Tuple[List[str], np.ndarray]:
+        """Points in the cells overlapping a box, with their positions (caller holds the lock)."""
+        try:
+            cx0, cy0 = self._cell(xmin, ymin)
+            cx1, cy1 = self._cell(xmax, ymax)
+        except OverflowError:
+            # Bounds too large for cell numbers (e.g. x + radius overflowed): every occupied cell is a candidate
+            cx0 = cy0 = -math.inf
+            cx1 = cy1 = math.inf
+        keys: List[str] = []
+        if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) <= len(self._cells):
+            for cx in range(cx0, cx1 + 1):
+                for cy in range(cy0, cy1 + 1):
+                    keys.extend(self._cells.get((cx, cy), ()))
+        else:
+            # Box covers more cells than are occupied: walk the occupied ones instead
+            for (cx, cy), members in self._cells.items():
+                if cx0 <= cx <= cx1 and cy0 <= cy <= cy1:
+                    keys.extend(members)
+        positions = np.array([self._points[key] for key in keys], dtype=float).reshape(-1, 2)
+        return keys, positions
+
+    def query_bbox(self, xmin: float, ymin: float, xmax: float, ymax: float) -> Set[str]:
+        """Keys of the points with xmin <= x <= xmax and ymin <= y <= ymax."""
+        with self._lock:
+            keys, positions = self._candidates(xmin, ymin, xmax, ymax)
+        inside = ((positions[:, 0] >= xmin) & (positions[:, 0] <= xmax)
+                  & (positions[:, 1] >= ymin) & (positions[:, 1] <= ymax))
+        return {key for key, ok in zip(keys, inside) if ok}
+
+    def query_radius(self, x: float, y: float, radius: float) -> Set[str]:
+        """Keys of the points within radius of (x, y)."""
+        with self._lock:
+            keys, positions = self._candidates(x - radius, y - radius, x + radius, y + radius)
+        inside = np.hypot(positions[:, 0] - x, positions[:, 1] - y) <= radius
+        return {key for key, ok in zip(keys, inside) if ok}
+
+    def query_polygon(self, vertices: Sequence[Tuple[float, float]]) -> Set[str]:
+        """
+        Keys of the points inside a simple polygon (even-odd rule).
+
+        Args:
+            vertices: (x, y) corners in order; the polygon is closed implicitly
+        """
+        polygon = np.asarray(vertices, dtype=float).reshape(-1, 2)
+        if len(polygon) < 3:
+            raise ValueError("A zone needs at least 3 vertices")
+        xmin, ymin = polygon.min(axis=0)
+        xmax, ymax = polygon.max(axis=0)
+        with self._lock:
+            keys, positions = self._candidates(xmin, ymin, xmax, ymax)
+
+        # Ray casting, vectorized over points x edges
+        px, py = positions[:, 0:1], positions[:, 1:2]
+        x0, y0 = polygon[:, 0], polygon[:, 1]
+        x1, y1 = np.roll(x0, -1), np.roll(y0, -1)
+        crosses = (y0 > py) != (y1 > py)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            x_at = x0 + (py - y0) * (x1 - x0) / (y1 - y0)
+        inside = np.count_nonzero(crosses & (px < x_at), axis=1) % 2 == 1
+        return {key for key, ok in zip(keys, inside) if ok}
+
+    def position(self, key: str) -> Optional[Tuple[float, float]]:
+        with self._lock:
+            return self._points.get(key)
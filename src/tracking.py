@@ -0,0 +1,257 @@
+"""
+Per-device position tracking with a vectorized constant-velocity Kalman filter.
+"""
+
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+
+
+class PositionTracker:
+    """
+    Tracks (x, y, vx, vy) and covariance for every device, updated in batches.
+    Updates and reads are serialized by a lock, so they may come from any thread.
+    """
+
+    def __init__(self,
+                 measurement_std: float = 2.0,
+                 acceleration_std: float = 0.5,
+                 initial_velocity_std: float = 1.0,
+                 stale_after: Optional[float] = 300.0):
+        """
+        Initialize the tracker.
+
+        Args:
+            measurement_std: Standard deviation of a position fix in meters
+            acceleration_std: Process noise as random acceleration in m/s^2
+            initial_velocity_std: Velocity uncertainty of a new track in m/s
+            stale_after: Seconds without a fix after which a track is dropped
+                         (None keeps tracks forever)
+        """
+        self.measurement_std = measurement_std
+        self.acceleration_std = acceleration_std
+        self.initial_velocity_std = initial_velocity_std
+        self.stale_after = stale_after
+
+        self.device_ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self.state = np.zeros((0, 4))
+        self.covariance = np.zeros((0, 4, 4))
+        self.last_update = np.zeros(0)
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self.device_ids)
+
+    def _transition(self, dt: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Batched constant-velocity transition and process noise matrices.
+
+        Args:
+            dt: (N,) time steps in seconds
+
+        Returns:
+            Tuple of (N, 4, 4) transition matrices and (N, 4, 4) process noise
+        """
+        n = len(dt)
+        F = np.tile(np.eye(4), (n, 1, 1))
+        F[:, 0, 2] = dt
+        F[:, 1, 3] = dt
+
+        q = self.acceleration_std ** 2
+        dt2, dt3, dt4 = dt ** 2, dt ** 3, dt ** 4
+        Q = np.zeros((n, 4, 4))
+        for axis in (0, 1):
+            Q[:, axis, axis] = q * dt4 / 4
+            Q[:, axis, axis + 2] = Q[:, axis + 2, axis] = q * dt3 / 2
+            Q[:, axis + 2, axis + 2] = q * dt2
+        return F, Q
+
+    def _add_tracks(self, device_ids: Sequence[str], positions: np.ndarray, timestamps: np.ndarray) -> None:
+        """Start new tracks at their first fix, at rest with wide velocity uncertainty."""
+        n = len(device_ids)
+        state = np.zeros((n, 4))
+        state[:, :2] = positions
+        covariance = np.zeros((n, 4, 4))
+        covariance[:, 0, 0] = covariance[:, 1, 1] = self.measurement_std ** 2
+        covariance[:, 2, 2] = covariance[:, 3, 3] = self.initial_velocity_std ** 2
+
+        for device_id in device_ids:
+            self._rows[device_id] = len(self.device_ids)
+            self.device_ids.append(device_id)
+        self.state = np.concatenate([self.state, state])
+        self.covariance = np.concatenate([self.covariance, covariance])
+        self.last_update = np.concatenate([self.last_update, timestamps])
+
+    def update(self,
+               device_ids: Sequence[str],
+               positions: np.ndarray,
+               timestamps: np.ndarray,
+               measurement_std: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Fold a batch of position fixes into the tracks (predict + update).
+
+        Args:
+            device_ids: Device of each fix (each device at most once per batch)
+            positions: (N, 2) array of position fixes, e.g. trilateration output
+            timestamps: (N,) fix times in seconds
+            measurement_std: Optional (N,) per-fix standard deviation in meters
+
+        Returns:
+            (N, 2) array of smoothed positions for the given devices
+        """
+        positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+        timestamps = np.broadcast_to(np.asarray(timestamps, dtype=float), (len(positions),))
+        if measurement_std is None:
+            measurement_std = np.full(len(positions), self.measurement_std)
+        measurement_std = np.broadcast_to(np.asarray(measurement_std, dtype=float), (len(positions),))
+
+        with self._lock:
+            known = np.array([device_id in self._rows for device_id in device_ids], dtype=bool)
+            if known.any():
+                idx = np.array([self._rows[device_id] for device_id, k in zip(device_ids, known) if k])
+                dt = np.maximum(timestamps[known] - self.last_update[idx], 0.0)
+                F, Q = self._transition(dt)
+
+                # Predict
+                x = np.einsum('nij,nj->ni', F, self.state[idx])
+                P = F @ self.covariance[idx] @ F.transpose(0, 2, 1) + Q
+
+                # Update with H = [I 0]
+                R = (measurement_std[known] ** 2)[:, None, None] * np.eye(2)
+                S = P[:, :2, :2] + R
+                K = P[:, :, :2] @ np.linalg.inv(S)
+                innovation = positions[known] - x[:, :2]
+                self.state[idx] = x + np.einsum('nij,nj->ni', K, innovation)
+                self.covariance[idx] = P - K @ P[:, :2, :]
+                self.last_update[idx] = timestamps[known]
+
+            if not known.all():
+                new_ids = [device_id for device_id, k in zip(device_ids, known) if not k]
+                self._add_tracks(new_ids, positions[~known], timestamps[~known])
+
+            if self.stale_after is not None and len(timestamps):
+                self.drop_stale(float(np.max(timestamps)))
+
+            return self.positions(device_ids)
+
+    def drop_stale(self, now: float) -> int:
+        """
+        Remove tracks without a fix for more than stale_after seconds.
+
+        Args:
+            now: Current time in seconds
+
+        Returns:
+            Number of tracks removed
+        """
+        if self.stale_after is None:
+            return 0
+        with self._lock:
+            keep = (now - self.last_update) <= self.stale_after
+            removed = int(np.count_nonzero(~keep))
+            if removed:
+                self.device_ids = [device_id for device_id, k in zip(self.device_ids, keep) if k]
+                self._rows = {device_id: row for row, device_id in enumerate(self.device_ids)}
+                self.state = self.state[keep]
+                self.covariance = self.covariance[keep]
+                self.last_update = self.last_update[keep]
+            return removed
+
+    def positions(self, device_ids: Sequence[str]) -> np.ndarray:
+        """
+        Current smoothed positions; NaN for devices that are not tracked.
+        """
+        result = np.full((len(device_ids), 2), np.nan)
+        with self._lock:
+            for i, device_id in enumerate(device_ids):
+                row = self._rows.get(device_id)
+                if row is not None:
+                    result[i] = self.state[row, :2]
+        return result
+
+    def predict(self, timestamp: float) -> Dict[str, Tuple[float, float]]:
+        """
+        Extrapolate every track to a common time without changing its state.
+
+        Args:
+            timestamp: Time in seconds to predict to
+
+        Returns:
+            Dictionary mapping device IDs to predicted (x, y) positions
+        """
+        with self._lock:
+            dt = np.maximum(timestamp - self.last_update, 0.0)
+            predicted = self.state[:, :2] + self.state[:, 2:] * dt[:, None]
+            device_ids = list(self.device_ids)
+        return {device_id: (float(x), float(y)) for device_id, (x, y) in zip(device_ids, predicted)}
+
+    def estimate(self, device_id: str) -> Optional[Dict[str, float]]:
+        """
+        Smoothed state of one device.
+
+        Returns:
+            Dictionary with x, y, vx, vy and position standard deviation, or
+            None if the device is not tracked
+        """
+        with self._lock:
+            row = self._rows.get(device_id)
+            if row is None:
+                return None
+            x, y, vx, vy = self.state[row]
+            variance = self.covariance[row, 0, 0] + self.covariance[row, 1, 1]
+        std = float(np.sqrt(variance / 2))
+        return {'x': float(x), 'y': float(y), 'vx': float(vx), 'vy': float(vy), 'std': std}
+
+
+def track_new_measurements(reader, converter, engine, tracker: PositionTracker,
+                           statistic: str = "median") -> Dict[str, Tuple[float, float]]:
+    """
+    Poll the capture reader and feed fresh position fixes into the tracker.
+
+    Only devices with new rows in this poll are re-solved, each from its
+    sliding-window RSSI at the sensors that heard it (sparse input, so the
+    engine must be created with sensor_ids).
+
+    Args:
+        reader: RSSIDataReader following the capture files
+        converter: RSSIConverter used for RSSI -> distance
+        engine: TrilaterationEngine with sensor_ids
+        tracker: PositionTracker to update
+        statistic: Window statistic solved from: "median", "ema" or "latest"
+
+    Returns:
+        Dictionary mapping updated device IDs to smoothed (x, y) positions
+    """
+    import pandas as pd
+
+    batch = reader.poll_new_measurements()
+    if batch.empty:
+        return {}
+
+    device_ids, sensor_ids, matrix = reader.get_aggregated_rssi_matrix(statistic)
+    wanted = set(batch['device_id'])
+    rows = [i for i, device_id in enumerate(device_ids) if device_id in wanted]
+    if not rows:
+        return {}
+
+    distances = converter.rssi_to_distance_matrix(matrix[rows])
+    measurements = [
+        {sensor_id: d for sensor_id, d in zip(sensor_ids, row) if np.isfinite(d)}
+        for row in distances
+    ]
+    positions, _, _ = engine.estimate_positions_sparse(measurements)
+    solved = np.isfinite(positions).all(axis=1)
+    if not solved.any():
+        return {}
+    ids = [device_ids[row] for row, ok in zip(rows, solved) if ok]
+    positions = positions[solved]
+
+    fix_times = batch.groupby('device_id')['timestamp'].max()
+    timestamps = np.array([
+        fix_times[device_id].timestamp() if pd.notna(fix_times[device_id]) else pd.Timestamp.now().timestamp()
+        for device_id in ids
+    ])
+    smoothed = tracker.update(ids, positions, timestamps)
+    return {device_id: (float(x), float(y)) for device_id, (x, y) in zip(ids, smoothed)}
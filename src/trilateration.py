@@ -2,53 +2,78 @@
 Position estimation module using trilateration.
 """
 
-from typing import List, Tuple, Dict
+from typing import List, Optional, Tuple, Dict, Union
 import numpy as np
-from scipy.optimize import minimize
 from .utils import validate_sensor_positions
+from .metrics import OPTIMIZER_FUNCTION_EVALS, OPTIMIZER_ITERATIONS, OPTIMIZER_RUNS, record_minimize
 
 class TrilaterationEngine:
     """Implements trilateration-based position estimation."""
     
-    def __init__(self, sensor_positions: List[Tuple[float, float]]):
+    def __init__(self,
+                 sensor_positions: List[Tuple[float, float]],
+                 sensor_ids: Optional[List[str]] = None):
         """
         Initialize the trilateration engine.
         
         Args:
             sensor_positions: List of (x, y) coordinates for each sensor
+            sensor_ids: Optional ID of each sensor, required for sparse
+                        {sensor_id: distance} input
         """
         if not validate_sensor_positions(sensor_positions):
             raise ValueError("Invalid sensor positions")
+        if sensor_ids is not None and len(sensor_ids) != len(sensor_positions):
+            raise ValueError("Number of sensor IDs must match number of sensors")
         
         self.sensor_positions = np.array(sensor_positions)
+        self.sensor_ids = list(sensor_ids) if sensor_ids is not None else None
+        self._sensor_columns = {sid: i for i, sid in enumerate(self.sensor_ids or [])}
+        self._sensor_tree = None
     
-    def _calculate_error(self, point: np.ndarray, distances: np.ndarray) -> float:
+    def _calculate_error(self, point: np.ndarray, distances: np.ndarray,
+                         sensors: Optional[np.ndarray] = None) -> float:
         """
         Calculate the error between estimated and measured distances.
         
         Args:
             point: Current position estimate (x, y)
             distances: Measured distances to each sensor
+            sensors: Positions of the sensors the distances refer to
+                     (defaults to all sensors)
             
         Returns:
             Sum of squared errors
         """
-        estimated_distances = np.sqrt(np.sum((self.sensor_positions - point) ** 2, axis=1))
+        if sensors is None:
+            sensors = self.sensor_positions
+        estimated_distances = np.sqrt(np.sum((sensors - point) ** 2, axis=1))
         return np.sum((estimated_distances - distances) ** 2)
     
-    def estimate_position(self, distances: List[float]) -> Tuple[float, float]:
+    def estimate_position(self, distances: Union[List[float], Dict[str, float]],
+                          k: int = 4) -> Tuple[float, float]:
         """
         Estimate position using trilateration with least squares optimization.
         
         Args:
-            distances: List of distances to each sensor
+            distances: List of distances to each sensor, or a sparse
+                       {sensor_id: distance} dict of the sensors that heard the device
+            k: For sparse input, number of nearest sensors to solve on
             
         Returns:
             Estimated (x, y) position
         """
+        if isinstance(distances, dict):
+            positions, _, _ = self.estimate_positions_sparse([distances], k=k)
+            if np.isnan(positions[0]).any():
+                raise ValueError("At least 3 known sensors with valid distances are required")
+            return tuple(positions[0])
+        
         if len(distances) != len(self.sensor_positions):
             raise ValueError("Number of distances must match number of sensors")
         
+        from scipy.optimize import minimize
+        
         distances = np.array(distances)
         initial_guess = np.mean(self.sensor_positions, axis=0)
         
@@ -58,9 +83,276 @@ class TrilaterationEngine:
             args=(distances,),
             method='Nelder-Mead'
         )
+        record_minimize(result)
         
         return tuple(result.x)
     
+    def _linear_initial_guess(self, distance_matrix: np.ndarray, sensors: np.ndarray) -> np.ndarray:
+        """
+        Closed-form linearized least-squares guess for a batch of devices.
+        
+        Subtracting the last sensor's circle equation from the others gives a
+        linear system A p = b. With a shared (M, 2) sensor layout A is the same
+        for every row, so a single pseudo-inverse serves the whole batch; with
+        per-row (N, M, 2) sensors the pseudo-inverses are computed as a stack.
+        
+        Args:
+            distance_matrix: (N, M) array of distances to each sensor
+            sensors: (M, 2) shared or (N, M, 2) per-row sensor positions
+            
+        Returns:
+            (N, 2) array of initial position guesses
+        """
+        reference = sensors[..., -1:, :]
+        others = sensors[..., :-1, :]
+        A = 2 * (others - reference)
+        b = (distance_matrix[:, -1:] ** 2 - distance_matrix[:, :-1] ** 2
+             + np.sum(others ** 2, axis=-1) - np.sum(reference ** 2, axis=-1))
+        if sensors.ndim == 2:
+            return b @ np.linalg.pinv(A).T
+        return np.einsum('nij,nj->ni', np.linalg.pinv(A), b)
+    
+    def _batch_residuals(self, points: np.ndarray, distance_matrix: np.ndarray,
+                         sensors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Distance residuals and sensor offsets for a batch of position estimates.
+        
+        Args:
+            points: (N, 2) array of position estimates
+            distance_matrix: (N, M) array of measured distances
+            sensors: (M, 2) shared or (N, M, 2) per-row sensor positions
+            
+        Returns:
+            Tuple of (N, M) residuals and (N, M, 2) point-to-sensor offsets
+        """
+        offsets = points[:, None, :] - sensors
+        estimated = np.sqrt(np.sum(offsets ** 2, axis=2))
+        return estimated - distance_matrix, offsets
+    
+    def estimate_positions_batch(self,
+                                 distance_matrix: np.ndarray,
+                                 max_iterations: int = 20,
+                                 tolerance: float = 1e-6,
+                                 fallback: bool = True,
+                                 sensor_columns: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Estimate positions for many devices at once.
+        
+        Starts from the linearized least-squares solution and refines every row
+        with vectorized Levenberg-Marquardt steps. Rows that do not converge are
+        optionally re-solved with Nelder-Mead, starting from the batch result.
+        
+        Args:
+            distance_matrix: (N, M) array of distances, one row per device and
+                             one column per sensor
+            max_iterations: Maximum number of Levenberg-Marquardt iterations
+            tolerance: Step size (in meters) below which a row counts as converged
+            fallback: Whether to re-solve non-converged rows with Nelder-Mead
+            sensor_columns: Optional (N, K) sensor indices, K >= 3; when given,
+                            distance_matrix is (N, K) and row i holds the
+                            distances to sensors sensor_columns[i]
+            
+        Returns:
+            Tuple of (N, 2) estimated positions, (N,) sums of squared errors and
+            (N,) boolean convergence flags of the batch solver; rows with a
+            NaN or infinite distance are NaN and not converged
+        """
+        distance_matrix = np.atleast_2d(np.asarray(distance_matrix, dtype=float))
+        if sensor_columns is not None:
+            sensor_columns = np.asarray(sensor_columns)
+            if sensor_columns.shape != distance_matrix.shape or sensor_columns.shape[1] < 3:
+                raise ValueError("sensor_columns must be (N, K) with K >= 3, matching distance_matrix")
+            sensors = self.sensor_positions[sensor_columns]
+            return self._solve_batch(distance_matrix, sensors, max_iterations, tolerance, fallback)
+        if distance_matrix.shape[1] != len(self.sensor_positions):
+            raise ValueError("Number of distances must match number of sensors")
+        
+        return self._solve_batch(distance_matrix, self.sensor_positions, max_iterations, tolerance, fallback)
+    
+    def _solve_batch(self,
+                     distance_matrix: np.ndarray,
+                     sensors: np.ndarray,
+                     max_iterations: int,
+                     tolerance: float,
+                     fallback: bool) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Linearized guess + vectorized Levenberg-Marquardt (+ Nelder-Mead fallback).
+        
+        Args:
+            distance_matrix: (N, M) array of distances
+            sensors: (M, 2) shared or (N, M, 2) per-row sensor positions
+            
+        Returns:
+            Same as estimate_positions_batch
+        """
+        n_devices = distance_matrix.shape[0]
+        per_row = sensors.ndim == 3
+        valid = np.all(np.isfinite(distance_matrix), axis=1)
+        if not valid.all():
+            # Rows with a missing distance have no solution; they are left out of the solve and the fallback
+            points = np.full((n_devices, 2), np.nan)
+            cost = np.full(n_devices, np.nan)
+            converged = np.zeros(n_devices, dtype=bool)
+            if valid.any():
+                points[valid], cost[valid], converged[valid] = self._solve_batch(
+                    distance_matrix[valid], sensors[valid] if per_row else sensors,
+                    max_iterations, tolerance, fallback
+                )
+            return points, cost, converged
+        
+        points = self._linear_initial_guess(distance_matrix, sensors)
+        residuals, offsets = self._batch_residuals(points, distance_matrix, sensors)
+        cost = np.sum(residuals ** 2, axis=1)
+        damping = np.full(n_devices, 1e-3)
+        converged = np.zeros(n_devices, dtype=bool)
+        identity = np.eye(2)
+        row_iterations = 0
+        
+        for _ in range(max_iterations):
+            active = ~converged
+            if not active.any():
+                break
+            row_iterations += int(np.count_nonzero(active))
+            
+            norms = np.sqrt(np.sum(offsets[active] ** 2, axis=2, keepdims=True))
+            jacobian = offsets[active] / np.maximum(norms, 1e-12)
+            jtj = np.einsum('nmi,nmj->nij', jacobian, jacobian)
+            jtr = np.einsum('nmi,nm->ni', jacobian, residuals[active])
+            
+            lhs = jtj + damping[active, None, None] * (jtj * identity + identity * 1e-9)
+            step = -np.linalg.solve(lhs, jtr[..., None])[..., 0]
+            
+            candidate = points[active] + step
+            cand_residuals, cand_offsets = self._batch_residuals(
+                candidate, distance_matrix[active], sensors[active] if per_row else sensors
+            )
+            cand_cost = np.sum(cand_residuals ** 2, axis=1)
+            
+            improved = cand_cost <= cost[active]
+            idx = np.flatnonzero(active)
+            accepted = idx[improved]
+            points[accepted] = candidate[improved]
+            residuals[accepted] = cand_residuals[improved]
+            offsets[accepted] = cand_offsets[improved]
+            cost[accepted] = cand_cost[improved]
+            damping[idx] = np.where(improved, damping[idx] * 0.3, damping[idx] * 10.0)
+            
+            step_size = np.sqrt(np.sum(step ** 2, axis=1))
+            converged[idx] = step_size < tolerance
+        
+        converged &= np.isfinite(cost)
+        OPTIMIZER_RUNS.inc(n_devices, solver="levenberg_marquardt")
+        OPTIMIZER_ITERATIONS.inc(row_iterations, solver="levenberg_marquardt")
+        OPTIMIZER_FUNCTION_EVALS.inc(n_devices + row_iterations, solver="levenberg_marquardt")
+        
+        if fallback and not converged.all():
+            from scipy.optimize import minimize
+            for i in np.flatnonzero(~converged):
+                row_sensors = sensors[i] if per_row else sensors
+                start = points[i] if np.all(np.isfinite(points[i])) else np.mean(row_sensors, axis=0)
+                result = minimize(
+                    self._calculate_error,
+                    start,
+                    args=(distance_matrix[i], row_sensors),
+                    method='Nelder-Mead'
+                )
+                record_minimize(result, solver="nelder_mead_fallback")
+                points[i] = result.x
+                cost[i] = result.fun
+        
+        return points, cost, converged
+    
+    def _select_sensors(self, measurement: Dict[str, float], k: int) -> List[int]:
+        """
+        Choose up to k sensors to solve a sparse measurement on.
+        
+        The sensor with the shortest measured distance anchors the selection;
+        the spatial index over sensor positions then yields its neighbours, and
+        the k closest by measured distance among those that heard the device
+        are kept. If the neighbourhood is too sparse, the k closest heard
+        sensors overall are used.
+        
+        Args:
+            measurement: {sensor_id: distance} for the sensors that heard the device
+            k: Number of sensors to keep
+            
+        Returns:
+            Column indices into sensor_positions
+        """
+        heard = {}
+        for sensor_id, distance in measurement.items():
+            column = self._sensor_columns.get(sensor_id)
+            if column is not None and distance is not None and np.isfinite(distance):
+                heard[column] = float(distance)
+        if len(heard) <= k:
+            return list(heard)
+        
+        if self._sensor_tree is None:
+            from scipy.spatial import cKDTree
+            self._sensor_tree = cKDTree(self.sensor_positions)
+        
+        anchor = min(heard, key=heard.get)
+        n_query = min(len(self.sensor_positions), 4 * k)
+        _, neighbours = self._sensor_tree.query(self.sensor_positions[anchor], k=n_query)
+        nearby = [int(c) for c in np.atleast_1d(neighbours) if int(c) in heard]
+        if len(nearby) < k:
+            nearby = list(heard)
+        return sorted(nearby, key=heard.get)[:k]
+    
+    def estimate_positions_sparse(self,
+                                  measurements: List[Dict[str, float]],
+                                  k: int = 4,
+                                  max_iterations: int = 20,
+                                  tolerance: float = 1e-6,
+                                  fallback: bool = True) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Estimate positions from sparse {sensor_id: distance} measurements.
+        
+        Each device is solved on at most k nearby sensors that heard it, so the
+        cost per device does not grow with the total number of sensors. Devices
+        are grouped by subset size and each group is solved as one batch.
+        
+        Args:
+            measurements: One {sensor_id: distance} dict per device; unknown
+                          sensors and missing/NaN distances are ignored
+            k: Number of sensors to solve on per device (at least 3)
+            max_iterations: Maximum number of Levenberg-Marquardt iterations
+            tolerance: Step size (in meters) below which a row counts as converged
+            fallback: Whether to re-solve non-converged rows with Nelder-Mead
+            
+        Returns:
+            Tuple of (N, 2) positions, (N,) sums of squared errors and (N,)
+            convergence flags; rows with fewer than 3 usable sensors are NaN
+            and not converged
+        """
+        if self.sensor_ids is None:
+            raise ValueError("Sparse input requires the engine to be created with sensor_ids")
+        k = max(k, 3)
+        
+        n_devices = len(measurements)
+        positions = np.full((n_devices, 2), np.nan)
+        cost = np.full(n_devices, np.nan)
+        converged = np.zeros(n_devices, dtype=bool)
+        
+        groups: Dict[int, List[Tuple[int, List[int]]]] = {}
+        for row, measurement in enumerate(measurements):
+            columns = self._select_sensors(measurement, k)
+            if len(columns) >= 3:
+                groups.setdefault(len(columns), []).append((row, columns))
+        
+        for entries in groups.values():
+            rows = [row for row, _ in entries]
+            columns = np.array([cols for _, cols in entries])
+            distances = np.array([
+                [measurements[row][self.sensor_ids[c]] for c in cols] for row, cols in entries
+            ], dtype=float)
+            sensors = self.sensor_positions[columns]
+            positions[rows], cost[rows], converged[rows] = self._solve_batch(
+                distances, sensors, max_iterations, tolerance, fallback
+            )
+        
+        return positions, cost, converged
+    
     def estimate_multiple_positions(self, 
                                   distance_measurements: List[List[float]]) -> List[Tuple[float, float]]:
         """
@@ -73,4 +365,7 @@ class TrilaterationEngine:
         Returns:
             List of estimated (x, y) positions
         """
-        return [self.estimate_position(distances) for distances in distance_measurements] 
\ No newline at end of file
+        if len(distance_measurements) == 0:
+            return []
+        positions, _, _ = self.estimate_positions_batch(np.array(distance_measurements, dtype=float))
+        return [tuple(p) for p in positions]
@@ -0,0 +1,179 @@
+"""
+Write-behind queue that group-commits device position updates.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+# (device_id, x, y, timestamp)
+PositionUpdate = Tuple[str, float, float, str]
+
+
+class QueueFull(Exception):
+    """Raised when a new device cannot be queued because max_pending is reached."""
+
+
+class PositionUpdateQueue:
+    """
+    Accepts position updates from request threads and hands them to a commit
+    function in batches from one background thread. Repeated updates of a
+    device that is still waiting are coalesced (latest position wins, the
+    device keeps its place in line), so at most one entry per device is held
+    and a burst of drag events costs a single commit.
+    """
+
+    def __init__(self,
+                 commit: Callable[[List[PositionUpdate]], None],
+                 max_pending: int = 10000,
+                 batch_size: int = 256,
+                 flush_interval: float = 0.05):
+        """
+        Initialize the queue and start the writer thread.
+
+        Args:
+            commit: Called from the writer thread with up to batch_size updates,
+                    oldest first, at most one per device
+            max_pending: Maximum number of distinct devices waiting to be committed
+            batch_size: Number of pending devices that triggers an immediate commit
+            flush_interval: Maximum seconds an update waits before it is committed
+        """
+        self.commit = commit
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._pending: "OrderedDict[str, PositionUpdate]" = OrderedDict()
+        self._oldest: Optional[float] = None
+        self._in_flight = 0
+        self._closed = False
+        self._condition = threading.Condition()
+        self._stats = {'submitted': 0, 'coalesced': 0, 'committed': 0, 'batches': 0, 'rejected': 0, 'failed': 0}
+
+        self._thread = threading.Thread(target=self._run, name="position-update-writer", daemon=True)
+        self._thread.start()
+
+    def __len__(self) -> int:
+        with self._condition:
+            return len(self._pending)
+
+    def submit(self, device_id: str, x: float, y: float, timestamp: str, timeout: float = 0.0) -> int:
+        """
+        Queue a position update.
+
+        Args:
+            device_id: MAC address of the device
+            x: New x coordinate
+            y: New y coordinate
+            timestamp: ISO timestamp of the update, used for the log rows
+            timeout: Seconds to wait for room when the queue is full
+
+        Returns:
+            Number of devices waiting to be committed
+
+        Raises:
+            QueueFull: If the device is not queued yet and no room frees up in time
+        """
+        update = (device_id, x, y, timestamp)
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Position update queue is closed")
+            if device_id in self._pending:
+                self._pending[device_id] = update
+                self._stats['submitted'] += 1
+                self._stats['coalesced'] += 1
+                return len(self._pending)
+
+            deadline = time.monotonic() + timeout
+            while len(self._pending) >= self.max_pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats['rejected'] += 1
+                    raise QueueFull(f"{len(self._pending)} devices waiting to be committed")
+                self._condition.wait(remaining)
+
+            if not self._pending:
+                self._oldest = time.monotonic()
+            self._pending[device_id] = update
+            self._stats['submitted'] += 1
+            # The writer needs to know when the first update arms its timer or a batch fills up
+            if len(self._pending) == 1 or len(self._pending) >= self.batch_size:
+                self._condition.notify_all()
+            return len(self._pending)
+
+    def _take_batch(self) -> Optional[List[PositionUpdate]]:
+        """Block until a batch is due (size, age or shutdown); None once closed and drained."""
+        with self._condition:
+            while True:
+                if self._pending:
+                    due = self._oldest + self.flush_interval
+                    now = time.monotonic()
+                    if self._closed or len(self._pending) >= self.batch_size or now >= due:
+                        break
+                    self._condition.wait(due - now)
+                elif self._closed:
+                    return None
+                else:
+                    self._condition.wait()
+
+            count = min(self.batch_size, len(self._pending))
+            batch = [self._pending.popitem(last=False)[1] for _ in range(count)]
+            self._oldest = time.monotonic() if self._pending else None
+            self._in_flight = len(batch)
+            # Room for new devices: wake submitters blocked on a full queue
+            self._condition.notify_all()
+            return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._take_batch()
+            if batch is None:
+                return
+            try:
+                self.commit(batch)
+                failed = False
+            except Exception as e:
+                # Keep the writer alive; these updates are lost, later ones still commit
+                print(f"Warning: committing {len(batch)} position updates failed: {e}")
+                failed = True
+            with self._condition:
+                self._in_flight = 0
+                self._stats['failed' if failed else 'committed'] += len(batch)
+                self._stats['batches'] += 1
+                self._condition.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Commit everything queued so far and wait for it.
+
+        Args:
+            timeout: Maximum seconds to wait; None waits indefinitely
+
+        Returns:
+            True if the queue was drained, False on timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            if self._pending:
+                # Make the pending updates due now instead of after flush_interval
+                self._oldest = time.monotonic() - self.flush_interval
+                self._condition.notify_all()
+            while self._pending or self._in_flight:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+            return True
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Stop accepting updates, commit what is queued and stop the writer thread."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join(timeout)
+
+    def stats(self) -> Dict[str, int]:
+        """Counts of submitted, coalesced, committed, failed and rejected updates, batches, and current depth."""
+        with self._condition:
+            return dict(self._stats, pending=len(self._pending), in_flight=self._in_flight)
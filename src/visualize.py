@@ -2,28 +2,103 @@
 Visualization module for indoor positioning results.
 """
 
+import hashlib
+import io
+import threading
+from collections import OrderedDict
 from typing import List, Tuple, Optional
-import matplotlib.pyplot as plt
 import numpy as np
-from .utils import calculate_mean_error
+
+# Above this many estimates positions are drawn as a hexbin density instead of a scatter
+DENSITY_THRESHOLD = 20000
+
+
+def position_errors(estimated_positions, ground_truth) -> np.ndarray:
+    """
+    Euclidean error of every estimate.
+    
+    Args:
+        estimated_positions: (N, 2) estimated positions
+        ground_truth: (N, 2) ground truth positions
+        
+    Returns:
+        (N,) array of errors in meters
+    """
+    difference = np.asarray(estimated_positions, dtype=float) - np.asarray(ground_truth, dtype=float)
+    return np.sqrt(np.sum(difference ** 2, axis=1))
+
 
 class PositionVisualizer:
     """Handles visualization of positions and sensor locations."""
     
-    def __init__(self, sensor_positions: List[Tuple[float, float]]):
+    def __init__(self, sensor_positions: List[Tuple[float, float]], max_cached_images: int = 64):
         """
         Initialize the visualizer.
         
         Args:
             sensor_positions: List of (x, y) coordinates for each sensor
+            max_cached_images: Rendered images kept by render_* (LRU)
         """
         self.sensor_positions = np.array(sensor_positions)
+        self.max_cached_images = max_cached_images
+        self._image_cache: "OrderedDict[str, bytes]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+    
+    def _draw_positions(self, ax, estimated_positions, ground_truth, title: str, show_error: bool,
+                        density: Optional[bool]) -> None:
+        """Draw sensors, estimates (scatter or hexbin) and ground truth into ax."""
+        estimated_positions = np.asarray(estimated_positions, dtype=float).reshape(-1, 2)
+        if density is None:
+            density = len(estimated_positions) > DENSITY_THRESHOLD
+        
+        # Plot estimated positions
+        if density:
+            hexbin = ax.hexbin(estimated_positions[:, 0], estimated_positions[:, 1],
+                               gridsize=80, bins='log', mincnt=1, cmap='Blues')
+            ax.figure.colorbar(hexbin, ax=ax, label='Estimates per cell')
+        else:
+            ax.scatter(estimated_positions[:, 0], estimated_positions[:, 1],
+                       c='blue', marker='o', label='Estimated Positions')
+        
+        # Plot sensor positions
+        ax.scatter(self.sensor_positions[:, 0], self.sensor_positions[:, 1],
+                   c='red', marker='^', s=100, label='Sensors')
+        
+        # Plot ground truth if available
+        if ground_truth is not None:
+            ground_truth = np.asarray(ground_truth, dtype=float).reshape(-1, 2)
+            if not density:
+                ax.scatter(ground_truth[:, 0], ground_truth[:, 1],
+                           c='green', marker='x', label='Ground Truth')
+            
+            if show_error and len(estimated_positions):
+                # Calculate and display error metrics (left out when nothing was estimated)
+                errors = position_errors(estimated_positions, ground_truth)
+                title = f"{title}\nMean Error: {np.mean(errors):.2f}m, Max Error: {np.max(errors):.2f}m"
+        
+        ax.set_title(title)
+        ax.set_xlabel('X Position (m)')
+        ax.set_ylabel('Y Position (m)')
+        ax.grid(True)
+        ax.legend()
+        ax.axis('equal')
+    
+    def _draw_error_histogram(self, ax, estimated_positions, ground_truth, title: str) -> None:
+        errors = position_errors(estimated_positions, ground_truth)
+        ax.hist(errors, bins=20 if len(errors) < DENSITY_THRESHOLD else 100, edgecolor='black')
+        ax.set_title(f"{title}\nMean Error: {np.mean(errors):.2f}m" if errors.size else title)
+        ax.set_xlabel('Error (m)')
+        ax.set_ylabel('Frequency')
+        ax.grid(True)
     
     def plot_positions(self, 
                       estimated_positions: List[Tuple[float, float]],
                       ground_truth: Optional[List[Tuple[float, float]]] = None,
                       title: str = "Positioning Results",
-                      show_error: bool = True) -> None:
+                      show_error: bool = True,
+                      density: Optional[bool] = None) -> None:
         """
         Plot estimated positions and sensor locations.
         
@@ -32,40 +107,12 @@ class PositionVisualizer:
             ground_truth: Optional list of ground truth (x, y) positions
             title: Plot title
             show_error: Whether to show error metrics if ground truth is available
+            density: Draw estimates as a hexbin density (default: above DENSITY_THRESHOLD points)
         """
-        plt.figure(figsize=(10, 8))
+        import matplotlib.pyplot as plt
         
-        # Plot sensor positions
-        plt.scatter(self.sensor_positions[:, 0], self.sensor_positions[:, 1],
-                   c='red', marker='^', s=100, label='Sensors')
-        
-        # Plot estimated positions
-        estimated_positions = np.array(estimated_positions)
-        plt.scatter(estimated_positions[:, 0], estimated_positions[:, 1],
-                   c='blue', marker='o', label='Estimated Positions')
-        
-        # Plot ground truth if available
-        if ground_truth is not None:
-            ground_truth = np.array(ground_truth)
-            plt.scatter(ground_truth[:, 0], ground_truth[:, 1],
-                       c='green', marker='x', label='Ground Truth')
-            
-            if show_error:
-                # Calculate and display error metrics
-                mean_error = calculate_mean_error(estimated_positions, ground_truth)
-                max_error = np.max([np.linalg.norm(est - true) 
-                                  for est, true in zip(estimated_positions, ground_truth)])
-                plt.title(f"{title}\nMean Error: {mean_error:.2f}m, Max Error: {max_error:.2f}m")
-            else:
-                plt.title(title)
-        else:
-            plt.title(title)
-        
-        plt.xlabel('X Position (m)')
-        plt.ylabel('Y Position (m)')
-        plt.grid(True)
-        plt.legend()
-        plt.axis('equal')
+        plt.figure(figsize=(10, 8))
+        self._draw_positions(plt.gca(), estimated_positions, ground_truth, title, show_error, density)
         plt.show()
     
     def plot_error_histogram(self, 
@@ -80,13 +127,201 @@ class PositionVisualizer:
             ground_truth: List of ground truth (x, y) positions
             title: Plot title
         """
-        errors = [np.linalg.norm(np.array(est) - np.array(true))
-                 for est, true in zip(estimated_positions, ground_truth)]
+        import matplotlib.pyplot as plt
         
         plt.figure(figsize=(10, 6))
-        plt.hist(errors, bins=20, edgecolor='black')
-        plt.title(f"{title}\nMean Error: {np.mean(errors):.2f}m")
-        plt.xlabel('Error (m)')
-        plt.ylabel('Frequency')
-        plt.grid(True)
-        plt.show() 
\ No newline at end of file
+        self._draw_error_histogram(plt.gca(), estimated_positions, ground_truth, title)
+        plt.show()
+    
+    def image_key(self, kind: str, fmt: str, *arrays, **options) -> str:
+        """
+        Hash of everything an image depends on: plot kind, format, sensors, data and options.
+        
+        Usable as an HTTP ETag for the rendered image.
+        """
+        digest = hashlib.sha1(f"{kind}|{fmt}|{sorted(options.items())!r}".encode())
+        for array in (self.sensor_positions,) + arrays:
+            if array is None:
+                digest.update(b"none")
+            else:
+                array = np.ascontiguousarray(array, dtype=float)
+                digest.update(repr(array.shape).encode())
+                digest.update(array.tobytes())
+        return digest.hexdigest()
+    
+    def _render(self, key: str, fmt: str, figsize: Tuple[float, float], draw) -> bytes:
+        """Render draw(fig) off-screen to PNG/SVG bytes, or return the cached image for key."""
+        with self._cache_lock:
+            image = self._image_cache.get(key)
+            if image is not None:
+                self._image_cache.move_to_end(key)
+                self.cache_hits += 1
+                return image
+            self.cache_misses += 1
+        
+        # A bare Figure renders with the Agg/SVG canvas and never touches pyplot or a GUI backend
+        from matplotlib.figure import Figure
+        
+        fig = Figure(figsize=figsize)
+        draw(fig)
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format=fmt, dpi=100, bbox_inches='tight')
+        image = buffer.getvalue()
+        
+        with self._cache_lock:
+            self._image_cache[key] = image
+            while len(self._image_cache) > self.max_cached_images:
+                self._image_cache.popitem(last=False)
+        return image
+    
+    def render_positions(self,
+                         estimated_positions,
+                         ground_truth=None,
+                         title: str = "Positioning Results",
+                         show_error: bool = True,
+                         density: Optional[bool] = None,
+                         fmt: str = "png") -> bytes:
+        """
+        Headless version of plot_positions.
+        
+        Returns:
+            The image as PNG or SVG bytes (cached by input hash)
+        """
+        if fmt not in ("png", "svg"):
+            raise ValueError(f"Unsupported image format: {fmt}")
+        key = self.image_key("positions", fmt, estimated_positions, ground_truth,
+                             title=title, show_error=show_error, density=density)
+        return self._render(key, fmt, (10, 8), lambda fig: self._draw_positions(
+            fig.add_subplot(), estimated_positions, ground_truth, title, show_error, density))
+    
+    def render_error_histogram(self,
+                               estimated_positions,
+                               ground_truth,
+                               title: str = "Positioning Error Distribution",
+                               fmt: str = "png") -> bytes:
+        """
+        Headless version of plot_error_histogram.
+        
+        Returns:
+            The image as PNG or SVG bytes (cached by input hash)
+        """
+        if fmt not in ("png", "svg"):
+            raise ValueError(f"Unsupported image format: {fmt}")
+        key = self.image_key("errors", fmt, estimated_positions, ground_truth, title=title)
+        return self._render(key, fmt, (10, 6), lambda fig: self._draw_error_histogram(
+            fig.add_subplot(), estimated_positions, ground_truth, title))
+    
+    def plot_accuracy_map(self,
+                          accuracy_map,
+                          metric: str = "mean",
+                          title: Optional[str] = None) -> None:
+        """
+        Plot a per-cell accuracy metric as a heatmap with the sensor layout on top.
+        
+        Args:
+            accuracy_map: AccuracyMap from AccuracyEvaluator
+            metric: "mean", "p<percentile>" (e.g. "p90"), "gdop" or "converged"
+            title: Plot title (defaults to the metric and area-wide summary)
+        """
+        import matplotlib.pyplot as plt
+        
+        plt.figure(figsize=(10, 8))
+        self._draw_accuracy_map(plt.gca(), accuracy_map, metric, title)
+        plt.show()
+    
+    def plot_layout_comparison(self,
+                               accuracy_maps: dict,
+                               metric: str = "mean",
+                               title: str = "Sensor Layout Comparison") -> None:
+        """
+        Plot the accuracy maps of candidate layouts side by side on a shared color scale.
+        
+        Args:
+            accuracy_maps: {layout name: AccuracyMap}, e.g. from AccuracyEvaluator.compare_layouts
+            metric: Metric shown for every layout
+            title: Figure title
+        """
+        import matplotlib.pyplot as plt
+        
+        fig = plt.figure(figsize=(6 * len(accuracy_maps), 5))
+        self._draw_layout_comparison(fig, accuracy_maps, metric, title)
+        plt.show()
+    
+    @staticmethod
+    def _accuracy_arrays(accuracy_map, metric: str) -> Tuple[np.ndarray, ...]:
+        """Everything an accuracy heatmap depends on, for image_key."""
+        return (accuracy_map.xs, accuracy_map.ys, accuracy_map.metric(metric), accuracy_map.mean_error,
+                accuracy_map.gdop, np.array(list(accuracy_map.sensor_positions.values()), dtype=float))
+    
+    def render_accuracy_map(self,
+                            accuracy_map,
+                            metric: str = "mean",
+                            title: Optional[str] = None,
+                            fmt: str = "png") -> bytes:
+        """
+        Headless version of plot_accuracy_map.
+        
+        Returns:
+            The image as PNG or SVG bytes (cached by input hash)
+        """
+        if fmt not in ("png", "svg"):
+            raise ValueError(f"Unsupported image format: {fmt}")
+        key = self.image_key("accuracy", fmt, *self._accuracy_arrays(accuracy_map, metric),
+                             metric=metric, title=title)
+        return self._render(key, fmt, (10, 8), lambda fig: self._draw_accuracy_map(
+            fig.add_subplot(), accuracy_map, metric, title))
+    
+    def render_layout_comparison(self,
+                                 accuracy_maps: dict,
+                                 metric: str = "mean",
+                                 title: str = "Sensor Layout Comparison",
+                                 fmt: str = "png") -> bytes:
+        """
+        Headless version of plot_layout_comparison.
+        
+        Returns:
+            The image as PNG or SVG bytes (cached by input hash)
+        """
+        if fmt not in ("png", "svg"):
+            raise ValueError(f"Unsupported image format: {fmt}")
+        arrays = [array for accuracy_map in accuracy_maps.values()
+                  for array in self._accuracy_arrays(accuracy_map, metric)]
+        key = self.image_key("layouts", fmt, *arrays, metric=metric, title=title, names=list(accuracy_maps))
+        return self._render(key, fmt, (6 * len(accuracy_maps), 5), lambda fig: self._draw_layout_comparison(
+            fig, accuracy_maps, metric, title))
+    
+    def _draw_layout_comparison(self, fig, accuracy_maps: dict, metric: str, title: str) -> None:
+        """Draw one accuracy heatmap per layout side by side into fig, on a shared color scale."""
+        values = [m.metric(metric) for m in accuracy_maps.values()]
+        finite = np.concatenate([v[np.isfinite(v)] for v in values])
+        vmin, vmax = (float(finite.min()), float(np.percentile(finite, 99))) if finite.size else (None, None)
+        
+        axes = fig.subplots(1, len(accuracy_maps), squeeze=False)
+        for ax, (name, accuracy_map) in zip(axes[0], accuracy_maps.items()):
+            self._draw_accuracy_map(ax, accuracy_map, metric, name, vmin, vmax)
+        fig.suptitle(title)
+    
+    def _draw_accuracy_map(self, ax, accuracy_map, metric: str, title: Optional[str],
+                           vmin: Optional[float] = None, vmax: Optional[float] = None) -> None:
+        """Draw one accuracy heatmap and its sensors into ax."""
+        values = accuracy_map.metric(metric)
+        if vmax is None:
+            finite = values[np.isfinite(values)]
+            vmax = float(np.percentile(finite, 99)) if finite.size else None
+        mesh = ax.pcolormesh(accuracy_map.xs, accuracy_map.ys, values, shading='nearest',
+                             cmap='viridis', vmin=vmin, vmax=vmax)
+        label = {'mean': 'Mean error (m)', 'gdop': 'GDOP', 'converged': 'Converged fraction'}.get(
+            metric, f"{metric[1:]}th percentile error (m)")
+        ax.figure.colorbar(mesh, ax=ax, label=label)
+        
+        sensors = np.array(list(accuracy_map.sensor_positions.values()))
+        ax.scatter(sensors[:, 0], sensors[:, 1], c='red', marker='^', s=100, label='Sensors')
+        
+        summary = accuracy_map.summary()
+        if title is None:
+            title = "Positioning Accuracy"
+        ax.set_title(f"{title}\nMean Error: {summary['mean_error']:.2f}m, Median GDOP: {summary['median_gdop']:.2f}")
+        ax.set_xlabel('X Position (m)')
+        ax.set_ylabel('Y Position (m)')
+        ax.set_aspect('equal')
+        ax.legend(loc='upper right')
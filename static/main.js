@@ -7,6 +7,10 @@ let devices = []; // Her cihaz objesi şunları içerecek:
 let sensors = [];
 let selectedDeviceId = null;
 let devicesDataTable = null;
+let pendingDetailsDeviceId = null; // Konumu güncellenen, detayları stream'den yeni konum gelince yenilenecek cihaz
+let lastSequence = 0; // /api/devices/stream üzerinden uygulanan son değişiklik numarası
+let deviceStream = null;
+let deviceRowIndexes = new Map(); // cihaz id -> DataTable satır indeksi (delta'da sadece o satırı güncellemek için)
 
 
 // main.js (Sadece loadData fonksiyonunun güncellenmiş hali - PNG ikonlar için)
@@ -22,7 +26,11 @@ let devicesDataTable = null;
 async function loadData() {
     console.log("loadData CALLED");
     try {
-        const devicesPromise = fetch('/api/devices').then(r => r.json());
+        const devicesPromise = fetch('/api/devices').then(r => {
+            const seq = parseInt(r.headers.get('X-Sequence'), 10);
+            if (!isNaN(seq)) lastSequence = seq;
+            return r.json();
+        });
         const sensorsPromise = fetch('/api/sensors').then(r => r.json());
         const [newDevicesData, newSensorsData] = await Promise.all([devicesPromise, sensorsPromise]);
 
@@ -55,27 +63,64 @@ async function loadData() {
         devices = updatedDevices;
         // console.log("loadData: Global devices array updated", JSON.parse(JSON.stringify(devices))); // Gerekirse loglamayı açın
 
-        if (devicesDataTable) { devicesDataTable.destroy(); }
-        $("#devicesTable tbody").empty();
-        devicesDataTable = $('#devicesTable').DataTable({
-            pageLength: 8,
-            data: devices.map(device => {
-                if (!device || !device.id || !device.position || typeof device.position.x !== 'number') {
-                    return { id_display: `<span class="text-danger">Error</span>`, x_pos: 'N/A', y_pos: 'N/A', id_hidden: 'error-' + Math.random().toString(36).substr(2,9) };
-                }
-                return {
-                    id_display: `<span class="text-primary fw-bold" style="cursor:pointer;">${device.id.slice(-8)}</span>`,
-                    x_pos: device.position.x.toFixed(2),
-                    y_pos: device.position.y.toFixed(2),
-                    id_hidden: device.id
-                };
-            }),
-            columns: [ { data: 'id_display', title: 'Device ID' }, { data: 'x_pos', title: 'X (m)' }, { data: 'y_pos', title: 'Y (m)' } ],
-            createdRow: function(row, data, dataIndex) { if (data && data.id_hidden) $(row).attr('data-id', data.id_hidden); }
-        });
+        await renderDevices();
+    } catch (error) { console.error("Error in loadData:", error); }
+}
+
+// Bir cihazın tablo satırı verisi
+function deviceRowData(device) {
+    if (!device || !device.id || !device.position || typeof device.position.x !== 'number') {
+        return { id_display: `<span class="text-danger">Error</span>`, x_pos: 'N/A', y_pos: 'N/A', id_hidden: (device && device.id) || 'error-' + Math.random().toString(36).substr(2,9) };
+    }
+    return {
+        id_display: `<span class="text-primary fw-bold" style="cursor:pointer;">${device.id.slice(-8)}</span>`,
+        x_pos: device.position.x.toFixed(2),
+        y_pos: device.position.y.toFixed(2),
+        id_hidden: device.id
+    };
+}
 
+// Tablo ve ana haritayı global 'devices' dizisinden baştan çizer (loadData kullanır)
+async function renderDevices() {
+    try {
+        renderDeviceTable();
+    } catch (error) { console.error("Error in renderDevices:", error); }
+    await renderDeviceMap();
+}
 
+// Tabloyu baştan kurar ve satır indekslerini yeniden oluşturur
+function renderDeviceTable() {
+    if (devicesDataTable) { devicesDataTable.destroy(); }
+    $("#devicesTable tbody").empty();
+    devicesDataTable = $('#devicesTable').DataTable({
+        pageLength: 8,
+        data: devices.map(deviceRowData),
+        columns: [ { data: 'id_display', title: 'Device ID' }, { data: 'x_pos', title: 'X (m)' }, { data: 'y_pos', title: 'Y (m)' } ],
+        createdRow: function(row, data, dataIndex) { if (data && data.id_hidden) $(row).attr('data-id', data.id_hidden); }
+    });
+    deviceRowIndexes = new Map();
+    devicesDataTable.rows().every(function (rowIdx) { deviceRowIndexes.set(this.data().id_hidden, rowIdx); });
+}
 
+// Sadece değişen cihazların satırlarını günceller/ekler; sayfa ve sıralama korunur (SSE delta'ları kullanır)
+function updateDeviceRows(changedIds) {
+    if (!devicesDataTable) { renderDeviceTable(); return; }
+    changedIds.forEach(id => {
+        const device = devices.find(d => d.id === id);
+        if (!device) return;
+        const rowData = deviceRowData(device);
+        if (deviceRowIndexes.has(id)) {
+            devicesDataTable.row(deviceRowIndexes.get(id)).data(rowData);
+        } else {
+            deviceRowIndexes.set(id, devicesDataTable.row.add(rowData).index());
+        }
+    });
+    devicesDataTable.draw(false);
+}
+
+// Ana haritayı global 'devices' ve 'sensors' dizilerinden çizer
+async function renderDeviceMap() {
+    try {
         // Ana Haritayı Güncelle
         // 1. SENSÖRLER İÇİN TRACE'LER (SVG MARKER KULLANARAK)
                 const sensorMapTraces = sensors.map(sensor => ({
@@ -217,7 +262,88 @@ async function loadData() {
             console.log("Map click listener attached for the first time.");
         }
 
-    } catch (error) { console.error("Error in loadData:", error); }
+    } catch (error) { console.error("Error in renderDeviceMap:", error); }
+}
+
+// Sunucudan gelen güncel cihaz verisini mevcut cihazın geçmişleriyle birleştirir
+function mergeDeviceUpdate(existingDevice, updatedData) {
+    let estHistory = existingDevice.position_history || [];
+    if (updatedData.position && typeof updatedData.position.x === 'number' && (estHistory.length === 0 ||
+        (estHistory[estHistory.length - 1].x !== updatedData.position.x ||
+            estHistory[estHistory.length - 1].y !== updatedData.position.y))) {
+        estHistory = [...estHistory, { ...updatedData.position }];
+    }
+
+    let realHist = existingDevice.real_position_history || [];
+    if (updatedData.real_position && typeof updatedData.real_position.x === 'number' && (realHist.length === 0 ||
+        (realHist[realHist.length - 1].x !== updatedData.real_position.x ||
+            realHist[realHist.length - 1].y !== updatedData.real_position.y))) {
+        realHist = [...realHist, { ...updatedData.real_position }];
+    }
+
+    let rssiPathHist = existingDevice.rssi_along_path_history || [];
+    const currentStep = rssiPathHist.length + 1;
+    const newRssiMeasurements = {};
+    if (updatedData.measurements) {
+        updatedData.measurements.forEach(m => {
+            if (typeof m.rssi === 'number') newRssiMeasurements[m.sensor_id] = m.rssi;
+        });
+    }
+    if (Object.keys(newRssiMeasurements).length > 0 && updatedData.real_position) {
+        rssiPathHist.push({
+            step: currentStep,
+            real_pos: { ...updatedData.real_position },
+            rssi_values: newRssiMeasurements
+        });
+    }
+    // const MAX_HISTORY = 20;
+    // if (estHistory.length > MAX_HISTORY) estHistory = estHistory.slice(-MAX_HISTORY);
+    // if (realHist.length > MAX_HISTORY) realHist = realHist.slice(-MAX_HISTORY);
+    // if (rssiPathHist.length > MAX_HISTORY) rssiPathHist = rssiPathHist.slice(-MAX_HISTORY);
+
+    return { ...updatedData, position_history: estHistory, real_position_history: realHist, rssi_along_path_history: rssiPathHist };
+}
+
+// Değişen cihazları uygular ve uygulananların id'lerini döner; cihazda aynı veya daha yeni seq varsa
+// (ör. yeniden bağlanınca tekrar gönderilen delta) değişiklik atlanır
+function applyDeviceDeltas(changedDevices, seq) {
+    const appliedIds = [];
+    changedDevices.forEach(changed => {
+        const index = devices.findIndex(d => d.id === changed.id);
+        if (index === -1) {
+            devices.push(mergeDeviceUpdate({ seq: seq }, { ...changed, seq: seq }));
+            appliedIds.push(changed.id);
+        } else if (!(devices[index].seq >= seq)) {
+            devices[index] = mergeDeviceUpdate(devices[index], { ...changed, seq: seq });
+            appliedIds.push(changed.id);
+        }
+    });
+    return appliedIds;
+}
+
+// /api/devices/stream'e bağlanır; sadece değişen cihazlar gelir, sıra kopunca tam liste yeniden çekilir
+function connectDeviceStream() {
+    if (deviceStream) deviceStream.close();
+    deviceStream = new EventSource(`/api/devices/stream?since=${lastSequence}`);
+    deviceStream.addEventListener('delta', async event => {
+        const delta = JSON.parse(event.data);
+        lastSequence = Math.max(lastSequence, delta.seq);
+        const appliedIds = applyDeviceDeltas(delta.devices, delta.seq);
+        if (appliedIds.length > 0) {
+            updateDeviceRows(appliedIds);
+            await renderDeviceMap();
+        }
+        if (pendingDetailsDeviceId && delta.devices.some(d => d.id === pendingDetailsDeviceId)) {
+            showDeviceDetails(pendingDetailsDeviceId);
+            pendingDetailsDeviceId = null;
+        }
+    });
+    deviceStream.addEventListener('resync', async () => {
+        console.log("Device stream out of sync, reloading full device list.");
+        deviceStream.close();
+        await loadData();
+        connectDeviceStream();
+    });
 }
 
 async function updateDeviceLocation() {
@@ -237,63 +363,10 @@ async function updateDeviceLocation() {
             body: JSON.stringify({ device_id: selectedDeviceId, x: newRealX, y: newRealY })
         });
         if (!res.ok) { alert(`Update failed: ${await res.text()}`); return; }
-        console.log("Backend real_position update successful.");
-
-        const updatedDevicesResponse = await fetch('/api/devices');
-        if (!updatedDevicesResponse.ok) { alert("Failed to fetch updated device data."); return; }
-        const newApiDeviceData = await updatedDevicesResponse.json();
-        console.log("Fetched new API data after update:", newApiDeviceData);
-
-        devices = devices.map(existingDevice => {
-            const updatedDataForThisDevice = newApiDeviceData.find(nd => nd.id === existingDevice.id);
-            if (updatedDataForThisDevice && updatedDataForThisDevice.id === selectedDeviceId) { // Sadece güncellenen cihaz için geçmişi değiştir
-                let estHistory = existingDevice.position_history || [];
-                if (updatedDataForThisDevice.position && typeof updatedDataForThisDevice.position.x === 'number' && (estHistory.length === 0 ||
-                    (estHistory[estHistory.length - 1].x !== updatedDataForThisDevice.position.x ||
-                        estHistory[estHistory.length - 1].y !== updatedDataForThisDevice.position.y))) {
-                    estHistory = [...estHistory, { ...updatedDataForThisDevice.position }];
-                }
-
-                let realHist = existingDevice.real_position_history || [];
-                if (updatedDataForThisDevice.real_position && typeof updatedDataForThisDevice.real_position.x === 'number' && (realHist.length === 0 ||
-                    (realHist[realHist.length - 1].x !== updatedDataForThisDevice.real_position.x ||
-                        realHist[realHist.length - 1].y !== updatedDataForThisDevice.real_position.y))) {
-                    realHist = [...realHist, { ...updatedDataForThisDevice.real_position }];
-                }
+        console.log("Backend real_position update queued.");
 
-                let rssiPathHist = existingDevice.rssi_along_path_history || [];
-                const currentStep = rssiPathHist.length + 1;
-                const newRssiMeasurements = {};
-                if (updatedDataForThisDevice.measurements) {
-                    updatedDataForThisDevice.measurements.forEach(m => {
-                        if (typeof m.rssi === 'number') newRssiMeasurements[m.sensor_id] = m.rssi;
-                    });
-                }
-                if (Object.keys(newRssiMeasurements).length > 0 && updatedDataForThisDevice.real_position) {
-                    rssiPathHist.push({
-                        step: currentStep,
-                        real_pos: { ...updatedDataForThisDevice.real_position },
-                        rssi_values: newRssiMeasurements
-                    });
-                }
-                // const MAX_HISTORY = 20;
-                // if (estHistory.length > MAX_HISTORY) estHistory = estHistory.slice(-MAX_HISTORY);
-                // if (realHist.length > MAX_HISTORY) realHist = realHist.slice(-MAX_HISTORY);
-                // if (rssiPathHist.length > MAX_HISTORY) rssiPathHist = rssiPathHist.slice(-MAX_HISTORY);
-
-                return { ...updatedDataForThisDevice, position_history: estHistory, real_position_history: realHist, rssi_along_path_history: rssiPathHist };
-            }
-            return existingDevice; // Diğer cihazların geçmişini koru
-        });
-        const updatedDeviceForLog = devices.find(d => d.id === selectedDeviceId);
-        console.log("Global device updated with histories:", JSON.parse(JSON.stringify(updatedDeviceForLog)));
-
-        await loadData(); // loadData şimdi güncellenmiş 'devices' dizisini kullanacak
-
-        const deviceForModal = devices.find(d => d.id === selectedDeviceId);
-        if (deviceForModal) {
-            showDeviceDetails(deviceForModal.id);
-        }
+        // Sunucu güncellemeyi kuyruğa alır; yeni konum /api/devices/stream üzerinden gelince detaylar yenilenir
+        pendingDetailsDeviceId = selectedDeviceId;
     } catch (error) { console.error("Error in updateDeviceLocation:", error); }
 }
 
@@ -346,12 +419,12 @@ function showDeviceDetails(deviceId) {
 
 document.addEventListener('DOMContentLoaded', () => {
     console.log("DOMContentLoaded event");
-    loadData();
     $('#devicesTable tbody').on('click', 'tr', function () {
         const deviceId = $(this).attr('data-id');
         if (deviceId) showDeviceDetails(deviceId);
     });
-    // setInterval(loadData, 30000); // Test ederken kapalı tutun
+    // setInterval(loadData, 30000) yerine: sunucu değişen cihazları SSE ile gönderir
+    loadData().then(connectDeviceStream);
 });
 
 // TRILATERASYON GRAFİĞİ FONKSİYONU (Sizin sağladığınız ve biraz düzenlenmiş hali)
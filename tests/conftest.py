@@ -0,0 +1,30 @@
+import json
+import os
+import sys
+
+import pytest
+
+SENSORS = {'Sensor1': (0.0, 0.0), 'Sensor2': (30.0, 0.0), 'Sensor3': (15.0, 30.0)}
+DEVICES = {
+    'AA:00:00:00:00:01': {'x': 5.0, 'y': 5.0, 'type': 'phone'},
+    'AA:00:00:00:00:02': {'x': 20.0, 'y': 10.0, 'type': 'laptop'},
+    'AA:00:00:00:00:03': {'x': 15.0, 'y': 25.0, 'type': 'phone'},
+}
+
+
+@pytest.fixture(scope="session")
+def app_module(tmp_path_factory):
+    """The Flask app module, imported once against a scratch data directory."""
+    if 'app' not in sys.modules:
+        data_dir = tmp_path_factory.mktemp("data")
+        for i, (sensor_id, (x, y)) in enumerate(SENSORS.items(), start=1):
+            (data_dir / f"output{i}({sensor_id} - Konum_ {x:g},{y:g}).csv").touch()
+        (data_dir / "overrides.json").write_text(json.dumps(DEVICES))
+        os.environ["WIFI_DATA_DIR"] = str(data_dir)
+    import app
+    return app
+
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from src.aggregation import RSSIAggregator
+
+
+def test_median_matches_window():
+    aggregator = RSSIAggregator(['s1'], window=4, stale_after=None)
+    values = [-70.0, -50.0, -90.0, -60.0, -40.0, -80.0]
+    for t, value in enumerate(values):
+        aggregator.add(['A'], ['s1'], [value], [float(t)])
+        window = values[max(0, t - 3):t + 1]
+        assert aggregator.device_stats('A')['s1']['median'] == pytest.approx(np.median(window))
+
+
+def test_ring_wraps_around_and_keeps_order():
+    aggregator = RSSIAggregator(['s1'], window=3, stale_after=None)
+    aggregator.add(['A'] * 5, ['s1'] * 5, [-1.0, -2.0, -3.0, -4.0, -5.0], [0.0, 1.0, 2.0, 3.0, 4.0])
+    assert aggregator.device_samples('A') == {'s1': [-3.0, -4.0, -5.0]}
+    stats = aggregator.device_stats('A')['s1']
+    assert stats['latest'] == -5.0
+    assert stats['count'] == 3
+    assert stats['total'] == 5
+    assert stats['median'] == -4.0
+
+
+def test_batch_is_applied_in_timestamp_order():
+    aggregator = RSSIAggregator(['s1'], window=2, stale_after=None)
+    aggregator.add(['A'] * 3, ['s1'] * 3, [-3.0, -1.0, -2.0], [3.0, 1.0, 2.0])
+    assert aggregator.device_samples('A') == {'s1': [-2.0, -3.0]}
+
+
+def test_eviction_drops_least_recently_seen():
+    aggregator = RSSIAggregator(['s1'], stale_after=None, max_devices=2, initial_capacity=1)
+    aggregator.add(['A'], ['s1'], [-50.0], [0.0])
+    aggregator.add(['B'], ['s1'], [-60.0], [1.0])
+    aggregator.add(['C'], ['s1'], [-70.0], [2.0])
+    assert sorted(aggregator.device_ids) == ['B', 'C']
+    assert aggregator.device_stats('C')['s1']['latest'] == -70.0
+
+
+def test_eviction_spares_devices_in_the_batch():
+    aggregator = RSSIAggregator(['s1'], stale_after=None, max_devices=2)
+    aggregator.add(['A'], ['s1'], [-50.0], [0.0])
+    aggregator.add(['B'], ['s1'], [-60.0], [1.0])
+    aggregator.add(['A', 'C'], ['s1', 's1'], [-55.0, -65.0], [2.0, 2.0])
+    assert sorted(aggregator.device_ids) == ['A', 'C']
+    assert aggregator.device_samples('A') == {'s1': [-50.0, -55.0]}
+    assert aggregator.device_samples('C') == {'s1': [-65.0]}
+
+
+def test_batch_larger_than_limit_is_rejected():
+    aggregator = RSSIAggregator(['s1'], stale_after=None, max_devices=2)
+    with pytest.raises(ValueError):
+        aggregator.add(['A', 'B', 'C'], ['s1'] * 3, [-50.0, -60.0, -70.0], [0.0, 0.0, 0.0])
+
+
+def test_stale_devices_are_dropped():
+    aggregator = RSSIAggregator(['s1'], stale_after=10.0)
+    aggregator.add(['A'], ['s1'], [-50.0], [0.0])
+    aggregator.add(['B'], ['s1'], [-60.0], [20.0])
+    assert aggregator.device_ids == ['B']
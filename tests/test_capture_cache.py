@@ -0,0 +1,80 @@
+import glob
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from src.batch_localize import run
+from src.capture_cache import CaptureCache
+from src.reader import RSSIDataReader
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+
+
+@pytest.fixture
+def capture_set(tmp_path):
+    capture_dir = tmp_path / 'captures'
+    capture_dir.mkdir()
+    for capture in glob.glob(os.path.join(DATA_DIR, 'output*.csv')):
+        shutil.copy(capture, capture_dir)
+    return str(capture_dir)
+
+
+def _store(cache, path, rows=3):
+    with open(path, 'wb') as f:
+        f.write(b'line\n' * rows)
+    stat = os.stat(path)
+    return cache.store(path, stat, stat.st_size, np.arange(rows), [f'dev{i}' for i in range(rows)],
+                       np.full(rows, -60.0)), stat
+
+
+def test_store_and_lookup(tmp_path):
+    cache = CaptureCache(str(tmp_path / 'cache'))
+    path = str(tmp_path / 'capture.csv')
+    entry, stat = _store(cache, path)
+    assert entry.devices == ['dev0', 'dev1', 'dev2']
+    assert cache.lookup(path, stat)[0] == 'hit'
+
+    with open(path, 'ab') as f:
+        f.write(b'more\n')
+    assert cache.lookup(path, os.stat(path))[0] == 'grown'
+
+
+def test_rewrites_leave_no_temporary_directories(tmp_path):
+    cache = CaptureCache(str(tmp_path / 'cache'))
+    path = str(tmp_path / 'capture.csv')
+    # A temporary directory left by an interrupted writer does not block new ones
+    os.makedirs(os.path.join(cache.cache_dir, 'capture.csv.tmp'))
+    _store(cache, path, rows=2)
+    entry, _ = _store(cache, path, rows=4)
+    assert len(entry.rssi) == 4
+    assert sorted(os.listdir(cache.cache_dir)) == ['capture.csv', 'capture.csv.tmp']
+
+
+def test_store_fails_when_cache_dir_is_not_writable(tmp_path):
+    blocker = tmp_path / 'cache'
+    blocker.write_text('not a directory')
+    with pytest.raises(OSError):
+        _store(CaptureCache(str(blocker)), str(tmp_path / 'capture.csv'))
+
+
+def test_reader_falls_back_to_no_cache(tmp_path, capture_set):
+    blocker = tmp_path / 'cache'
+    blocker.write_text('not a directory')
+    cached = RSSIDataReader(capture_set, cache_dir=str(blocker))
+    data = cached.load_all_data()
+    assert cached.capture_cache is None
+    expected = RSSIDataReader(capture_set, use_cache=False).load_all_data()
+    assert data.keys() == expected.keys()
+    for sensor_id, frame in expected.items():
+        np.testing.assert_array_equal(data[sensor_id]['rssi'], frame['rssi'])
+
+
+def test_batch_run_caches_outside_the_archive(tmp_path, capture_set):
+    output_dir = str(tmp_path / 'results')
+    before = sorted(os.listdir(capture_set))
+    checkpoint = run(capture_set, output_dir, workers=1)
+    assert checkpoint['rows'] > 0
+    assert sorted(os.listdir(capture_set)) == before
+    assert os.listdir(os.path.join(output_dir, '.capture_cache'))
@@ -0,0 +1,88 @@
+import pytest
+
+
+def _smoothed(client, method):
+    devices = client.get(f'/api/devices?method={method}').get_json()
+    return {device['id']: device['smoothed_position'] for device in devices}
+
+
+def test_methods_keep_separate_tracks(client, app_module):
+    trilateration = _smoothed(client, 'trilateration')
+    fingerprint = _smoothed(client, 'fingerprint')
+    assert all(value is not None for value in trilateration.values())
+    assert _smoothed(client, 'trilateration') == trilateration
+    assert _smoothed(client, 'fingerprint') == fingerprint
+
+
+def test_resolving_an_evicted_device_does_not_refeed_the_tracker(client, app_module):
+    before = _smoothed(client, 'trilateration')
+    app_module.position_cache.invalidate()
+    assert _smoothed(client, 'trilateration') == before
+
+
+def test_devices_are_deterministic_and_served_from_cache(client, app_module):
+    app_module.position_cache.invalidate()
+    computed = client.get('/api/devices').get_json()
+    hits = app_module.position_cache.hits
+    cached = client.get('/api/devices').get_json()
+    assert app_module.position_cache.hits - hits == len(computed)
+    assert cached == computed
+
+    # Recomputing from scratch draws the same shadowing again
+    app_module.position_cache.invalidate()
+    assert client.get('/api/devices').get_json() == computed
+
+
+def _positions(client):
+    return {d['id']: d['position'] for d in client.get('/api/devices?fields=id,position').get_json()}
+
+
+def test_spatial_filters_use_estimated_positions(client):
+    positions = _positions(client)
+    target, pos = next(iter(positions.items()))
+    x, y = pos['x'], pos['y']
+
+    response = client.get(f'/api/devices?bbox={x - 0.01},{y - 0.01},{x + 0.01},{y + 0.01}&fields=id')
+    assert response.get_json() == [{'id': target}]
+    assert response.headers['X-Total-Count'] == '1'
+    near = client.get(f'/api/devices?near={x},{y}&radius=0.01&fields=id').get_json()
+    assert near == [{'id': target}]
+    zone = f'{x - 0.01},{y - 0.01},{x + 0.01},{y - 0.01},{x},{y + 0.01}'
+    assert client.get(f'/api/devices?zone={zone}&fields=id').get_json() == [{'id': target}]
+
+    everything = client.get('/api/devices?bbox=-1e6,-1e6,1e6,1e6&fields=id').get_json()
+    assert {d['id'] for d in everything} == set(positions)
+
+
+@pytest.mark.parametrize('query', [
+    'bbox=1,2,3', 'bbox=5,0,0,5', 'bbox=a,b,c,d', 'bbox=0,0,inf,1', 'near=1,2', 'near=1,2&radius=-1',
+    'zone=0,0,1,1', 'fields=id,bogus', 'fields=', 'offset=-1', 'limit=x', 'method=magic',
+])
+def test_invalid_queries_are_rejected(client, query):
+    assert client.get(f'/api/devices?{query}').status_code == 400
+
+
+def test_pagination_and_field_selection(client, app_module):
+    all_ids = [d['id'] for d in client.get('/api/devices?fields=id').get_json()]
+    response = client.get('/api/devices?offset=1&limit=1&fields=id,type')
+    assert response.get_json() == [{'id': all_ids[1], 'type': app_module.device_registry.get(all_ids[1])['type']}]
+    assert response.headers['X-Total-Count'] == str(len(all_ids))
+    assert client.get(f'/api/devices?offset={len(all_ids)}').get_json() == []
+
+
+def test_columnar_format_matches_row_format(client, app_module):
+    rows = client.get('/api/devices?fields=id,position,type,measurements').get_json()
+    response = client.get('/api/devices?fields=id,position,type,measurements',
+                          headers={'Accept': app_module.COLUMNAR_MIMETYPE})
+    assert response.mimetype == app_module.COLUMNAR_MIMETYPE
+    assert response.headers['Vary'] == 'Accept'
+    body = response.get_json()
+    assert client.get('/api/devices?fields=id,position,type,measurements&format=columns').get_json() == body
+
+    columns = body['columns']
+    assert body['total'] == body['count'] == len(rows) and body['offset'] == 0
+    assert columns['id'] == [row['id'] for row in rows]
+    assert columns['type'] == [row['type'] for row in rows]
+    assert columns['position']['x'] == [row['position']['x'] for row in rows]
+    assert columns['measurements']['sensor_ids'] == [m['sensor_id'] for m in rows[0]['measurements']]
+    assert columns['measurements']['rssi'] == [[m['rssi'] for m in row['measurements']] for row in rows]
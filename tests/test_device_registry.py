@@ -0,0 +1,67 @@
+import json
+import os
+
+from src.device_registry import DeviceRegistry
+
+
+def _write(path, devices):
+    path.write_text(json.dumps(devices))
+
+
+def test_update_is_served_from_memory_and_flushed_once(tmp_path):
+    path = tmp_path / 'overrides.json'
+    _write(path, {'dev': {'x': 1.0, 'y': 2.0, 'type': 'phone'}})
+    registry = DeviceRegistry(str(path), flush_delay=60)
+
+    assert registry.update_position('dev', 3.0, 4.0) == {'x': 3.0, 'y': 4.0, 'type': 'phone'}
+    registry.update_position('new', 5.0, 6.0)
+    assert registry.get('dev')['x'] == 3.0
+    assert registry.get('new')['type'] == 'unknown'
+    # Write-behind: nothing reaches the file until the flush
+    assert json.loads(path.read_text())['dev']['x'] == 1.0
+
+    registry.close()
+    assert json.loads(path.read_text()) == {
+        'dev': {'x': 3.0, 'y': 4.0, 'type': 'phone'},
+        'new': {'x': 5.0, 'y': 6.0, 'type': 'unknown'},
+    }
+    assert [p for p in os.listdir(tmp_path) if p.endswith('.tmp')] == []
+
+
+def test_snapshot_returns_copies(tmp_path):
+    path = tmp_path / 'overrides.json'
+    _write(path, {'dev': {'x': 1.0, 'y': 2.0, 'type': 'phone'}})
+    registry = DeviceRegistry(str(path))
+    registry.snapshot()['dev']['x'] = 99.0
+    registry.get('dev')['x'] = 99.0
+    assert registry.get('dev')['x'] == 1.0
+    registry.close()
+
+
+def test_external_edit_is_reloaded_without_losing_pending_updates(tmp_path):
+    path = tmp_path / 'overrides.json'
+    _write(path, {'a': {'x': 0.0, 'y': 0.0, 'type': 'phone'}, 'b': {'x': 0.0, 'y': 0.0, 'type': 'laptop'}})
+    registry = DeviceRegistry(str(path), flush_delay=60, check_interval=0)
+    registry.update_position('a', 7.0, 7.0)
+
+    _write(path, {'a': {'x': 1.0, 'y': 1.0, 'type': 'phone'}, 'b': {'x': 2.0, 'y': 2.0, 'type': 'laptop'},
+                  'c': {'x': 3.0, 'y': 3.0, 'type': 'tablet'}})
+    os.utime(path, ns=(0, 1))  # make sure the mtime differs from the one already seen
+    snapshot = registry.snapshot()
+    assert snapshot['a']['x'] == 7.0
+    assert snapshot['b']['x'] == 2.0
+    assert snapshot['c']['type'] == 'tablet'
+    registry.close()
+
+
+def test_missing_or_corrupt_file(tmp_path):
+    path = tmp_path / 'overrides.json'
+    registry = DeviceRegistry(str(path), check_interval=0)
+    assert registry.snapshot() == {}
+    registry.update_position('dev', 1.0, 1.0)
+    registry.flush()
+
+    path.write_text('{"dev": ')
+    os.utime(path, ns=(0, 1))
+    assert registry.get('dev') == {'x': 1.0, 'y': 1.0, 'type': 'unknown'}
+    registry.close()
@@ -0,0 +1,64 @@
+import numpy as np
+
+from src.fingerprint import RadioMap
+from src.rssi_to_distance import RSSIConverter
+
+SENSORS = {'Sensor1': (0.0, 0.0), 'Sensor2': (30.0, 0.0), 'Sensor3': (15.0, 30.0)}
+
+
+def _converter(**params):
+    converter = RSSIConverter(**params)
+    converter.set_sensor_positions(dict(SENSORS))
+    return converter
+
+
+def test_signature_ignores_seed_and_shadowing():
+    radio_map = RadioMap.build_from_model(_converter(seed=0), resolution=5.0)
+    assert radio_map.model_signature == repr(_converter(seed=7, shadowing_std_dev_dB=4.0).radio_map_key())
+    assert radio_map.model_signature != repr(_converter(path_loss_exponent=3.0).radio_map_key())
+
+
+def test_query_recovers_noise_free_positions():
+    converter = _converter()
+    radio_map = RadioMap.build_from_model(converter, resolution=1.0)
+    positions = np.array([[5.0, 5.0], [20.0, 10.0]])
+    estimated, distances = radio_map.query(converter.expected_rssi_matrix(positions), k=1)
+    np.testing.assert_allclose(estimated, positions)
+    np.testing.assert_allclose(distances, 0.0, atol=1e-9)
+
+
+def test_move_sensor_matches_rebuild(tmp_path):
+    converter = _converter()
+    radio_map = RadioMap.build_from_model(converter, resolution=5.0)
+    assert radio_map.move_sensor(converter, 'Sensor3', (15.0, 20.0)) > 0
+    moved = _converter()
+    moved.set_sensor_positions({**SENSORS, 'Sensor3': (15.0, 20.0)})
+    np.testing.assert_allclose(radio_map.fingerprints, moved.expected_rssi_matrix(radio_map.locations))
+    assert radio_map.model_signature == repr(moved.radio_map_key())
+
+    radio_map.save(tmp_path / 'map.npz')
+    loaded = RadioMap.load(tmp_path / 'map.npz')
+    np.testing.assert_allclose(loaded.fingerprints, radio_map.fingerprints)
+    assert loaded.model_signature == radio_map.model_signature
+
+
+def test_radio_map_learned_from_log_store(client, app_module):
+    assert client.get('/api/radio_map').get_json()['source'] == 'model'
+    assert client.post('/api/radio_map', json={'source': 'file'}).status_code == 400
+    assert client.post('/api/radio_map', json={'source': 'logs'}).status_code == 409
+
+    converter = app_module.rssi_converter
+    points = np.array([[5.0, 5.0], [20.0, 10.0], [15.0, 25.0]])
+    expected = converter.expected_rssi_matrix(points)
+    app_module.log_store.append(
+        (sensor_id, 'survey', f'2024-01-01 00:00:0{row}', x, y, expected[row, column])
+        for row, (x, y) in enumerate(points)
+        for column, sensor_id in enumerate(converter.sensor_positions)
+    )
+    try:
+        response = client.post('/api/radio_map', json={'source': 'logs'})
+        assert response.get_json() == {'source': 'logs', 'points': 3}
+        positions = app_module.compute_device_results([('probe', 20.0, 10.0, 'phone')], 'fingerprint')
+        assert positions['probe']['position']['x'] is not None
+    finally:
+        assert client.post('/api/radio_map', json={'source': 'model'}).get_json()['source'] == 'model'
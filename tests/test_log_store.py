@@ -0,0 +1,101 @@
+import numpy as np
+
+from src.fingerprint import load_log_samples
+from src.log_store import RSSILogStore
+
+
+def test_ground_truth_samples_pivot_sensors(tmp_path):
+    store = RSSILogStore(str(tmp_path / 'logs.sqlite3'))
+    store.append([
+        ('Sensor1', 'dev', '2024-01-01 00:00:00', 1.0, 2.0, -50.0),
+        ('Sensor2', 'dev', '2024-01-01 00:00:00', 1.0, 2.0, -60.0),
+        ('Sensor2', 'dev', '2024-01-01 00:00:00', 1.0, 2.0, -62.0),
+        ('Sensor1', 'dev', '2024-01-01 00:00:01', 3.0, 4.0, -55.0),
+        ('Unknown', 'dev', '2024-01-01 00:00:01', 3.0, 4.0, -40.0),
+    ])
+    positions, rssi = load_log_samples(store, ['Sensor1', 'Sensor2'])
+    np.testing.assert_allclose(positions, [[1.0, 2.0], [3.0, 4.0]])
+    np.testing.assert_allclose(rssi, [[-50.0, -61.0], [-55.0, np.nan]])
+    store.close()
+
+
+def test_ground_truth_samples_of_empty_store(tmp_path):
+    store = RSSILogStore(str(tmp_path / 'logs.sqlite3'))
+    positions, rssi = load_log_samples(store, ['Sensor1', 'Sensor2'])
+    assert positions.shape == (0, 2) and rssi.shape == (0, 2)
+    store.close()
+
+
+def _rows(device, sensor, timestamps):
+    return [(sensor, device, ts, 1.0, 2.0, -50.0 - i) for i, ts in enumerate(timestamps)]
+
+
+def test_device_history_groups_by_sensor_in_time_order(tmp_path):
+    store = RSSILogStore(str(tmp_path / 'logs.sqlite3'))
+    assert store.append([]) == 0
+    store.append([
+        ('Sensor1', 'dev', '2024-01-01 00:00:02', 1.0, 2.0, -52.0),
+        ('Sensor2', 'other', '2024-01-01 00:00:01', 1.0, 2.0, -70.0),
+        ('Sensor1', 'dev', '2024-01-01 00:00:01', 1.0, 2.0, -51.0),
+        ('Sensor2', 'dev', '2024-01-01 00:00:03', 1.0, 2.0, -60.0),
+    ])
+    history = store.device_history('dev')
+    assert history == {
+        'Sensor1': [{'timestamp': '2024-01-01 00:00:01', 'rssi': -51.0},
+                    {'timestamp': '2024-01-01 00:00:02', 'rssi': -52.0}],
+        'Sensor2': [{'timestamp': '2024-01-01 00:00:03', 'rssi': -60.0}],
+    }
+    assert store.device_history('missing') == {}
+    assert store.row_count() == 4
+    store.close()
+
+
+def test_retention_drops_whole_segments(tmp_path):
+    store = RSSILogStore(str(tmp_path / 'logs.sqlite3'), segment_size=2)
+    store.append(_rows('a', 'Sensor1', ['2024-01-01', '2024-01-02']))
+    store.append(_rows('b', 'Sensor1', ['2024-02-01', '2024-02-02']))
+    store.append(_rows('c', 'Sensor1', ['2024-03-01']))
+    assert store.row_count() == 5
+
+    assert store.apply_retention(older_than='2024-01-15') == 1
+    assert store.device_history('a') == {}
+    assert store.row_count() == 3
+
+    assert store.apply_retention(keep_segments=1) == 1
+    assert [row[1] for row in store.scan()] == ['c']
+    store.close()
+
+
+def test_compact_merges_underfilled_segments(tmp_path):
+    store = RSSILogStore(str(tmp_path / 'logs.sqlite3'), segment_size=1)
+    for day, device in enumerate(('a', 'b', 'c'), start=1):
+        store.append(_rows(device, 'Sensor1', [f'2024-01-0{day}']))
+    before = store.scan()
+
+    store.segment_size = 4
+    store.compact()
+    assert store.scan() == before
+    assert store.row_count() == 3
+    # Merged into one segment: retention now keeps or drops the rows together
+    assert store.apply_retention(older_than='2024-01-02') == 0
+    assert store.apply_retention(keep_segments=0) == 1
+    assert store.row_count() == 0
+    store.close()
+
+
+def test_import_csv_logs_skips_foreign_files(tmp_path):
+    log_dir = tmp_path / 'logs'
+    log_dir.mkdir()
+    (log_dir / 'Sensor1.csv').write_text(
+        "timestamp,device_id,x,y,rssi\n"
+        "2024-01-01T00:00:00,dev,1.5,2.5,-55.5\n"
+        "2024-01-01T00:00:01,dev,1.5,2.5,-56.5\n"
+    )
+    (log_dir / 'notes.csv').write_text("a,b\n1,2\n")
+    store = RSSILogStore(str(tmp_path / 'logs.sqlite3'))
+    assert store.import_csv_logs(str(log_dir)) == 2
+    assert store.scan() == [
+        ('Sensor1', 'dev', '2024-01-01T00:00:00', 1.5, 2.5, -55.5),
+        ('Sensor1', 'dev', '2024-01-01T00:00:01', 1.5, 2.5, -56.5),
+    ]
+    store.close()
@@ -0,0 +1,38 @@
+from src.position_cache import PositionCache
+
+
+def test_key_change_is_a_miss():
+    cache = PositionCache()
+    cache.put('dev', (1.0, 2.0, 0), 'old')
+    assert cache.get('dev', (1.0, 2.0, 0)) == 'old'
+    assert cache.get('dev', (1.0, 2.0, 1)) is None
+    assert cache.get('other', (1.0, 2.0, 0)) is None
+    assert cache.stats() == {'entries': 1, 'hits': 1, 'misses': 2}
+
+    # A newer result replaces the device's entry instead of adding a second one
+    cache.put('dev', (1.0, 2.0, 1), 'new')
+    assert len(cache) == 1
+    assert cache.get('dev', (1.0, 2.0, 0)) is None
+    assert cache.get('dev', (1.0, 2.0, 1)) == 'new'
+
+
+def test_least_recently_used_device_is_evicted():
+    cache = PositionCache(max_entries=2)
+    cache.put('a', 0, 'a')
+    cache.put('b', 0, 'b')
+    cache.get('a', 0)
+    cache.put('c', 0, 'c')
+    assert len(cache) == 2
+    assert cache.get('b', 0) is None
+    assert cache.get('a', 0) == 'a' and cache.get('c', 0) == 'c'
+
+
+def test_invalidate_one_or_all():
+    cache = PositionCache()
+    cache.put('a', 0, 'a')
+    cache.put('b', 0, 'b')
+    cache.invalidate('a')
+    cache.invalidate('missing')
+    assert cache.get('a', 0) is None and cache.get('b', 0) == 'b'
+    cache.invalidate()
+    assert len(cache) == 0
@@ -0,0 +1,136 @@
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+from src.metrics import FILE_IO_BYTES
+from src.reader import TAIL_GUARD_BYTES, RSSIDataReader
+
+HEADER = (b"BSSID, First time seen, Last time seen, channel, Power\r\n"
+          b"EC:08:6B:52:AC:35, 2025-05-10 15:23:12, 2025-05-10 15:24:19, 11, -54\r\n"
+          b"\r\n"
+          b"Station MAC, First time seen, Last time seen, Power, # packets, BSSID, Probed ESSIDs\r\n")
+
+
+def _station(mac, last_seen, power):
+    return f"{mac}, 2025-05-10 15:23:12, {last_seen}, {power}, 10, (not associated), \r\n".encode()
+
+
+@pytest.fixture
+def capture(tmp_path):
+    path = tmp_path / 'output1(Sensor1 - Konum_ 0,0).csv'
+    path.write_bytes(HEADER + _station('AA:00:00:00:00:01', '2025-05-10 15:24:19', -58)
+                     + _station('AA:00:00:00:00:02', '2025-05-10 15:24:20', -64))
+    return path
+
+
+def _bytes_read():
+    return FILE_IO_BYTES.value(kind="capture", direction="read")
+
+
+def _touch(path, bump):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + bump))
+
+
+def test_load_all_data_uses_last_time_seen(capture):
+    frame = RSSIDataReader(str(capture.parent), use_cache=False).load_all_data()['Sensor1']
+    assert frame['timestamp'].tolist() == [pd.Timestamp('2025-05-10 15:24:19'), pd.Timestamp('2025-05-10 15:24:20')]
+    assert frame['rssi'].tolist() == [-58.0, -64.0]
+
+
+def test_poll_reads_only_appended_rows(capture):
+    reader = RSSIDataReader(str(capture.parent), use_cache=False)
+    assert len(reader.poll_new_measurements()) == 2
+
+    # Pad the body so the guard window does not reach back to the header
+    padding = b''.join(_station(f'BB:00:00:00:{i // 256:02X}:{i % 256:02X}', '2025-05-10 15:24:21', -70)
+                       for i in range(200))
+    with open(capture, 'ab') as f:
+        f.write(padding)
+    assert len(reader.poll_new_measurements()) == 200
+
+    appended = _station('AA:00:00:00:00:03', '2025-05-10 15:24:22', -61)
+    before = _bytes_read()
+    with open(capture, 'ab') as f:
+        f.write(appended)
+    batch = reader.poll_new_measurements()
+    assert batch['device_id'].tolist() == ['AA:00:00:00:00:03']
+    assert batch['timestamp'].tolist() == [pd.Timestamp('2025-05-10 15:24:22')]
+    assert _bytes_read() - before == TAIL_GUARD_BYTES + len(appended)
+    assert len(reader.data['Sensor1']) == 203
+
+
+def test_unterminated_row_is_read_again_once_complete(capture):
+    reader = RSSIDataReader(str(capture.parent), use_cache=False)
+    reader.poll_new_measurements()
+    line = _station('AA:00:00:00:00:03', '2025-05-10 15:24:22', -61)
+    with open(capture, 'ab') as f:
+        f.write(line[:-8])
+    assert reader.poll_new_measurements()['rssi'].tolist() == [-61.0]
+    with open(capture, 'ab') as f:
+        f.write(line[-8:])
+    # Same row, now complete: nothing new
+    assert reader.poll_new_measurements().empty
+    with open(capture, 'ab') as f:
+        f.write(_station('AA:00:00:00:00:03', '2025-05-10 15:24:23', -66))
+    assert reader.poll_new_measurements()['rssi'].tolist() == [-66.0]
+
+
+def test_rewrite_in_place_rescans(capture):
+    reader = RSSIDataReader(str(capture.parent), use_cache=False)
+    reader.poll_new_measurements()
+    # airodump-ng rewrites the file: same length, one station's power changed
+    capture.write_bytes(HEADER + _station('AA:00:00:00:00:01', '2025-05-10 15:24:19', -58)
+                        + _station('AA:00:00:00:00:02', '2025-05-10 15:24:20', -66))
+    _touch(capture, 1000)
+    batch = reader.poll_new_measurements()
+    assert batch['device_id'].tolist() == ['AA:00:00:00:00:02']
+    assert batch['rssi'].tolist() == [-66.0]
+
+
+def test_truncated_capture_rescans(capture):
+    reader = RSSIDataReader(str(capture.parent), use_cache=False)
+    reader.poll_new_measurements()
+    capture.write_bytes(HEADER + _station('AA:00:00:00:00:01', '2025-05-10 15:25:00', -50))
+    batch = reader.poll_new_measurements()
+    assert batch['rssi'].tolist() == [-50.0]
+
+
+def test_capture_without_station_part(tmp_path):
+    shutil.copy(os.devnull, tmp_path / 'output1(Sensor1 - Konum_ 0,0).csv')
+    reader = RSSIDataReader(str(tmp_path), use_cache=False)
+    assert reader.poll_new_measurements().empty
+
+
+@pytest.mark.parametrize('use_cache', [False, True])
+def test_grown_capture_extends_the_index(capture, tmp_path, monkeypatch, use_cache):
+    reader = RSSIDataReader(str(capture.parent), cache_dir=str(tmp_path / 'cache'), use_cache=use_cache)
+    reader.load_all_data()
+    monkeypatch.setattr(reader, '_rebuild_index', lambda sensor_id: pytest.fail("index rebuilt"))
+
+    line = _station('AA:00:00:00:00:01', '2025-05-10 15:24:25', -57)
+    with open(capture, 'ab') as f:
+        f.write(_station('AA:00:00:00:00:03', '2025-05-10 15:24:21', -61) + line[:-8])
+    reader.load_all_data()
+    with open(capture, 'ab') as f:
+        f.write(line[-8:] + _station('AA:00:00:00:00:02', '2025-05-10 15:24:26', -63))
+    reader.load_all_data()
+
+    assert reader.get_device_measurements('AA:00:00:00:00:01') == {'Sensor1': [-58.0, -57.0]}
+    assert reader.get_device_measurements('AA:00:00:00:00:02') == {'Sensor1': [-64.0, -63.0]}
+    assert reader.get_latest_measurements('AA:00:00:00:00:03') == {'Sensor1': -61.0}
+    fresh = RSSIDataReader(str(capture.parent), use_cache=False)
+    fresh.load_all_data()
+    assert reader._device_rows == fresh._device_rows
+
+
+def test_rewritten_capture_drops_stale_index_entries(capture):
+    reader = RSSIDataReader(str(capture.parent), use_cache=False)
+    reader.load_all_data()
+    capture.write_bytes(HEADER + _station('AA:00:00:00:00:01', '2025-05-10 15:24:19', -58))
+    _touch(capture, 1000)
+    reader.load_all_data()
+    assert reader.get_device_measurements('AA:00:00:00:00:02') == {}
+    assert reader.get_device_measurements('AA:00:00:00:00:01') == {'Sensor1': [-58.0]}
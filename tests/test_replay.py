@@ -0,0 +1,53 @@
+import time
+
+import numpy as np
+import pytest
+
+from benchmarks.replay import ReplayTrace, replay
+from src.log_store import RSSILogStore
+
+
+class _Target:
+    name = 'test'
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+
+    def process(self, trace, start, stop):
+        time.sleep(self.delay)
+
+
+def _trace(events=50, spacing=0.01):
+    times = np.arange(events) * spacing
+    return ReplayTrace(times, ['dev'] * events, ['Sensor1'] * events, np.full(events, -60.0))
+
+
+def test_fast_target_keeps_up():
+    report = replay(_trace(), _Target(), speed=1.0)
+    assert report['events'] == 50
+    assert not report['saturated']
+
+
+def test_drain_after_the_last_release_counts_as_saturation():
+    report = replay(_trace(events=20), _Target(delay=0.05), speed=1.0)
+    assert report['events'] == 20
+    assert report['released_rate'] > 2 * report['throughput']
+    assert report['saturated']
+
+
+def test_trace_from_log_store(tmp_path):
+    path = str(tmp_path / 'logs.sqlite3')
+    with pytest.raises(FileNotFoundError):
+        ReplayTrace.from_log_store(path)
+    store = RSSILogStore(path)
+    store.append([
+        ('Sensor2', 'dev', '2024-01-01 00:00:01', 3.0, 4.0, -61.0),
+        ('Sensor1', 'dev', '2024-01-01 00:00:00', 1.0, 2.0, -50.0),
+    ])
+    store.close()
+
+    trace = ReplayTrace.from_log_store(path)
+    np.testing.assert_allclose(trace.times, [0.0, 1.0])
+    assert trace.sensor_ids(0, 2) == ['Sensor1', 'Sensor2']
+    np.testing.assert_allclose(trace.x, [1.0, 3.0])
+    assert trace.has_positions
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from src.rssi_to_distance import RSSIConverter
+
+SENSORS = {'Sensor1': (0.0, 0.0), 'Sensor2': (30.0, 0.0), 'Sensor3': (15.0, 30.0)}
+
+
+@pytest.fixture
+def converter():
+    converter = RSSIConverter(seed=0, shadowing_std_dev_dB=4.0)
+    converter.set_sensor_positions(dict(SENSORS))
+    return converter
+
+
+def test_keyed_shadowing_depends_only_on_its_key(converter):
+    keys = [('AA:00:00:00:00:01', 0), ('AA:00:00:00:00:02', 0), ('AA:00:00:00:00:01', 1)]
+    shadowing = converter.keyed_shadowing(keys)
+    assert shadowing.shape == (3, 3)
+    np.testing.assert_array_equal(converter.keyed_shadowing(keys[::-1]), shadowing[::-1])
+    np.testing.assert_array_equal(converter.keyed_shadowing(keys[1:2]), shadowing[1:2])
+    np.testing.assert_array_equal(converter.keyed_shadowing(keys, ['Sensor3']), shadowing[:, 2:])
+    assert not np.array_equal(shadowing[0], shadowing[2])
+
+
+def test_keyed_shadowing_follows_the_seed_and_spread(converter):
+    keys = [(f'dev{i}', i % 7) for i in range(20000)]
+    shadowing = converter.keyed_shadowing(keys)
+    assert abs(shadowing.mean()) < 0.1
+    assert shadowing.std() == pytest.approx(4.0, rel=0.02)
+
+    other = RSSIConverter(seed=1, shadowing_std_dev_dB=4.0)
+    other.set_sensor_positions(dict(SENSORS))
+    assert not np.array_equal(other.keyed_shadowing(keys[:10]), shadowing[:10])
+
+
+def test_simulated_matrix_uses_keyed_shadowing(converter):
+    positions = np.array([[5.0, 5.0], [20.0, 10.0]])
+    keys = [('AA:00:00:00:00:01', 3), ('AA:00:00:00:00:02', 0)]
+    expected = np.maximum(
+        converter.tx_power_dBm - converter.path_loss_matrix(positions) - converter.keyed_shadowing(keys),
+        converter.noise_floor_dBm)
+    np.testing.assert_allclose(converter.simulate_rssi_matrix(positions, device_keys=keys), expected)
+
+
+def test_simulate_from_position_matches_the_model():
+    converter = RSSIConverter(shadowing_std_dev_dB=0.0)
+    converter.set_sensor_positions(dict(SENSORS))
+    rssi = converter.simulate_rssi_from_position((5.0, 5.0))
+    assert list(rssi) == list(SENSORS)
+    np.testing.assert_allclose(list(rssi.values()), converter.expected_rssi_matrix([(5.0, 5.0)])[0])
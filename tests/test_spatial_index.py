@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from src.spatial_index import GridIndex
+
+
+def _index(points, cell_size=5.0):
+    index = GridIndex(cell_size=cell_size)
+    index.update(list(points), np.array(list(points.values()), dtype=float))
+    return index
+
+
+def _brute_bbox(points, xmin, ymin, xmax, ymax):
+    return {k for k, (x, y) in points.items() if xmin <= x <= xmax and ymin <= y <= ymax}
+
+
+def test_queries_match_brute_force():
+    rng = np.random.default_rng(0)
+    coords = rng.uniform(-40, 40, size=(300, 2))
+    points = {f'd{i}': tuple(c) for i, c in enumerate(coords.tolist())}
+    index = _index(points, cell_size=3.0)
+
+    for _ in range(20):
+        (x0, x1), (y0, y1) = np.sort(rng.uniform(-50, 50, size=(2, 2)), axis=1)
+        assert index.query_bbox(x0, y0, x1, y1) == _brute_bbox(points, x0, y0, x1, y1)
+        cx, cy, r = rng.uniform(-40, 40), rng.uniform(-40, 40), rng.uniform(0, 30)
+        assert index.query_radius(cx, cy, r) == {k for k, (x, y) in points.items() if np.hypot(x - cx, y - cy) <= r}
+
+    # Huge boxes walk the occupied cells instead of every cell in range
+    assert index.query_bbox(-1e9, -1e9, 1e9, 1e9) == set(points)
+    assert index.query_radius(0.0, 0.0, 1e308) == set(points)
+
+
+def test_polygon_uses_even_odd_rule():
+    points = {'inside': (1.0, 1.0), 'notch': (5.0, 5.0), 'outside': (20.0, 1.0), 'edge_cell': (9.0, 1.0)}
+    index = _index(points)
+    # Square 0..10 with a triangular notch cut from the top edge down to (5, 4)
+    zone = [(0, 0), (10, 0), (10, 10), (6, 10), (5, 4), (4, 10), (0, 10)]
+    assert index.query_polygon(zone) == {'inside', 'edge_cell'}
+    with pytest.raises(ValueError):
+        index.query_polygon([(0, 0), (1, 1)])
+
+
+def test_update_moves_and_removes_points():
+    index = _index({'a': (1.0, 1.0), 'b': (2.0, 2.0)})
+    index.update(['a', 'b'], np.array([[50.0, 50.0], [np.nan, np.nan]]))
+    assert len(index) == 1 and 'b' not in index
+    assert index.position('a') == (50.0, 50.0)
+    assert index.query_bbox(0, 0, 10, 10) == set()
+    index.remove(['a', 'missing'])
+    assert len(index) == 0
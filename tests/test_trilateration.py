@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+import scipy.optimize
+
+from src.trilateration import TrilaterationEngine
+
+SENSORS = {'Sensor1': (0.0, 0.0), 'Sensor2': (30.0, 0.0), 'Sensor3': (15.0, 30.0), 'Sensor4': (0.0, 30.0)}
+
+
+@pytest.fixture
+def engine():
+    return TrilaterationEngine(list(SENSORS.values()), sensor_ids=list(SENSORS))
+
+
+def _distances(points, noise=0.0, seed=0):
+    sensors = np.array(list(SENSORS.values()))
+    distances = np.linalg.norm(points[:, None, :] - sensors, axis=2)
+    return distances + np.random.default_rng(seed).normal(0.0, noise, distances.shape)
+
+
+def test_batch_matches_nelder_mead(engine):
+    points = np.random.default_rng(1).uniform(0.0, 30.0, (20, 2))
+    distances = _distances(points, noise=0.5)
+    batch, cost, converged = engine.estimate_positions_batch(distances)
+    assert converged.all()
+    for row, distance in enumerate(distances):
+        np.testing.assert_allclose(batch[row], engine.estimate_position(list(distance)), atol=1e-2)
+    np.testing.assert_allclose(cost, [engine._calculate_error(p, d) for p, d in zip(batch, distances)])
+
+
+def test_exact_distances_recover_positions(engine):
+    points = np.array([[5.0, 5.0], [20.0, 10.0], [15.0, 25.0]])
+    batch, _, converged = engine.estimate_positions_batch(_distances(points))
+    assert converged.all()
+    np.testing.assert_allclose(batch, points, atol=1e-6)
+
+
+@pytest.mark.parametrize('bad', [np.nan, np.inf])
+def test_non_finite_rows_are_nan_and_skip_the_fallback(engine, monkeypatch, bad):
+    def no_fallback(*args, **kwargs):
+        raise AssertionError("Nelder-Mead fallback called")
+    monkeypatch.setattr(scipy.optimize, 'minimize', no_fallback)
+
+    points = np.array([[5.0, 5.0], [20.0, 10.0], [15.0, 25.0]])
+    distances = _distances(points)
+    distances[1, 2] = bad
+    batch, cost, converged = engine.estimate_positions_batch(distances)
+    assert converged.tolist() == [True, False, True]
+    assert np.isnan(batch[1]).all() and np.isnan(cost[1])
+    np.testing.assert_allclose(batch[[0, 2]], points[[0, 2]], atol=1e-6)
+
+
+def test_all_rows_non_finite(engine):
+    batch, cost, converged = engine.estimate_positions_batch(np.full((2, 4), np.nan))
+    assert np.isnan(batch).all() and np.isnan(cost).all() and not converged.any()
+
+
+def test_sparse_ignores_missing_sensors(engine):
+    points = np.array([[5.0, 5.0], [20.0, 10.0]])
+    distances = _distances(points)
+    measurements = [dict(zip(SENSORS, row)) for row in distances]
+    measurements[0]['Sensor4'] = np.nan
+    measurements[1] = {'Sensor1': distances[1, 0], 'Sensor2': distances[1, 1]}
+    positions, _, converged = engine.estimate_positions_sparse(measurements, k=3)
+    np.testing.assert_allclose(positions[0], points[0], atol=1e-6)
+    assert converged[0]
+    assert np.isnan(positions[1]).all() and not converged[1]
+
+
+def test_dense_input_must_match_the_sensors(engine):
+    with pytest.raises(ValueError):
+        engine.estimate_positions_batch(np.ones((1, 3)))
+    with pytest.raises(ValueError):
+        engine.estimate_position({'Sensor1': 1.0, 'Sensor2': 2.0})
@@ -0,0 +1,99 @@
+import threading
+
+import pytest
+
+from src.update_queue import PositionUpdateQueue, QueueFull
+
+
+def test_updates_are_coalesced_and_committed_in_order():
+    batches = []
+    queue = PositionUpdateQueue(batches.append, batch_size=10, flush_interval=10.0)
+    queue.submit('A', 1.0, 1.0, 't1')
+    queue.submit('B', 2.0, 2.0, 't2')
+    queue.submit('A', 3.0, 3.0, 't3')
+    assert queue.flush(timeout=5.0)
+    queue.close()
+    assert batches == [[('A', 3.0, 3.0, 't3'), ('B', 2.0, 2.0, 't2')]]
+    stats = queue.stats()
+    assert stats['submitted'] == 3
+    assert stats['coalesced'] == 1
+    assert stats['committed'] == 2
+
+
+def test_full_queue_rejects_new_devices():
+    release = threading.Event()
+    queue = PositionUpdateQueue(lambda batch: release.wait(5.0), max_pending=1, batch_size=1, flush_interval=0.0)
+    queue.submit('A', 0.0, 0.0, 't')
+    queue.flush(timeout=0.2)  # A is now in flight, blocking the writer
+    queue.submit('B', 0.0, 0.0, 't')
+    with pytest.raises(QueueFull):
+        queue.submit('C', 0.0, 0.0, 't')
+    queue.submit('B', 1.0, 1.0, 't')  # Coalescing into a waiting device still works
+    release.set()
+    queue.close()
+    assert queue.stats()['rejected'] == 1
+
+
+def test_failing_commit_keeps_the_writer_alive():
+    calls = []
+
+    def commit(batch):
+        calls.append(batch)
+        if len(calls) == 1:
+            raise RuntimeError("boom")
+
+    queue = PositionUpdateQueue(commit, flush_interval=0.0)
+    queue.submit('A', 0.0, 0.0, 't')
+    assert queue.flush(timeout=5.0)
+    queue.submit('B', 0.0, 0.0, 't')
+    assert queue.flush(timeout=5.0)
+    queue.close()
+    assert queue.stats()['failed'] == 1
+    assert queue.stats()['committed'] == 1
+
+
+def test_closed_queue_commits_what_is_pending():
+    batches = []
+    queue = PositionUpdateQueue(batches.append, flush_interval=60.0)
+    queue.submit('A', 0.0, 0.0, 't')
+    queue.close()
+    assert batches == [[('A', 0.0, 0.0, 't')]]
+    with pytest.raises(RuntimeError):
+        queue.submit('B', 0.0, 0.0, 't')
+
+
+@pytest.mark.parametrize("body", [
+    {'x': 1.0, 'y': 2.0},
+    {'device_id': 'AA:00:00:00:00:01', 'x': 'abc', 'y': 2.0},
+    {'device_id': 'AA:00:00:00:00:01', 'y': 2.0},
+    {'device_id': 'AA:00:00:00:00:01', 'x': float('nan'), 'y': 2.0},
+    {'device_id': 'AA:00:00:00:00:01', 'x': True, 'y': 2.0},
+    {'device_id': '', 'x': 1.0, 'y': 2.0},
+])
+def test_invalid_update_is_rejected_before_queueing(client, app_module, body):
+    submitted = app_module.update_queue.stats()['submitted']
+    response = client.post('/api/update_position', json=body)
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+    assert app_module.update_queue.stats()['submitted'] == submitted
+
+
+def test_update_is_committed_to_the_registry(client, app_module):
+    response = client.post('/api/update_position', json={'device_id': 'AA:00:00:00:00:02', 'x': 21, 'y': 11.5})
+    assert response.status_code == 202
+    assert app_module.update_queue.flush(timeout=10.0)
+    entry = app_module.device_registry.get('AA:00:00:00:00:02')
+    assert (entry['x'], entry['y'], entry['type']) == (21.0, 11.5, 'laptop')
+
+
+def test_bad_entry_does_not_drop_the_rest_of_the_group(app_module):
+    sequence = app_module.change_feed.sequence
+    app_module.commit_position_updates([
+        ('AA:00:00:00:00:03', 'abc', 1.0, 't'),
+        ('AA:00:00:00:00:01', 6.0, 7.0, 't'),
+    ])
+    entry = app_module.device_registry.get('AA:00:00:00:00:01')
+    assert (entry['x'], entry['y']) == (6.0, 7.0)
+    assert app_module.device_registry.get('AA:00:00:00:00:03')['x'] == 15.0
+    _, changed = app_module.change_feed.changes_since(sequence)
+    assert [device['id'] for device in changed] == ['AA:00:00:00:00:01']
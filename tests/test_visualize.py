@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from src.accuracy_map import AccuracyEvaluator
+from src.rssi_to_distance import RSSIConverter
+from src.visualize import PositionVisualizer
+
+
+@pytest.fixture
+def visualizer():
+    return PositionVisualizer([(0, 0), (30, 0), (15, 30)])
+
+
+def test_render_without_estimates(visualizer):
+    empty = np.empty((0, 2))
+    assert visualizer.render_positions(empty, empty).startswith(b'\x89PNG')
+    assert visualizer.render_error_histogram(empty, empty, fmt='svg').lstrip().startswith(b'<?xml')
+
+
+def test_render_is_cached_by_input(visualizer):
+    estimated = np.array([[1.0, 2.0], [3.0, 4.0]])
+    first = visualizer.render_positions(estimated, estimated + 1)
+    assert visualizer.render_positions(estimated, estimated + 1) is first
+    assert visualizer.cache_hits == 1
+
+
+def test_render_rejects_unknown_format(visualizer):
+    with pytest.raises(ValueError):
+        visualizer.render_positions(np.zeros((1, 2)), fmt='jpg')
+
+
+@pytest.mark.parametrize('kind', ['positions', 'errors'])
+def test_plot_endpoint_with_no_solved_devices(client, app_module, monkeypatch, kind):
+    monkeypatch.setattr(app_module, 'load_known_devices', lambda: [])
+    response = client.get(f'/api/plots/{kind}.png')
+    assert response.status_code == 200
+    assert response.mimetype == 'image/png'
+
+
+def test_render_accuracy_maps(visualizer):
+    evaluator = AccuracyEvaluator(RSSIConverter(shadowing_std_dev_dB=2.0))
+    triangle = {'Sensor1': (0.0, 0.0), 'Sensor2': (30.0, 0.0), 'Sensor3': (15.0, 30.0)}
+    square = {'Sensor1': (0.0, 0.0), 'Sensor2': (30.0, 0.0), 'Sensor3': (30.0, 30.0), 'Sensor4': (0.0, 30.0)}
+    maps = evaluator.compare_layouts({'triangle': triangle, 'square': square}, resolution=10.0, trials=5)
+
+    image = visualizer.render_accuracy_map(maps['triangle'], metric='p90')
+    assert image.startswith(b'\x89PNG')
+    assert visualizer.render_accuracy_map(maps['triangle'], metric='p90') is image
+    assert visualizer.render_accuracy_map(maps['triangle'], metric='gdop') is not image
+
+    comparison = visualizer.render_layout_comparison(maps, fmt='svg')
+    assert comparison.lstrip().startswith(b'<?xml')
+    with pytest.raises(ValueError):
+        visualizer.render_layout_comparison(maps, fmt='gif')